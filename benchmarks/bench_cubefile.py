@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Pixel conversions of Isis cubes."""
+from planetaryimage import CubeFile
+
+from . import generators
+
+
+class Conversions(object):
+    params = ['u1', '<i2', '<u2', '<f4']
+    param_names = ['dtype']
+    timeout = 300
+
+    def setup(self, dtype):
+        filename = generators.cube('Tile', dtype, base=1.0, multiplier=0.5)
+        self.image = CubeFile.open(filename)
+
+    def time_apply_numpy_specials(self, dtype):
+        self.image.apply_numpy_specials()
+
+    def peakmem_apply_numpy_specials(self, dtype):
+        self.image.apply_numpy_specials()
+
+    def time_apply_scaling(self, dtype):
+        self.image.apply_scaling()
+
+    def peakmem_apply_scaling(self, dtype):
+        self.image.apply_scaling()
+
+    def time_apply_scaling_numpy_specials(self, dtype):
+        self.image.apply_scaling(numpy_specials=True)
+
+    def time_get_image_array(self, dtype):
+        self.image.get_image_array()
+
+    def time_get_image_array_clip(self, dtype):
+        self.image.get_image_array(clip=(2, 98))
+
+    def peakmem_get_image_array(self, dtype):
+        self.image.get_image_array()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Throughput of the decoders, by pixel type and byte order, and of
+windowed and streaming reads.
+"""
+import functools
+
+import numpy
+
+from planetaryimage import CubeFile
+from planetaryimage.decoders import TileDecoder
+
+from . import generators
+
+WINDOW = 512
+
+
+def legacy_decode(decoder, stream):
+    """The original TileDecoder.decode issuing one read per tile."""
+    bands, lines, samples = decoder.shape
+    tile_lines, tile_samples = decoder.tile_shape
+    tile_size = tile_lines * tile_samples
+    data = numpy.empty(decoder.shape, dtype=decoder.dtype)
+
+    for band in data:
+        for line in range(0, lines, tile_lines):
+            for sample in range(0, samples, tile_samples):
+                chunk = band[line:line + tile_lines, sample:sample + tile_samples]
+                tile = numpy.fromfile(stream, decoder.dtype, tile_size)
+                tile = tile.reshape((tile_lines, tile_samples))
+                chunk_lines, chunk_samples = chunk.shape
+                chunk[:] = tile[:chunk_lines, :chunk_samples]
+
+    return data
+
+
+class Decode(object):
+    params = (['Tile', 'BandSequential'], ['u1', '<i2', '>i2', '<f4', '>f8'])
+    param_names = ['format', 'dtype']
+    timeout = 300
+
+    def setup(self, format, dtype):
+        self.filename = generators.cube(format, dtype)
+        self.image = CubeFile.open(self.filename, load_data=False)
+
+    def time_decode(self, format, dtype):
+        CubeFile.open(self.filename)
+
+    def peakmem_decode(self, format, dtype):
+        CubeFile.open(self.filename)
+
+    def time_read_window(self, format, dtype):
+        self.image.read_window(
+            0, slice(WINDOW, 2 * WINDOW), slice(WINDOW, 2 * WINDOW)
+        )
+
+    def time_read_column(self, format, dtype):
+        self.image.read_window(0, None, slice(WINDOW, WINDOW + 16))
+
+    def time_iter_lines(self, format, dtype):
+        for _ in self.image.iter_lines():
+            pass
+
+    def peakmem_iter_lines(self, format, dtype):
+        for _ in self.image.iter_lines():
+            pass
+
+
+class TileDecoderMethods(object):
+    """The original per tile loop against the vectorized decoder."""
+
+    params = ['loop', 'vectorized', 'workers=2', 'workers=4', 'workers=8']
+    param_names = ['decoder']
+    timeout = 300
+
+    def setup(self, method):
+        self.filename = generators.cube('Tile', '<f4')
+        image = CubeFile.open(self.filename, load_data=False)
+        self.start_byte = image.start_byte
+        self.decoder = TileDecoder(image.dtype, image.shape, image.tile_shape)
+
+        if method == 'loop':
+            self.decode = legacy_decode
+        elif method == 'vectorized':
+            self.decode = TileDecoder.decode
+        else:
+            workers = int(method.split('=')[1])
+            self.decode = functools.partial(TileDecoder.decode, workers=workers)
+
+    def time_decode(self, method):
+        with open(self.filename, 'rb') as stream:
+            stream.seek(self.start_byte)
+            self.decode(self.decoder, stream)
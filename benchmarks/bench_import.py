@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""Import time of the package, each run in a new interpreter."""
+
+
+class Import(object):
+    params = [
+        'import planetaryimage',
+        'from planetaryimage import CubeFile',
+        'from planetaryimage import PDS3Image',
+        'from planetaryimage import CubeWriter, PDS3Writer',
+    ]
+    param_names = ['statement']
+    repeat = 10
+
+    def timeraw_import(self, statement):
+        return statement
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Open latency and full decode throughput of each kind of image."""
+from planetaryimage import CubeFile, PDS3Image
+
+from . import generators
+
+IMAGES = {
+    'cube-tile': lambda: (CubeFile, generators.cube('Tile')),
+    'cube-bsq': lambda: (CubeFile, generators.cube('BandSequential')),
+    'pds3': lambda: (PDS3Image, generators.pds3()),
+    'pds3-gz': lambda: (PDS3Image, generators.pds3(compression='gz')),
+    'pds3-bz2': lambda: (PDS3Image, generators.pds3(compression='bz2')),
+}
+
+
+class Open(object):
+    params = sorted(IMAGES)
+    param_names = ['image']
+    timeout = 300
+
+    def setup(self, image):
+        self.cls, self.filename = IMAGES[image]()
+
+    def time_open_label(self, image):
+        self.cls.open(self.filename, load_data=False)
+
+    def time_open(self, image):
+        self.cls.open(self.filename)
+
+    def peakmem_open(self, image):
+        self.cls.open(self.filename)
+
+
+class OpenParallel(object):
+    params = (['cube-tile', 'cube-bsq', 'pds3-bz2'], [1, 2, 4])
+    param_names = ['image', 'workers']
+    timeout = 300
+
+    def setup(self, image, workers):
+        self.cls, self.filename = IMAGES[image]()
+
+    def time_open(self, image, workers):
+        self.cls.open(self.filename, workers=workers)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""Synthetic images for the benchmarks.
+
+Images are generated once into a cache directory and reused by later runs.
+The directory is ``$PLANETARYIMAGE_BENCH_DIR``, by default
+``planetaryimage-bench`` in the temporary directory, and the shape of the
+images is ``$PLANETARYIMAGE_BENCH_SHAPE`` given as ``bands,lines,samples``.
+"""
+import bz2
+import gzip
+import os
+import shutil
+import tempfile
+
+import numpy
+
+from planetaryimage import CubeWriter, PDS3Writer
+from planetaryimage.specialpixels import SPECIAL_PIXELS
+
+DEFAULT_SHAPE = (1, 2048, 2048)
+
+#: Fraction of cube pixels set to special pixel values.
+SPECIALS_FRACTION = 0.01
+
+#: Number of lines generated at a time.
+CHUNK_LINES = 256
+
+
+def bench_dir():
+    path = os.environ.get('PLANETARYIMAGE_BENCH_DIR') or os.path.join(
+        tempfile.gettempdir(), 'planetaryimage-bench'
+    )
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    return path
+
+
+def bench_shape():
+    shape = os.environ.get('PLANETARYIMAGE_BENCH_SHAPE')
+    if not shape:
+        return DEFAULT_SHAPE
+    return tuple(int(n) for n in shape.split(','))
+
+
+def _cached(name, make):
+    """Path of the image ``name``, generating it with ``make`` if needed."""
+    bands, lines, samples = bench_shape()
+    path = os.path.join(
+        bench_dir(), '%dx%dx%d-%s' % (bands, lines, samples, name)
+    )
+    if not os.path.exists(path):
+        tmp = path + '.tmp'
+        make(tmp)
+        os.rename(tmp, path)
+    return path
+
+
+def _chunks(shape, dtype, specials=None, seed=0):
+    """Random lines of pixels, with special pixels if given."""
+    random = numpy.random.RandomState(seed)
+    dtype = numpy.dtype(dtype)
+    bands, lines, samples = shape
+    for band in range(bands):
+        for line in range(0, lines, CHUNK_LINES):
+            chunk_shape = (min(CHUNK_LINES, lines - line), samples)
+            if dtype.kind == 'f':
+                chunk = random.standard_normal(chunk_shape) * 1000
+            else:
+                info = numpy.iinfo(dtype)
+                low, high = info.min, info.max
+                if specials is not None:
+                    low, high = specials['Min'], specials['Max']
+                chunk = random.randint(low, int(high) + 1, chunk_shape)
+            chunk = chunk.astype(dtype)
+
+            if specials is not None:
+                mask = random.random_sample(chunk_shape) < SPECIALS_FRACTION
+                values = [
+                    specials[key] for key in ('Null', 'Lrs', 'Lis', 'His', 'Hrs')
+                ]
+                chunk[mask] = random.choice(values, mask.sum())
+            yield chunk
+
+
+def cube(format='Tile', dtype='<f4', tile_shape=(128, 128), base=0.0,
+         multiplier=1.0):
+    """Path of a cube of random pixels with some special pixels."""
+    dtype = numpy.dtype(dtype)
+    name = '%s-%s-%s-%s-%s.cub' % (
+        format, dtype.str, 'x'.join(str(n) for n in tile_shape), base,
+        multiplier
+    )
+    specials = SPECIAL_PIXELS[CubeWriter.PIXEL_TYPES[dtype.newbyteorder('=')]]
+
+    def make(path):
+        shape = bench_shape()
+        writer = CubeWriter(
+            path, shape, dtype, format=format, tile_shape=tile_shape,
+            base=base, multiplier=multiplier
+        )
+        with writer:
+            writer.write_chunks(_chunks(shape, dtype, specials))
+
+    return _cached(name, make)
+
+
+def pds3(dtype='>i2', compression=None):
+    """Path of a PDS3 image of random pixels.
+
+    :param compression: ``None``, ``'gz'`` or ``'bz2'``
+    """
+    dtype = numpy.dtype(dtype)
+    name = '%s.img' % dtype.str
+    if compression is not None:
+        name += '.' + compression
+
+    def make(path):
+        shape = bench_shape()
+        if compression is None:
+            with PDS3Writer(path, shape, dtype) as writer:
+                writer.write_chunks(_chunks(shape, dtype))
+            return
+
+        source = pds3(dtype)
+        open_compressed = {'gz': gzip.open, 'bz2': bz2.BZ2File}[compression]
+        with open(source, 'rb') as src, open_compressed(path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+
+    return _cached(name, make)
@@ -1,17 +1,53 @@
 # -*- coding: utf-8 -*-
+"""Readers and writers of PDS3 images and Isis cubes.
+
+The classes are imported from their modules on first access, so importing
+the package does not import numpy, pvl or the compression libraries until
+they are needed.
+"""
+import importlib
+import sys
 
 __author__ = 'PlanetaryPy Developers'
 __email__ = 'contact@planetarypy.com'
 __version__ = '0.3.0'
-__all__ = [
-    'PDS3Image',
-    'CubeFile',
-]
-
 __all__ = [
     'CubeFile',
+    'CubeWriter',
+    'IOStats',
+    'LabelCache',
     'PDS3Image',
+    'PDS3Writer',
+    'TileCache',
 ]
 
-from .cubefile import CubeFile
-from .pds3image import PDS3Image
+#: The module defining each public name.
+_MODULES = {
+    'CubeFile': '.cubefile',
+    'CubeWriter': '.writers',
+    'IOStats': '.stats',
+    'LabelCache': '.cache',
+    'PDS3Image': '.pds3image',
+    'PDS3Writer': '.writers',
+    'TileCache': '.cache',
+}
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError(
+            'module %r has no attribute %r' % (__name__, name)
+        )
+    value = getattr(importlib.import_module(_MODULES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    # Module __getattr__ is not supported, import everything up front
+    for _name in __all__:
+        __getattr__(_name)
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+import collections
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # pragma: no cover
+    from collections import Mapping
+
+__all__ = ['LabelCache', 'TileCache']
+
+
+class TileCache(object):
+    """An in-process LRU cache of decoded tiles bounded by size in bytes.
+
+    A cache can be shared by any number of images, tiles are keyed by the
+    file they were read from as well as their band and position.
+
+    Usage::
+
+        from planetaryimage import CubeFile, TileCache
+
+        cache = TileCache(max_bytes=256 * 1024 * 1024)
+        image = CubeFile.open('test.cub', load_data=False, tile_cache=cache)
+        window = image.read_window(lines=slice(0, 512), samples=slice(0, 512))
+        print(cache.hits, cache.misses)
+
+    :param max_bytes: maximum number of bytes of tiles to keep
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+
+        #: Number of bytes of tiles currently held.
+        self.nbytes = 0
+
+        #: Number of lookups that found a cached tile.
+        self.hits = 0
+
+        #: Number of lookups that did not find a cached tile.
+        self.misses = 0
+
+        self._tiles = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def __contains__(self, key):
+        return key in self._tiles
+
+    def get(self, key):
+        """Return the tile stored under ``key`` or ``None`` if not cached."""
+        with self._lock:
+            tile = self._tiles.pop(key, None)
+            if tile is None:
+                self.misses += 1
+                return None
+
+            self._tiles[key] = tile
+            self.hits += 1
+            return tile
+
+    def put(self, key, tile):
+        """Cache a read only copy of ``tile``, evicting old tiles as needed."""
+        if tile.nbytes > self.max_bytes:
+            return
+
+        tile = tile.copy()
+        tile.flags.writeable = False
+
+        with self._lock:
+            old = self._tiles.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+
+            self._tiles[key] = tile
+            self.nbytes += tile.nbytes
+
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._tiles.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        """Remove all tiles and reset the hit and miss counters."""
+        with self._lock:
+            self._tiles.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def stats(self):
+        """Dictionary of cache statistics."""
+        return {
+            'tiles': len(self._tiles),
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+# A PVL module, object or group flattened to be pickled, since the pvl
+# collections can not be pickled themselves
+_Block = collections.namedtuple('_Block', ['type', 'items'])
+
+
+def _flatten_label(value):
+    if isinstance(value, Mapping):
+        return _Block(type(value), [
+            (key, _flatten_label(item)) for key, item in value.items()
+        ])
+    return value
+
+
+def _unflatten_label(value):
+    if isinstance(value, _Block):
+        return value.type([
+            (key, _unflatten_label(item)) for key, item in value.items
+        ])
+    return value
+
+
+class LabelCache(object):
+    """A persistent cache of parsed labels stored in a SQLite database.
+
+    Parsing a label is often the slowest part of opening an image.  The
+    cache stores the parsed label and geometry of each image keyed by its
+    path, size and modification time, so reopening an unchanged image skips
+    parsing while a changed image is parsed again.  The least recently used
+    labels are evicted to keep the cache under ``max_bytes``.
+
+    Labels are stored pickled, so only use cache files you trust.
+
+    Usage::
+
+        from planetaryimage import PDS3Image, LabelCache
+
+        cache = LabelCache('labels.sqlite')
+        image = PDS3Image.open('test.img', label_cache=cache)
+        print(cache.hits, cache.misses)
+
+    :param path: the database file, created if it does not exist
+    :param max_bytes: maximum number of bytes of labels to keep
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+
+        #: Number of lookups by this process that found a cached label.
+        self.hits = 0
+
+        #: Number of lookups by this process that did not find a label.
+        self.misses = 0
+
+        #: Number of labels evicted by this process.
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS labels ('
+            ' path TEXT PRIMARY KEY,'
+            ' size INTEGER NOT NULL,'
+            ' mtime INTEGER NOT NULL,'
+            ' label BLOB NOT NULL,'
+            ' geometry TEXT NOT NULL,'
+            ' nbytes INTEGER NOT NULL,'
+            ' accessed REAL NOT NULL)'
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM labels').fetchone()[0]
+
+    def __contains__(self, filename):
+        return self._lookup(filename, 'path') is not None
+
+    @property
+    def nbytes(self):
+        """Number of bytes of labels currently held."""
+        with self._lock:
+            return self._total_bytes()
+
+    def get(self, filename):
+        """Return the parsed label of ``filename`` or ``None`` if not cached."""
+        row = self._lookup(filename, 'label')
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._db.execute(
+                'UPDATE labels SET accessed = ? WHERE path = ?',
+                (time.time(), os.path.abspath(filename))
+            )
+        return _unflatten_label(pickle.loads(row[0]))
+
+    def geometry(self, filename):
+        """Return the cached geometry of ``filename`` or ``None``.
+
+        The geometry is a dictionary of the ``shape``, ``dtype``,
+        ``start_byte``, ``format``, ``tile_shape`` and ``data_filename`` of
+        the image.
+        """
+        row = self._lookup(filename, 'geometry')
+        return None if row is None else json.loads(row[0])
+
+    def put(self, filename, image):
+        """Cache the label and geometry of ``image`` read from ``filename``."""
+        path, size, mtime = self._identity(filename)
+        label = pickle.dumps(
+            _flatten_label(image.label), pickle.HIGHEST_PROTOCOL
+        )
+        if len(label) > self.max_bytes:
+            return
+
+        tile_shape = getattr(image, 'tile_shape', None)
+        geometry = json.dumps({
+            'shape': list(image.shape),
+            'dtype': image.file_dtype.str,
+            'start_byte': image.start_byte,
+            'format': image.format,
+            'tile_shape': None if tile_shape is None else list(tile_shape),
+            'data_filename': image.data_filename,
+        })
+
+        with self._lock:
+            with self._db:
+                self._db.execute('BEGIN')
+                self._db.execute(
+                    'INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (path, size, mtime, sqlite3.Binary(label), geometry,
+                     len(label), time.time())
+                )
+                self._evict()
+
+    def clear(self):
+        """Remove all labels and reset the counters."""
+        with self._lock:
+            self._db.execute('DELETE FROM labels')
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+    @property
+    def stats(self):
+        """Dictionary of cache statistics."""
+        with self._lock:
+            labels = self._db.execute(
+                'SELECT COUNT(*) FROM labels'
+            ).fetchone()[0]
+            nbytes = self._total_bytes()
+        return {
+            'labels': labels,
+            'bytes': nbytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    @staticmethod
+    def _identity(filename):
+        stat = os.stat(filename)
+        return os.path.abspath(filename), stat.st_size, stat.st_mtime_ns
+
+    def _lookup(self, filename, column):
+        """The ``column`` of the entry for the current version of a file."""
+        try:
+            path, size, mtime = self._identity(filename)
+        except OSError:
+            return None
+
+        with self._lock:
+            return self._db.execute(
+                'SELECT %s FROM labels WHERE path = ? AND size = ? AND '
+                'mtime = ?' % column,
+                (path, size, mtime)
+            ).fetchone()
+
+    def _total_bytes(self):
+        return self._db.execute(
+            'SELECT COALESCE(SUM(nbytes), 0) FROM labels'
+        ).fetchone()[0]
+
+    def _evict(self):
+        """Delete the least recently used labels until under the limit."""
+        excess = self._total_bytes() - self.max_bytes
+        if excess <= 0:
+            return
+
+        rows = self._db.execute(
+            'SELECT path, nbytes FROM labels ORDER BY accessed'
+        ).fetchall()
+        evicted = []
+        for path, nbytes in rows:
+            if excess <= 0:
+                break
+            evicted.append((path,))
+            excess -= nbytes
+
+        self._db.executemany('DELETE FROM labels WHERE path = ?', evicted)
+        self.evictions += len(evicted)
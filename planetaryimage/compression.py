@@ -0,0 +1,637 @@
+# -*- coding: utf-8 -*-
+"""Random access readers for compressed images.
+
+Reading part of a gzip file normally means decompressing everything before
+it.  :class:`IndexedGzipFile` records seek points (zran style checkpoints of
+the decompressor state) every ``spacing`` bytes while it reads, so that
+later reads of the same file can restart from the nearest seek point.
+
+The seek points of each file are kept in memory in :data:`GZIP_INDEXES`, a
+:class:`GzipIndexCache` evicting the least recently used indexes once they
+hold more than ``max_bytes``.  If the optional `indexed_gzip`_ package is
+installed it is used instead and its index is persisted to a ``.gzidx``
+sidecar file next to the image, so the index survives between processes.
+Python's :mod:`zlib` can not restore a decompressor from a bit offset, so
+the pure Python seek points can not be persisted.
+
+bzip2 streams are made of independently compressed blocks.
+:class:`ParallelBZ2File` finds the block boundaries and decompresses the
+blocks with a pool of threads.
+
+.. _indexed_gzip: https://github.com/pauldmccarthy/indexed_gzip
+"""
+import bisect
+import collections
+import io
+import os
+import struct
+import threading
+import zlib
+
+import numpy
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # pragma: no cover
+    ThreadPoolExecutor = None
+
+__all__ = [
+    'GzipIndex',
+    'GzipIndexCache',
+    'IndexedGzipFile',
+    'ParallelBZ2File',
+    'open_bz2',
+    'open_indexed_gzip',
+]
+
+#: Default number of uncompressed bytes between seek points.
+DEFAULT_SPACING = 4 * 1024 * 1024
+
+#: Extension of the index sidecar files written with ``indexed_gzip``.
+SIDECAR_EXTENSION = '.gzidx'
+
+# Sidecar files start with this magic, a version and flags byte and the size
+# of the indexed gzip file
+SIDECAR_MAGIC = b'GZIDX'
+SIDECAR_HEADER = struct.Struct('<5sBBQ')
+
+#: Approximate number of bytes of the decompressor state of a seek point.
+POINT_BYTES = 48 * 1024
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Decode a gzip wrapper around the deflate stream
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class GzipIndex(object):
+    """The seek points recorded for one gzip file.
+
+    :param spacing: number of uncompressed bytes between seek points
+    """
+
+    def __init__(self, spacing=DEFAULT_SPACING):
+        self.spacing = spacing
+
+        #: Approximate number of bytes of the seek points.
+        self.nbytes = 0
+
+        self._offsets = []
+        self._points = []
+        self._lock = threading.Lock()
+
+        # The cache holding the index and its key there, told of its growth
+        self._cache = None
+        self._key = None
+
+    def __len__(self):
+        return len(self._points)
+
+    @classmethod
+    def for_file(cls, filename, spacing=DEFAULT_SPACING):
+        """Return the shared index of ``filename``, creating it if needed.
+
+        Indexes are kept in :data:`GZIP_INDEXES`.
+        """
+        return GZIP_INDEXES.get(filename, spacing, cls)
+
+    def add(self, offset, position, decompressor, pending):
+        """Record a seek point if ``offset`` is far enough from the last one.
+
+        :param offset: uncompressed offset of the seek point
+        :param position: position in the compressed file of the next read
+        :param decompressor: decompressor state at ``offset``
+        :param pending: compressed bytes read but not yet decompressed
+        """
+        with self._lock:
+            last = self._offsets[-1] if self._offsets else 0
+            if offset < last + self.spacing:
+                return
+
+            self._offsets.append(offset)
+            self._points.append(
+                (offset, position, decompressor.copy(), pending)
+            )
+            nbytes = POINT_BYTES + len(pending)
+            self.nbytes += nbytes
+
+        cache = self._cache
+        if cache is not None:
+            cache._grown(self, nbytes)
+
+    def nearest(self, offset):
+        """The last seek point at or before ``offset`` or ``None``."""
+        with self._lock:
+            index = bisect.bisect_right(self._offsets, offset)
+            if index == 0:
+                return None
+            return self._points[index - 1]
+
+
+class GzipIndexCache(object):
+    """An in-process LRU cache of gzip indexes bounded by size in bytes.
+
+    Indexes are keyed by the path, size and modification time of the file,
+    so a changed file gets a new index and the indexes of its older versions
+    are dropped.  Indexes grow as their files are read, the least recently
+    looked up or grown indexes are evicted whenever the total grows past
+    ``max_bytes``.
+
+    :param max_bytes: maximum number of bytes of seek points to keep
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+
+        #: Number of bytes of seek points currently held.
+        self.nbytes = 0
+
+        #: Number of lookups that found an index.
+        self.hits = 0
+
+        #: Number of lookups that created a new index.
+        self.misses = 0
+
+        # Key to [index, bytes counted for the index]
+        self._indexes = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def __contains__(self, filename):
+        return self._key(filename) in self._indexes
+
+    def get(self, filename, spacing=DEFAULT_SPACING, factory=GzipIndex):
+        """Return the index of ``filename``, creating it if needed.
+
+        :param filename: the gzip file
+        :param spacing: number of uncompressed bytes between seek points of
+            a new index
+        :param factory: the class of a new index
+        """
+        key = self._key(filename)
+        with self._lock:
+            entry = self._indexes.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                for old in [k for k in self._indexes if k[0] == key[0]]:
+                    self._remove(old)
+
+                index = factory(spacing)
+                index._cache, index._key = self, key
+                entry = [index, 0]
+            else:
+                self.hits += 1
+
+            self._indexes[key] = entry
+            return entry[0]
+
+    def clear(self):
+        """Remove all indexes and reset the hit and miss counters."""
+        with self._lock:
+            for key in list(self._indexes):
+                self._remove(key)
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def stats(self):
+        """Dictionary of cache statistics."""
+        return {
+            'indexes': len(self._indexes),
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    @staticmethod
+    def _key(filename):
+        stat = os.stat(filename)
+        return os.path.abspath(filename), stat.st_size, stat.st_mtime
+
+    def _grown(self, index, nbytes):
+        """Count ``nbytes`` added to ``index``, evicting old indexes."""
+        with self._lock:
+            entry = self._indexes.get(index._key)
+            if entry is None or entry[0] is not index:
+                return
+
+            # An index being read is in use
+            self._indexes[index._key] = self._indexes.pop(index._key)
+            entry[1] += nbytes
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._indexes)))
+
+    def _remove(self, key):
+        index, nbytes = self._indexes.pop(key)
+        index._cache = None
+        self.nbytes -= nbytes
+
+
+#: Indexes of the gzip files read by this process.
+GZIP_INDEXES = GzipIndexCache()
+
+
+class IndexedGzipFile(io.RawIOBase):
+    """A seekable gzip reader recording seek points into a :class:`GzipIndex`.
+
+    Seeking backwards, or forwards past a recorded seek point, restarts
+    decompression from the nearest seek point instead of the start of the
+    file.  Use :func:`open_indexed_gzip` for a buffered reader.
+    """
+
+    #: Number of compressed bytes read from the file at a time.
+    READ_SIZE = 64 * 1024
+
+    #: Maximum number of bytes decompressed at a time.
+    BLOCK_SIZE = 256 * 1024
+
+    def __init__(self, filename, index=None):
+        super(IndexedGzipFile, self).__init__()
+        self.name = filename
+        self.index = GzipIndex() if index is None else index
+        self._fp = open(filename, 'rb')
+        self._restart(None)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._fp.close()
+        super(IndexedGzipFile, self).close()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            while self._fill():
+                pass
+            offset += self._offset
+        if offset < 0:
+            raise ValueError('Negative seek position %d' % offset)
+
+        point = self.index.nearest(offset)
+        if offset < self._start:
+            self._restart(point)
+        elif point is not None and point[0] > self._offset:
+            self._restart(point)
+
+        self._pos = offset
+        return offset
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast('B')
+        while self._pos >= self._offset:
+            if not self._fill():
+                return 0
+
+        start = self._pos - self._start
+        size = min(len(view), len(self._buffer) - start)
+        view[:size] = self._buffer[start:start + size]
+        self._pos += size
+        return size
+
+    def _restart(self, point):
+        """Restart decompression from a seek point or the start of the file."""
+        if point is None:
+            offset, position = 0, 0
+            self._decompressor = zlib.decompressobj(GZIP_WBITS)
+            self._input = b''
+        else:
+            offset, position, decompressor, self._input = point
+            self._decompressor = decompressor.copy()
+
+        self._fp.seek(position)
+        self._buffer = b''
+        self._start = self._offset = offset
+
+    def _fill(self):
+        """Decompress the next block, returning ``False`` at end of file."""
+        while True:
+            if self._decompressor.eof:
+                # Look for another gzip member after the one just finished
+                self._input = self._decompressor.unused_data + self._input
+                if len(self._input) < len(GZIP_MAGIC):
+                    self._input += self._fp.read(self.READ_SIZE)
+                if not self._input.startswith(GZIP_MAGIC):
+                    return False
+                self._decompressor = zlib.decompressobj(GZIP_WBITS)
+
+            if not self._input:
+                self._input = self._fp.read(self.READ_SIZE)
+                if not self._input:
+                    raise EOFError('Compressed file ended before the end of '
+                                   'the stream was reached')
+
+            data = self._decompressor.decompress(self._input, self.BLOCK_SIZE)
+            self._input = self._decompressor.unconsumed_tail
+            if not data:
+                continue
+
+            self._buffer = data
+            self._start = self._offset
+            self._offset += len(data)
+            self.index.add(
+                self._offset, self._fp.tell(), self._decompressor,
+                self._input
+            )
+            return True
+
+
+def open_indexed_gzip(filename, spacing=DEFAULT_SPACING):
+    """Open a gzip file for random access.
+
+    When ``indexed_gzip`` is installed the index is loaded from the sidecar
+    file, or built with a full pass through the file and saved to the
+    sidecar the first time the file is opened or when the file changed
+    since the sidecar was written.  Otherwise an
+    :class:`IndexedGzipFile` sharing the in-process index of the file is
+    used.
+
+    :param filename: the gzip file to open
+    :param spacing: number of uncompressed bytes between seek points
+
+    :returns: a buffered, seekable file object
+    """
+    try:
+        import indexed_gzip
+    except ImportError:
+        index = GzipIndex.for_file(filename, spacing)
+        return io.BufferedReader(IndexedGzipFile(filename, index))
+
+    sidecar = filename + SIDECAR_EXTENSION
+    if _sidecar_is_current(filename, sidecar):
+        return indexed_gzip.IndexedGzipFile(
+            filename, spacing=spacing, index_file=sidecar
+        )
+
+    fp = indexed_gzip.IndexedGzipFile(filename, spacing=spacing)
+    fp.build_full_index()
+    try:
+        fp.export_index(sidecar)
+    except (IOError, OSError):
+        pass
+    fp.seek(0)
+    return fp
+
+
+def _sidecar_is_current(filename, sidecar):
+    """Whether ``sidecar`` holds an index of ``filename`` as it is now.
+
+    The sidecar must be newer than the file and record the file's size.
+    """
+    try:
+        stat = os.stat(filename)
+        if os.path.getmtime(sidecar) < stat.st_mtime:
+            return False
+        with open(sidecar, 'rb') as fp:
+            header = fp.read(SIDECAR_HEADER.size)
+    except (IOError, OSError):
+        return False
+
+    if len(header) < SIDECAR_HEADER.size:
+        return False
+    magic, _, _, size = SIDECAR_HEADER.unpack(header)
+    return magic == SIDECAR_MAGIC and size == stat.st_size
+
+
+# bzip2 block and end of stream markers, which are not byte aligned
+BZ2_BLOCK_MAGIC = b'\x31\x41\x59\x26\x53\x59'
+BZ2_EOS_MAGIC = b'\x17\x72\x45\x38\x50\x90'
+
+# Stream header declaring the largest block size, fitting any block
+BZ2_HEADER = b'BZh9'
+
+
+def _find_markers(data):
+    """Find the bzip2 markers in ``data``.
+
+    Returns a sorted list of ``(bit, is_block)`` for every block and end of
+    stream marker, where ``bit`` is the bit offset of the marker.
+    """
+    data = numpy.frombuffer(data, dtype=numpy.uint8)
+    markers = []
+    for shift in range(8):
+        if shift:
+            shifted = (data[:-1] << shift) | (data[1:] >> (8 - shift))
+            shifted = shifted.astype(numpy.uint8).tobytes()
+        else:
+            shifted = data.tobytes()
+
+        for pattern in (BZ2_BLOCK_MAGIC, BZ2_EOS_MAGIC):
+            index = shifted.find(pattern)
+            while index != -1:
+                markers.append((index * 8 + shift, pattern == BZ2_BLOCK_MAGIC))
+                index = shifted.find(pattern, index + 1)
+    return sorted(markers)
+
+
+def _block_stream(data, start, nbits):
+    """Wrap a block into a complete single block bzip2 stream.
+
+    :param data: bytes holding the block
+    :param start: bit offset of the block magic in ``data``
+    :param nbits: length of the block in bits
+    """
+    block = int.from_bytes(data, 'big') >> (len(data) * 8 - start - nbits)
+    block &= (1 << nbits) - 1
+
+    # A single block stream's CRC is the CRC of its block, which follows
+    # the block magic
+    crc = (block >> (nbits - 80)) & 0xffffffff
+
+    size = 32 + nbits + 80
+    padding = -size % 8
+    value = int.from_bytes(BZ2_HEADER, 'big') << nbits | block
+    value = (value << 48 | int.from_bytes(BZ2_EOS_MAGIC, 'big')) << 32 | crc
+    return (value << padding).to_bytes((size + padding) // 8, 'big')
+
+
+def iter_bz2_blocks(fp, read_size=1024 * 1024):
+    """Split a bzip2 file into single block streams.
+
+    The blocks of every stream of a multi-stream file are yielded in order
+    and each can be decompressed on its own.
+
+    :param fp: the compressed file, read from its current position
+    :param read_size: number of bytes read at a time
+    """
+    overlap = len(BZ2_BLOCK_MAGIC) + 1
+    buf = b''
+    buf_start = 0  # file offset of buf
+    searched = 0  # offset into buf to search from
+    last = -1  # bit offset of the last marker found
+    start = None  # bit offset of the current block
+
+    while True:
+        data = fp.read(read_size)
+        buf += data
+
+        for bit, is_block in _find_markers(buf[searched:]):
+            bit += (buf_start + searched) * 8
+            if bit <= last:
+                continue
+            last = bit
+
+            if start is not None:
+                first = start // 8 - buf_start
+                stop = -(-bit // 8) - buf_start
+                yield _block_stream(
+                    buf[first:stop], start - (buf_start + first) * 8,
+                    bit - start
+                )
+            start = bit if is_block else None
+
+        if not data:
+            return
+
+        # Keep the current block and enough bytes to find split markers
+        keep = len(buf) - overlap
+        if start is not None:
+            keep = min(keep, start // 8 - buf_start)
+        keep = max(keep, 0)
+        buf = buf[keep:]
+        buf_start += keep
+        searched = max(len(buf) - overlap, 0)
+
+
+class ParallelBZ2File(io.RawIOBase):
+    """A bzip2 reader decompressing blocks with a pool of threads.
+
+    Blocks are decompressed ahead of the read position, with at most two
+    blocks per worker in flight.  Seeking backwards restarts from the start
+    of the file.  If a block can not be decompressed on its own, which can
+    happen when a block magic appears by chance in the compressed data,
+    reading falls back to :class:`bz2.BZ2File`.
+    """
+
+    def __init__(self, filename, workers):
+        super(ParallelBZ2File, self).__init__()
+        self.name = filename
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(workers)
+        self._fp = None
+        self._fallback = None
+        self._restart()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        if self._fallback is not None:
+            return self._fallback.tell()
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._cancel()
+            self._pool.shutdown()
+            self._fp.close()
+            if self._fallback is not None:
+                self._fallback.close()
+        super(ParallelBZ2File, self).close()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if self._fallback is not None:
+            return self._fallback.seek(offset, whence)
+
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            while self._fill():
+                pass
+            offset += self._offset
+        if offset < 0:
+            raise ValueError('Negative seek position %d' % offset)
+
+        if offset < self._start:
+            self._restart()
+        self._pos = offset
+        return offset
+
+    def readinto(self, buffer):
+        if self._fallback is not None:
+            return self._fallback.readinto(buffer)
+
+        view = memoryview(buffer).cast('B')
+        while self._pos >= self._offset:
+            try:
+                if not self._fill():
+                    return 0
+            except (IOError, OSError, EOFError, ValueError):
+                self._fall_back()
+                return self._fallback.readinto(buffer)
+
+        start = self._pos - self._start
+        size = min(len(view), len(self._buffer) - start)
+        view[:size] = self._buffer[start:start + size]
+        self._pos += size
+        return size
+
+    def _restart(self):
+        """Restart decompression from the start of the file."""
+        if self._fp is not None:
+            self._cancel()
+            self._fp.close()
+        self._fp = open(self.name, 'rb')
+        self._blocks = iter_bz2_blocks(self._fp)
+        self._pending = collections.deque()
+        self._buffer = b''
+        self._start = self._offset = 0
+        self._pos = 0
+
+    def _cancel(self):
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+
+    def _fill(self):
+        """Decompress the next block, returning ``False`` at end of file."""
+        import bz2
+
+        while len(self._pending) < 2 * self.workers:
+            block = next(self._blocks, None)
+            if block is None:
+                break
+            self._pending.append(self._pool.submit(bz2.decompress, block))
+
+        if not self._pending:
+            return False
+
+        self._buffer = self._pending.popleft().result()
+        self._start = self._offset
+        self._offset += len(self._buffer)
+        return True
+
+    def _fall_back(self):
+        import bz2
+
+        self._cancel()
+        self._fallback = bz2.BZ2File(self.name, 'rb')
+        self._fallback.seek(self._pos)
+
+
+def open_bz2(filename, workers=None):
+    """Open a bzip2 file, decompressing blocks in parallel with ``workers``.
+
+    :returns: a buffered, seekable file object
+    """
+    import bz2
+
+    if not workers or workers < 2 or ThreadPoolExecutor is None:
+        return bz2.BZ2File(filename, 'rb')
+    return io.BufferedReader(ParallelBZ2File(filename, workers))
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
+import contextlib
+import os
 import numpy
+from six.moves import range
 
 from .image import PlanetaryImage
 from .specialpixels import SPECIAL_PIXELS
@@ -28,6 +31,12 @@ class CubeFile(PlanetaryImage):
 
     SPECIAL_PIXELS = SPECIAL_PIXELS
 
+    #: Number of bytes of pixels processed at a time by conversions.
+    CHUNK_BYTES = 4 * 1024 * 1024
+
+    #: Number of histogram bins used to clip pixel types of more than 16 bits.
+    HISTOGRAM_BINS = 4096
+
     @property
     def _bands(self):
         return self.label['IsisCube']['Core']['Dimensions']['Bands']
@@ -83,6 +92,30 @@ class CubeFile(PlanetaryImage):
             return None
         return (self.tile_lines, self.tile_samples)
 
+    def _dask_chunks(self):
+        if self.format != 'Tile':
+            return super(CubeFile, self)._dask_chunks()
+
+        # Whole tiles, filling tile rows before adding more rows
+        tile_lines, tile_samples = self.tile_shape
+        tile_bytes = tile_lines * tile_samples * self.dtype.itemsize
+        tiles = max(1, self.DASK_CHUNK_BYTES // tile_bytes)
+        columns = min(tiles, -(-self.samples // tile_samples))
+        rows = max(1, tiles // columns)
+        return (
+            1,
+            min(rows * tile_lines, self.lines),
+            min(columns * tile_samples, self.samples),
+        )
+
+    @property
+    def _tile_cache_key(self):
+        if self.data_filename is not None:
+            return self._data_path
+        if self.filename is not None:
+            return os.path.abspath(self.filename)
+        return id(self)
+
     @property
     def _byte_order(self):
         return self.BYTE_ORDERS[self._pixels_group['ByteOrder']]
@@ -105,26 +138,137 @@ class CubeFile(PlanetaryImage):
         """Return detached filename else None."""
         return self.label['IsisCube']['Core'].get('^Core')
 
-    def apply_scaling(self, copy=True):
+    def save(self, filename, format=None, tile_shape=None, dtype=None,
+             chunk_lines=None):
+        """Write the cube to ``filename``.
+
+        The pixels are streamed a chunk of lines at a time with
+        :meth:`iter_lines`, so the cube is never held in memory unless it
+        already is.  The label is kept, and the tables, history, original
+        label and other objects stored after the pixels are copied after
+        the new pixels.
+
+        :param filename: the cube to write
+        :param format: ``'Tile'`` or ``'BandSequential'``, by default the
+            format of this cube
+        :param tile_shape: the ``(lines, samples)`` shape of tiles, by
+            default the tile shape of this cube
+        :param dtype: the pixel type and byte order to write, by default
+            those of this cube
+        :param chunk_lines: number of lines read at a time, see
+            :meth:`iter_lines`
+        """
+        import pvl
+        from .writers import CubeWriter
+
+        blobs = self._read_blobs()
+        label = pvl.PVLModule([
+            (key, value) for key, value in self.label.items()
+            if not self._is_blob(value)
+        ])
+        writer = CubeWriter(
+            filename, self.shape,
+            dtype=self.dtype if dtype is None else dtype,
+            format=self.format if format is None else format,
+            tile_shape=tile_shape or self.tile_shape,
+            base=self.base,
+            multiplier=self.multiplier,
+            label=label,
+            blobs=blobs,
+        )
+        with writer:
+            writer.write_chunks(self.iter_lines(chunk_lines))
+
+    @staticmethod
+    def _is_blob(value):
+        """Whether a top level label object describes data in the file."""
+        return (
+            isinstance(value, dict) and
+            'StartByte' in value and 'Bytes' in value
+        )
+
+    def _read_blobs(self):
+        """The ``(key, object, data)`` of the tables, history and so on."""
+        blobs = [
+            (key, value) for key, value in self.label.items()
+            if key != 'IsisCube' and self._is_blob(value)
+        ]
+        if not blobs:
+            return []
+
+        result = []
+        with contextlib.closing(self._open()) as stream:
+            for key, value in blobs:
+                stream.seek(value['StartByte'] - 1)
+                data = stream.read(value['Bytes'])
+                if len(data) != value['Bytes']:
+                    raise ValueError(
+                        'Truncated %s object (%s)' % (key, value.get('Name'))
+                    )
+                result.append((key, value, data))
+        return result
+
+    def apply_scaling(self, copy=True, dtype=None, out=None,
+                      numpy_specials=False):
         """Scale pixel values to there true DN.
 
+        Special pixels are not scaled.  The scaling is done in place a chunk
+        of lines at a time, so no full size temporaries are created, reading
+        the chunks from disk with :meth:`iter_lines` unless the data is
+        loaded.
+
         :param copy: whether to apply the scalling to a copy of the pixel data
             and leave the orginial unaffected
 
+        :param dtype: the floating point type of the scaled pixels, by
+            default the type of floating point pixels, so ``copy=False``
+            scales them in place, or ``float64`` for integer pixels
+
+        :param out: an optional array of shape ``self.shape`` to write the
+            scaled pixels to
+
+        :param numpy_specials: whether to also convert special pixels to
+            numpy's nan, inf and -inf as :meth:`apply_numpy_specials` does
+
         :returns: a scalled version of the pixel data
         """
-        if copy:
-            return self.multiplier * self.data + self.base
+        pixel_dtype = self._pixel_dtype
+        if dtype is None:
+            dtype = numpy.float64
+            if pixel_dtype.kind == 'f':
+                in_place = not copy and self._data is not None
+                dtype = pixel_dtype
+                if not in_place:
+                    dtype = pixel_dtype.newbyteorder('=')
+        out = self._output(self._data, copy, dtype, out)
+
+        for index, chunk in self._iter_chunks(out.dtype):
+            dest = out[index]
+
+            masks = self._special_masks(chunk)
+            special = masks[0] | masks[1] | masks[2]
+            values = chunk[special]
+
+            if not numpy.may_share_memory(chunk, dest):
+                dest[...] = chunk
+
+            if self.multiplier != 1:
+                dest *= self.multiplier
 
-        if self.multiplier != 1:
-            self.data *= self.multiplier
+            if self.base != 0:
+                dest += self.base
 
-        if self.base != 0:
-            self.data += self.base
+            if numpy_specials:
+                self._set_numpy_specials(dest, masks)
+            else:
+                dest[special] = values
 
-        return self.data
+        if not copy:
+            self.data = out
 
-    def apply_numpy_specials(self, copy=True):
+        return out
+
+    def apply_numpy_specials(self, copy=True, dtype=numpy.float64, out=None):
         """Convert isis special pixel values to numpy special pixel values.
 
             =======  =======
@@ -137,44 +281,168 @@ class CubeFile(PlanetaryImage):
             Hrs      inf
             =======  =======
 
+        The conversion is done a chunk of lines at a time, reading the
+        chunks from disk with :meth:`iter_lines` unless the data is loaded.
+        Pixel types of up to 16 bits are converted with a single lookup
+        table pass.
+
         :param copy: whether to apply the new special values to a copy of the
             pixel data and leave the orginial unaffected
 
+        :param dtype: the floating point type to convert to, ``float32``
+            halves the memory used compared to the default ``float64``
+
+        :param out: an optional array of shape ``self.shape`` to write the
+            result to
+
         :returns: a numpy array with special values converted to numpy's nan,
             inf and -inf
         """
-        if copy:
-            data = self.data.astype(numpy.float64)
+        out = self._output(self._data, copy, dtype, out)
+
+        lut = self._specials_lut(self._pixel_dtype, out.dtype)
+        for index, chunk in self._iter_chunks(out.dtype):
+            if lut is None:
+                self._convert_specials(chunk, out[index])
+            else:
+                self._apply_lut(lut, chunk, out[index])
+
+        if not copy:
+            self.data = out
+
+        return out
+
+    def _special_masks(self, chunk):
+        return (
+            chunk < self.specials['Min'],
+            chunk > self.specials['Max'],
+            chunk == self.specials['Null'],
+        )
+
+    @staticmethod
+    def _set_numpy_specials(out, masks):
+        low, high, null = masks
+        out[low] = -numpy.inf
+        out[high] = numpy.inf
+        out[null] = numpy.nan
+
+    def _convert_specials(self, chunk, out):
+        masks = self._special_masks(chunk)
+        if not numpy.may_share_memory(chunk, out):
+            # Double special pixels overflow float32, the masks replace them
+            with numpy.errstate(over='ignore'):
+                out[...] = chunk
+        self._set_numpy_specials(out, masks)
+
+    def _specials_lut(self, dtype, out_dtype):
+        """A table mapping every pixel value to its converted value."""
+        values = self._lut_values(dtype)
+        if values is None:
+            return None
+
+        lut = numpy.empty(values.shape, out_dtype)
+        self._convert_specials(values, lut)
+        return lut
+
+    @staticmethod
+    def _lut_values(dtype):
+        """Every value of ``dtype`` indexed by its bit pattern.
+
+        Lookup tables are only used for integer types of up to 16 bits.
+        """
+        if dtype.kind not in 'iu' or dtype.itemsize > 2:
+            return None
 
-        elif self.data.dtype != numpy.float64:
-            data = self.data = self.data.astype(numpy.float64)
+        bits = dtype.itemsize * 8
+        values = numpy.arange(2 ** bits, dtype='u%d' % dtype.itemsize)
+        return values.view(dtype.newbyteorder('='))
 
-        else:
-            data = self.data
+    @staticmethod
+    def _lut_indices(chunk):
+        return chunk.view(chunk.dtype.byteorder + 'u%d' % chunk.itemsize)
 
-        data[data == self.specials['Null']] = numpy.nan
-        data[data < self.specials['Min']] = numpy.NINF
-        data[data > self.specials['Max']] = numpy.inf
+    def _apply_lut(self, lut, chunk, out):
+        numpy.take(lut, self._lut_indices(chunk), out=out, mode='clip')
 
-        return data
+    def _output(self, data, copy, dtype, out):
+        """The array to write a conversion of ``data`` to.
+
+        Converts in place when not copying and ``data`` is a writeable array
+        of ``dtype``.
+        """
+        if out is not None:
+            return out
+
+        dtype = numpy.dtype(dtype)
+        writeable = (
+            isinstance(data, numpy.ndarray) and
+            data.dtype == dtype and
+            data.flags.writeable
+        )
+        if not copy and writeable:
+            return data
+
+        return numpy.empty(self.shape, dtype)
+
+    def _chunks(self, dtype):
+        """Yield indices of chunks of about ``CHUNK_BYTES`` of pixels."""
+        line_bytes = self.samples * numpy.dtype(dtype).itemsize
+        chunk_lines = max(1, self.CHUNK_BYTES // max(line_bytes, 1))
+        for band in range(self.bands):
+            for line in range(0, self.lines, chunk_lines):
+                yield band, slice(line, line + chunk_lines)
+
+    def _iter_chunks(self, dtype):
+        """Yield ``(index, chunk)`` for chunks of about ``CHUNK_BYTES``.
+
+        Unless the data is loaded the chunks are read with :meth:`iter_lines`
+        so the image is never held in memory.  ``dtype`` is the type whose
+        size the chunks are measured in.
+        """
+        if self._data is not None:
+            for index in self._chunks(dtype):
+                yield index, numpy.asarray(self._data[index])
+            return
+
+        line_bytes = self.samples * numpy.dtype(dtype).itemsize
+        chunk_lines = max(1, self.CHUNK_BYTES // max(line_bytes, 1))
+        for band, line, chunk in self.iter_lines(chunk_lines):
+            yield (band, slice(line, line + len(chunk))), chunk
+
+    @property
+    def _pixel_dtype(self):
+        """The type of the pixels, loaded or not."""
+        return self.dtype if self._data is None else self._data.dtype
 
     def specials_mask(self):
         """Create a pixel map for special pixels.
 
+        The pixels are read a chunk of lines at a time with :meth:`iter_lines`
+        unless the data is loaded.
+
         :returns: an array where the value is `False` if the pixel is special
             and `True` otherwise
         """
-        mask = self.data >= self.specials['Min']
-        mask &= self.data <= self.specials['Max']
+        mask = numpy.empty(self.shape, dtype=bool)
+        for index, chunk in self._iter_chunks(self._pixel_dtype):
+            dest = mask[index]
+            numpy.greater_equal(chunk, self.specials['Min'], out=dest)
+            dest &= chunk <= self.specials['Max']
         return mask
 
-    def get_image_array(self):
+    def get_image_array(self, clip=None, per_band=False):
         """Create an array for use in making an image.
 
         Creates a linear stretch of the image and scales it to between `0` and
         `255`. `Null`, `Lis` and `Lrs` pixels are set to `0`. `His` and `Hrs`
         pixels are set to `255`.
 
+        The stretch is computed from a histogram of the valid pixels built
+        while streaming through the image a chunk of lines at a time and then
+        applied a chunk at a time, so memory use is bounded by the output
+        and a single chunk.  Clipping images of more than 16 bit pixels to
+        percentiles takes an extra pass to find the histogram range.
+
         Usage::
 
             from planetaryimage import CubeFile
@@ -187,26 +455,154 @@ class CubeFile(PlanetaryImage):
             # Save the first band to a new file
             Image.fromarray(data[0]).save('test.png')
 
+        :param clip: a ``(low, high)`` pair of percentiles of the valid pixels
+            to stretch between, by default the minimum and maximum
+
+        :param per_band: whether to stretch each band separately
+
         :returns:
             A uint8 array of pixel values.
         """
-        specials_mask = self.specials_mask()
-        data = self.data.copy()
+        dtype = self.data.dtype if self._data is not None else self.dtype
+        chunk_lines = max(1, self.CHUNK_BYTES // (self.samples * dtype.itemsize))
+        values = self._lut_values(dtype)
 
-        data[specials_mask] -= data[specials_mask].min()
-        data[specials_mask] *= 255 / data[specials_mask].max()
+        if values is None:
+            ranges = self._stretch_ranges(chunk_lines, clip, per_band)
+        else:
+            ranges = self._histogram_stretch_ranges(
+                values, chunk_lines, clip, per_band
+            )
+            luts = numpy.empty((self.bands,) + values.shape, numpy.uint8)
+            for band, (low, high) in enumerate(ranges):
+                self._stretch(values, low, high, luts[band])
+
+        data = numpy.empty(self.shape, numpy.uint8)
+        for band, line, chunk in self.iter_lines(chunk_lines):
+            out = data[band, line:line + len(chunk)]
+            if values is None:
+                self._stretch(chunk, ranges[band][0], ranges[band][1], out)
+            else:
+                self._apply_lut(luts[band], chunk, out)
 
-        data[data == self.specials['His']] = 255
-        data[data == self.specials['Hrs']] = 255
+        return data
 
-        return data.astype(numpy.uint8)
+    def _histogram_stretch_ranges(self, values, chunk_lines, clip, per_band):
+        counts = numpy.zeros((self.bands, len(values)), numpy.int64)
+        for band, _, chunk in self.iter_lines(chunk_lines):
+            indices = self._lut_indices(chunk).ravel()
+            counts[band] += numpy.bincount(indices, minlength=len(values))
+
+        order = numpy.argsort(values)
+        counts = counts[:, order]
+        values = values[order]
+
+        valid = (values >= self.specials['Min'])
+        valid &= (values <= self.specials['Max'])
+        counts[:, ~valid] = 0
+
+        return self._percentile_ranges(counts, values, values, clip, per_band)
+
+    def _stretch_ranges(self, chunk_lines, clip, per_band):
+        bands = self.bands if per_band else 1
+        minimum = numpy.full(bands, numpy.inf)
+        maximum = numpy.full(bands, -numpy.inf)
+
+        for band, _, chunk in self.iter_lines(chunk_lines):
+            band = band if per_band else 0
+            valid = chunk[self._valid(chunk)]
+            if valid.size:
+                minimum[band] = min(minimum[band], valid.min())
+                maximum[band] = max(maximum[band], valid.max())
+
+        empty = minimum > maximum
+        minimum[empty] = 0
+        maximum[empty] = 0
+        if clip is None:
+            return self._expand_ranges(list(zip(minimum, maximum)), per_band)
+
+        counts = numpy.zeros((bands, self.HISTOGRAM_BINS), numpy.int64)
+        for band, _, chunk in self.iter_lines(chunk_lines):
+            band = band if per_band else 0
+            counts[band] += numpy.histogram(
+                chunk[self._valid(chunk)], self.HISTOGRAM_BINS,
+                (minimum[band], maximum[band])
+            )[0]
+
+        ranges = []
+        for band in range(bands):
+            edges = numpy.linspace(
+                minimum[band], maximum[band], self.HISTOGRAM_BINS + 1
+            )
+            ranges += self._percentile_ranges(
+                counts[band:band + 1], edges[:-1], edges[1:], clip, True
+            )
+        return self._expand_ranges(ranges, per_band)
+
+    def _percentile_ranges(self, counts, lows, highs, clip, per_band):
+        """Find the stretch range of histograms of each band.
+
+        ``lows`` and ``highs`` are the lower and upper bounds of the values
+        counted by each bin of ``counts``.
+        """
+        if not per_band:
+            counts = counts.sum(axis=0, keepdims=True)
+
+        low_percentile, high_percentile = clip or (0, 100)
+        ranges = []
+        for band_counts in counts:
+            cumulative = numpy.cumsum(band_counts)
+            total = cumulative[-1]
+            if total == 0:
+                ranges.append((0, 0))
+                continue
+
+            low = numpy.searchsorted(
+                cumulative, total * low_percentile / 100.0, 'right'
+            )
+            high = numpy.searchsorted(
+                cumulative, total * high_percentile / 100.0, 'left'
+            )
+            last = len(cumulative) - 1
+            ranges.append((lows[min(low, last)], highs[min(high, last)]))
+
+        return self._expand_ranges(ranges, per_band)
+
+    def _expand_ranges(self, ranges, per_band):
+        return ranges if per_band else ranges * self.bands
+
+    def _valid(self, chunk):
+        return (chunk >= self.specials['Min']) & (chunk <= self.specials['Max'])
+
+    def _stretch(self, chunk, low, high, out):
+        """Linearly stretch ``chunk`` from ``low``-``high`` to ``0``-``255``."""
+        # Integer pixel ranges can overflow their own type when subtracted
+        low, high = numpy.float64(low), numpy.float64(high)
+        scale = 255.0 / (high - low) if high > low else 0.0
+        with numpy.errstate(over='ignore', invalid='ignore'):
+            stretched = (chunk - low) * scale
+            numpy.clip(stretched, 0, 255, out=stretched)
+        out[...] = stretched
+
+        low, high, null = self._special_masks(chunk)
+        high |= chunk == self.specials['His']
+        high |= chunk == self.specials['Hrs']
+        out[low | null] = 0
+        out[high] = 255
 
     @property
     def _decoder(self):
         if self.format == 'BandSequential':
-            return BandSequentialDecoder(self.dtype, self.shape)
+            return BandSequentialDecoder(
+                self.file_dtype, self.shape, self.compression,
+                byteorder=self.byteorder
+            )
 
         if self.format == 'Tile':
-            return TileDecoder(self.dtype, self.shape, self.tile_shape)
+            return TileDecoder(
+                self.file_dtype, self.shape, self.tile_shape,
+                cache=self.tile_cache, cache_key=self._tile_cache_key,
+                compression=self.compression, byteorder=self.byteorder
+            )
 
         raise ValueError('Unkown format (%s)' % self.format)
@@ -1,48 +1,810 @@
+import io
+import os
 import numpy
 from six.moves import range
 
+from .stats import CountingReader
 
-class BandSequentialDecoder(object):
-    def __init__(self, dtype, shape, compression=None):
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # pragma: no cover
+    ThreadPoolExecutor = None
+
+
+#: Maximum number of bytes requested from a stream by a single read.  Reads
+#: of compressed streams allocate a temporary buffer of the requested size.
+READ_BLOCK_BYTES = 256 * 1024
+
+
+def _read_array(stream, dtype, count, swap=False):
+    """Read ``count`` items of ``dtype`` from ``stream`` into a new array."""
+    return _read_into(stream, numpy.empty(count, dtype), swap)
+
+
+def _read_into(stream, data, swap=False):
+    """Fill the array ``data`` with bytes read from ``stream``.
+
+    The bytes are read directly into ``data`` in blocks of at most
+    ``READ_BLOCK_BYTES`` so that decompressing streams never hold more than
+    one block in addition to the output array.  With ``swap`` the bytes of
+    each item are swapped in place as each block is read, while the block
+    is still in cache.
+    """
+    if not data.flags.c_contiguous:
+        data[...] = _read_array(stream, data.dtype, data.shape, swap)
+        return data
+
+    items = data.reshape(-1)
+    view = memoryview(items.view(numpy.uint8))
+    pos = swapped = 0
+    while pos < len(view):
+        read = stream.readinto(view[pos:pos + READ_BLOCK_BYTES])
+        if not read:
+            raise ValueError('Unexpected end of image data')
+        pos += read
+        if swap:
+            count = pos // data.itemsize
+            items[swapped:count].byteswap(inplace=True)
+            swapped = count
+    return data
+
+
+class PositionalReader(object):
+    """A read only file like object using positional reads on a descriptor.
+
+    Each reader keeps its own position and never moves the position of the
+    underlying file, so many readers can share one descriptor across
+    threads.
+    """
+
+    def __init__(self, fileno, position=0):
+        self.fileno = fileno
+        self.position = position
+
+    @staticmethod
+    def supported():
+        """Whether positional reads are supported on this platform."""
+        return hasattr(os, 'pread')
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += os.fstat(self.fileno).st_size
+        self.position = offset
+        return offset
+
+    def read(self, size):
+        data = os.pread(self.fileno, size, self.position)
+        self.position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        if hasattr(os, 'preadv'):
+            read = os.preadv(self.fileno, [buffer], self.position)
+        else:
+            data = os.pread(self.fileno, len(buffer), self.position)
+            read = len(data)
+            buffer[:read] = data
+        self.position += read
+        return read
+
+
+def _positional_reader(stream):
+    """A positional reader sharing the file descriptor of ``stream``.
+
+    Reads of a :class:`~planetaryimage.stats.CountingReader` stream are
+    still counted, towards the phases active when the reader was made.
+    """
+    reader = PositionalReader(stream.fileno())
+    if isinstance(stream, CountingReader):
+        reader = stream.wrap(reader)
+    return reader
+
+
+def _index_range(index, length):
+    """Convert a single axis index into a ``(start, stop, post)`` range.
+
+    ``start`` and ``stop`` bound the pixels that need to be read and ``post``
+    is an index into the read pixels that gives the requested result.
+    """
+    if isinstance(index, slice):
+        indices = range(*index.indices(length))
+        if len(indices) == 0:
+            return 0, 0, slice(0, 0)
+
+        first, last = indices[0], indices[-1]
+        start = min(first, last)
+        end = last - start + (1 if indices.step > 0 else -1)
+        if end < 0:
+            end = None
+        return start, max(first, last) + 1, slice(first - start, end, indices.step)
+
+    index = int(index)
+    if index < 0:
+        index += length
+    if not 0 <= index < length:
+        raise IndexError('index %d is out of bounds' % index)
+    return index, index + 1, 0
+
+
+def _tile_spans(tile_shape, lines, samples):
+    """Yield the tile rows intersecting a window of lines and samples.
+
+    For each row of tiles yields ``(row, top, bottom, columns, line,
+    sample)`` where ``top:bottom`` are the window lines covered by the row,
+    ``columns`` is the slice of tile columns needed and ``line``/``sample``
+    are the offsets of the window within that strip of tiles.
+    """
+    tile_lines, tile_samples = tile_shape
+    line_start, line_stop = lines
+    sample_start, sample_stop = samples
+    if line_start >= line_stop or sample_start >= sample_stop:
+        return
+
+    col_start = sample_start // tile_samples
+    col_stop = (sample_stop - 1) // tile_samples + 1
+    columns = slice(col_start, col_stop)
+    sample = sample_start - col_start * tile_samples
+
+    for row in range(line_start // tile_lines, (line_stop - 1) // tile_lines + 1):
+        top = max(line_start, row * tile_lines)
+        bottom = min(line_stop, (row + 1) * tile_lines)
+        yield row, top, bottom, columns, top - row * tile_lines, sample
+
+
+def _copy_tiles(dest, tiles, line, sample):
+    """Copy pixels from a strip of tiles into ``dest``.
+
+    ``tiles`` has the shape ``(count, tile_lines, tile_samples)`` and
+    ``line``/``sample`` give the offset of ``dest`` within the strip.
+    Whole tiles are copied with a single transposed assignment.
+    """
+    lines, samples = dest.shape
+    tile_samples = tiles.shape[2]
+    tiles = tiles[:, line:line + lines]
+    index, offset = divmod(sample, tile_samples)
+    pos = 0
+
+    if offset:
+        pos = min(tile_samples - offset, samples)
+        dest[:, :pos] = tiles[index, :, offset:offset + pos]
+        index += 1
+
+    count = (samples - pos) // tile_samples
+    if count:
+        end = pos + count * tile_samples
+        block = dest[:, pos:end].reshape((lines, count, tile_samples))
+        block[...] = tiles[index:index + count].transpose((1, 0, 2))
+        index += count
+        pos = end
+
+    if pos < samples:
+        dest[:, pos:] = tiles[index, :, :samples - pos]
+
+
+class TiledArray(object):
+    """A lazy, read-only array over tiled pixel data.
+
+    Pixels are only copied out of ``tiles`` when indexed, so wrapping a
+    :class:`numpy.memmap` only faults in the tiles that are touched. Use
+    ``numpy.asarray`` to load the whole array.
+    """
+
+    ndim = 3
+
+    def __init__(self, tiles, shape):
+        #: Tile data with the shape ``(bands, rows, columns, lines, samples)``
+        self.tiles = tiles
+        self.shape = tuple(shape)
+
+    @property
+    def dtype(self):
+        return self.tiles.dtype
+
+    @property
+    def size(self):
+        bands, lines, samples = self.shape
+        return bands * lines * samples
+
+    @property
+    def tile_shape(self):
+        return self.tiles.shape[3:]
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None):
+        data = self[:, :, :]
+        if dtype is not None:
+            data = data.astype(dtype, copy=False)
+        return data
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+
+        if len(key) > self.ndim or any(k is Ellipsis for k in key):
+            return numpy.asarray(self)[key]
+
+        key = key + (slice(None),) * (self.ndim - len(key))
+        bands, lines, samples = [
+            _index_range(k, n) for k, n in zip(key, self.shape)
+        ]
+        data = self._read(bands[:2], lines[:2], samples[:2])
+        return data[bands[2], lines[2], samples[2]]
+
+    def _read(self, bands, lines, samples):
+        data = numpy.empty(_window_shape(bands, lines, samples), self.dtype)
+
+        for index, band in enumerate(range(*bands)):
+            spans = _tile_spans(self.tile_shape, lines, samples)
+            for row, top, bottom, columns, line, sample in spans:
+                dest = data[index, top - lines[0]:bottom - lines[0]]
+                _copy_tiles(dest, self.tiles[band, row, columns], line, sample)
+
+        return data
+
+
+def _window_shape(bands, lines, samples):
+    return tuple(stop - start for start, stop in (bands, lines, samples))
+
+
+class Decoder(object):
+    """Common streaming access for decoders implementing ``read_window``.
+
+    :param dtype: the type of the stored pixels
+    :param shape: the ``(bands, lines, samples)`` shape of the image
+    :param compression: the compression of the stream, if any
+    :param byteorder: ``'file'`` to decode pixels in the byte order they
+        are stored in or ``'native'`` to swap them to the native byte
+        order as they are read.  Memory mapped pixels are never swapped.
+    """
+
+    #: Target size in bytes of the chunks yielded by :meth:`iter_lines`.
+    CHUNK_BYTES = 4 * 1024 * 1024
+
+    #: The supported ``byteorder`` options.
+    BYTE_ORDERS = ('file', 'native')
+
+    def __init__(self, dtype, shape, compression=None, byteorder='file'):
+        if byteorder not in self.BYTE_ORDERS:
+            raise ValueError('Unsupported byte order (%s)' % byteorder)
+        dtype = numpy.dtype(dtype)
+
+        #: The type of the stored pixels.
+        self.file_dtype = dtype
+
+        #: The type of the decoded pixels.
         self.dtype = dtype
+        if byteorder == 'native':
+            self.dtype = dtype.newbyteorder('=')
+
         self.shape = shape
         self.compression = compression
+        self.byteorder = byteorder
 
     @property
-    def size(self):
-        return numpy.product(self.shape)
+    def swap(self):
+        """Whether the bytes of decoded pixels are swapped."""
+        return self.dtype != self.file_dtype
+
+    def chunk_lines(self, chunk_lines=None):
+        """Number of lines to read per chunk.
+
+        Defaults to about ``CHUNK_BYTES`` of lines, never less than one.
+        """
+        if chunk_lines is None:
+            line_bytes = self.shape[2] * self.dtype.itemsize
+            chunk_lines = self.CHUNK_BYTES // max(line_bytes, 1)
+        return max(1, min(chunk_lines, self.shape[1]))
+
+    def iter_lines(self, stream, chunk_lines=None):
+        """Iterate over chunks of lines reusing a single buffer.
 
-    def decode(self, stream):
+        ``stream`` must be positioned at the start of the pixel data.
+        Yields ``(band, line, chunk)`` where ``chunk`` is a view of the
+        buffer holding up to ``chunk_lines`` lines starting at ``line``.
+        The buffer is overwritten by each iteration.
+        """
+        chunk_lines = self.chunk_lines(chunk_lines)
+        buffer = numpy.empty((1, chunk_lines, self.shape[2]), self.dtype)
+        offset = stream.tell()
+
+        for band, line, stop in self._chunks(chunk_lines):
+            chunk = self._read_chunk(
+                stream, offset, band, line, stop, buffer[:, :stop - line]
+            )
+            yield band, line, chunk[0]
+
+    def decode_parallel(self, stream, workers):
+        """Decode using a pool of ``workers`` threads.
+
+        ``stream`` must be an uncompressed file positioned at the start of
+        the pixel data.  The image is split into chunks of lines of each
+        band (rows of tiles for tiled images) which the threads read with
+        positional reads into disjoint parts of the output array.
+        """
+        data = numpy.empty(self.shape, self.dtype)
+        offset = stream.tell()
+
+        def decode_chunk(reader, band, line, stop):
+            out = data[band:band + 1, line:stop]
+            self._read_chunk(reader, offset, band, line, stop, out)
+
+        with ThreadPoolExecutor(workers) as pool:
+            chunks = self._chunks(self.chunk_lines())
+            futures = [
+                pool.submit(decode_chunk, _positional_reader(stream), *chunk)
+                for chunk in chunks
+            ]
+            for future in futures:
+                future.result()
+
+        return data
+
+    def _can_decode_parallel(self, stream, workers):
+        if not workers or workers < 2 or ThreadPoolExecutor is None:
+            return False
         if self.compression:
-            data = numpy.fromstring(stream.read(self.size*4), self.dtype)
-        else:
-            data = numpy.fromfile(stream, self.dtype, self.size)
+            return False
+        if not PositionalReader.supported():
+            return False
+        try:
+            stream.fileno()
+        except (AttributeError, io.UnsupportedOperation, OSError):
+            return False
+        return True
+
+    def _chunks(self, chunk_lines):
+        bands, lines, _ = self.shape
+        for band in range(bands):
+            for line in range(0, lines, chunk_lines):
+                yield band, line, min(line + chunk_lines, lines)
+
+    def _read_chunk(self, stream, offset, band, line, stop, out):
+        return self.read_window(
+            stream, (band, band + 1), (line, stop), (0, self.shape[2]),
+            out=out, offset=offset
+        )
+
+
+class BandSequentialDecoder(Decoder):
+    @property
+    def size(self):
+        return int(numpy.prod(self.shape))
+
+    def decode(self, stream, workers=None):
+        """Decode the image reading directly into the output array.
+
+        With ``workers`` uncompressed images are decoded by a pool of
+        threads.
+        """
+        if self._can_decode_parallel(stream, workers):
+            return self.decode_parallel(stream, workers)
+
+        data = _read_array(stream, self.dtype, self.size, self.swap)
         return data.reshape(self.shape)
 
+    def read_window(self, stream, bands, lines, samples, out=None,
+                    offset=None):
+        """Read a window of pixels, seeking to each line in the window.
 
-class TileDecoder(object):
-    def __init__(self, dtype, shape, tile_shape):
-        self.dtype = dtype
-        self.shape = shape
+        ``bands``, ``lines`` and ``samples`` are ``(start, stop)`` ranges
+        and ``offset`` is the position of the pixel data in ``stream``,
+        defaulting to the current position.  Full width windows are read a
+        band at a time.
+        """
+        _, total_lines, total_samples = self.shape
+        itemsize = self.dtype.itemsize
+        base = stream.tell() if offset is None else offset
+
+        if out is None:
+            out = numpy.empty(_window_shape(bands, lines, samples), self.dtype)
+
+        for index, band in enumerate(range(*bands)):
+            if samples == (0, total_samples):
+                offset = (band * total_lines + lines[0]) * total_samples
+                stream.seek(base + offset * itemsize)
+                _read_into(stream, out[index], self.swap)
+                continue
+
+            for line_index, line in enumerate(range(*lines)):
+                offset = (band * total_lines + line) * total_samples
+                stream.seek(base + (offset + samples[0]) * itemsize)
+                _read_into(stream, out[index, line_index], self.swap)
+
+        return out
+
+    def memmap(self, fp, offset):
+        """Memory map the pixel data of ``fp`` starting at byte ``offset``."""
+        return numpy.memmap(fp, self.file_dtype, 'r', offset, self.shape)
+
+
+class LineRecordDecoder(BandSequentialDecoder):
+    """Band sequential pixels stored in records with line prefix and suffix.
+
+    Each line is a record of ``prefix_bytes`` bytes, the pixels of the line
+    and ``suffix_bytes`` bytes.  Records are read as a structured array of
+    :attr:`record_dtype` in a single read and the pixels are returned as a
+    strided view of its ``pixels`` field, so lines are never copied out
+    one at a time, and the ``prefix`` and ``suffix`` fields hold the other
+    bytes of each line.  With ``contiguous`` whole images are instead
+    decoded a chunk of lines at a time into a C contiguous array.
+    """
+
+    def __init__(self, dtype, shape, prefix_bytes=0, suffix_bytes=0,
+                 compression=None, contiguous=False, byteorder='file'):
+        super(LineRecordDecoder, self).__init__(
+            dtype, shape, compression, byteorder
+        )
+        self.prefix_bytes = prefix_bytes
+        self.suffix_bytes = suffix_bytes
+        self.contiguous = contiguous
+
+        #: The structured type of a decoded line record.
+        self.record_dtype = self._record_dtype(self.dtype)
+
+    def _record_dtype(self, dtype):
+        return numpy.dtype([
+            ('prefix', numpy.uint8, (self.prefix_bytes,)),
+            ('pixels', dtype, (self.shape[2],)),
+            ('suffix', numpy.uint8, (self.suffix_bytes,)),
+        ])
+
+    def decode(self, stream, workers=None):
+        """Decode the image as a view of its line records.
+
+        The records are read with a single read so ``workers`` is not used.
+        """
+        if self.contiguous:
+            return self._decode_contiguous(stream)
+        return self.decode_records(stream)['pixels']
+
+    def _decode_contiguous(self, stream):
+        data = numpy.empty(self.shape, self.dtype)
+        offset = stream.tell()
+        for band, line, stop in self._chunks(self.chunk_lines()):
+            out = data[band:band + 1, line:stop]
+            self._read_chunk(stream, offset, band, line, stop, out)
+        return data
+
+    def decode_records(self, stream):
+        """Read the line records of every band into a new array."""
+        bands, lines, _ = self.shape
+        records = _read_array(
+            stream, self.record_dtype, bands * lines, self.swap
+        )
+        return records.reshape((bands, lines))
+
+    def records(self, pixels):
+        """The line records that ``pixels`` decoded by this decoder view.
+
+        Returns ``None`` if ``pixels`` is not a view of whole records.
+        """
+        base = pixels.base
+        bands, lines, _ = self.shape
+        if not isinstance(base, numpy.ndarray):
+            return None
+        if base.dtype.fields is None or base.size != bands * lines:
+            return None
+        if base.dtype.fields['pixels'][0].base != pixels.dtype:
+            return None
+        return base.reshape((bands, lines))
+
+    def read_window(self, stream, bands, lines, samples, out=None,
+                    offset=None):
+        """Read a window of pixels reading the records of its lines.
+
+        The records of the lines of each band are read with a single read
+        and, unless ``out`` is given, the window is a view of them.
+        """
+        total_lines = self.shape[1]
+        base = stream.tell() if offset is None else offset
+
+        records = numpy.empty(
+            _window_shape(bands, lines, (0, 0))[:2], self.record_dtype
+        )
+        for index, band in enumerate(range(*bands)):
+            position = band * total_lines + lines[0]
+            stream.seek(base + position * self.record_dtype.itemsize)
+            _read_into(stream, records[index], self.swap)
+
+        window = records['pixels'][:, :, samples[0]:samples[1]]
+        if out is None:
+            return window
+        out[...] = window
+        return out
+
+    def memmap(self, fp, offset):
+        """Memory map the line records of ``fp`` starting at byte ``offset``.
+
+        Returns a view of the pixels of the mapped records.
+        """
+        records = numpy.memmap(
+            fp, self._record_dtype(self.file_dtype), 'r', offset,
+            self.shape[:2]
+        )
+        return records['pixels']
+
+
+class InterleavedDecoder(Decoder):
+    """Pixels interleaved by line (BIL) or by sample (BIP).
+
+    Line interleaved pixels are stored with the shape ``(lines, bands,
+    samples)`` and sample interleaved pixels with the shape ``(lines,
+    samples, bands)``.  Images are read in a single read and returned as a
+    transposed view of the stored pixels with the shape ``(bands, lines,
+    samples)``, or with ``contiguous`` decoded a chunk of lines at a time
+    into a C contiguous array.
+
+    :param interleave: ``'line'`` or ``'sample'``
+    """
+
+    #: Axes of the stored pixels in ``(bands, lines, samples)`` order.
+    AXES = {
+        'line': (1, 0, 2),
+        'sample': (2, 0, 1),
+    }
+
+    def __init__(self, dtype, shape, interleave, compression=None,
+                 contiguous=False, byteorder='file'):
+        if interleave not in self.AXES:
+            raise ValueError('Unsupported interleave (%s)' % interleave)
+        super(InterleavedDecoder, self).__init__(
+            dtype, shape, compression, byteorder
+        )
+        self.interleave = interleave
+        self.contiguous = contiguous
+
+    @property
+    def stored_shape(self):
+        """The shape of the pixels as stored."""
+        bands, lines, samples = self.shape
+        if self.interleave == 'line':
+            return (lines, bands, samples)
+        return (lines, samples, bands)
+
+    def decode(self, stream, workers=None):
+        """Decode the image as a view of the stored pixels.
+
+        The pixels are read with a single read so ``workers`` is not used.
+        """
+        if self.contiguous:
+            return self._decode_contiguous(stream)
+        size = int(numpy.prod(self.shape))
+        data = _read_array(stream, self.dtype, size, self.swap)
+        return self._view(data.reshape(self.stored_shape))
+
+    def _decode_contiguous(self, stream):
+        bands, lines, samples = self.shape
+        data = numpy.empty(self.shape, self.dtype)
+        offset = stream.tell()
+
+        # Read every band of a chunk of lines at once to read sequentially
+        chunk_lines = self.chunk_lines()
+        for line in range(0, lines, chunk_lines):
+            stop = min(line + chunk_lines, lines)
+            self.read_window(
+                stream, (0, bands), (line, stop), (0, samples),
+                out=data[:, line:stop], offset=offset
+            )
+        return data
+
+    def chunk_lines(self, chunk_lines=None):
+        """Number of lines of every band to read per chunk.
+
+        Defaults to about ``CHUNK_BYTES`` of lines across all bands, never
+        less than one.
+        """
+        if chunk_lines is None:
+            line_bytes = self.shape[0] * self.shape[2] * self.dtype.itemsize
+            chunk_lines = self.CHUNK_BYTES // max(line_bytes, 1)
+        return super(InterleavedDecoder, self).chunk_lines(chunk_lines)
+
+    def iter_lines(self, stream, chunk_lines=None):
+        """Iterate over chunks of lines reusing a single buffer.
+
+        As the bands of a line are stored together, each chunk of lines is
+        read once for all bands and its bands are yielded in turn, so
+        chunks are yielded in line order and then band order rather than
+        band by band.  The buffer holds ``chunk_lines`` lines of every band
+        and is overwritten by each chunk of lines.
+        """
+        bands, lines, samples = self.shape
+        chunk_lines = self.chunk_lines(chunk_lines)
+        buffer = numpy.empty((bands, chunk_lines, samples), self.dtype)
+        offset = stream.tell()
+
+        for line in range(0, lines, chunk_lines):
+            stop = min(line + chunk_lines, lines)
+            chunk = self.read_window(
+                stream, (0, bands), (line, stop), (0, samples),
+                out=buffer[:, :stop - line], offset=offset
+            )
+            for band in range(bands):
+                yield band, line, chunk[band]
+
+    def read_window(self, stream, bands, lines, samples, out=None,
+                    offset=None):
+        """Read a window of pixels, reading the lines it intersects.
+
+        ``bands``, ``lines`` and ``samples`` are ``(start, stop)`` ranges
+        and ``offset`` is the position of the pixel data in ``stream``,
+        defaulting to the current position.  Windows of whole lines are
+        read with a single read, otherwise each line is read from its first
+        to its last row of the window.  Unless ``out`` is given the window
+        is a view of the pixels read.
+        """
+        base = stream.tell() if offset is None else offset
+        itemsize = self.dtype.itemsize
+
+        # Each stored line holds rows of columns
+        rows, columns = bands, samples
+        if self.interleave == 'sample':
+            rows, columns = samples, bands
+        _, line_rows, line_columns = self.stored_shape
+        line_size = line_rows * line_columns
+
+        block = numpy.empty(
+            (lines[1] - lines[0], rows[1] - rows[0], line_columns), self.dtype
+        )
+        if rows == (0, line_rows):
+            stream.seek(base + lines[0] * line_size * itemsize)
+            _read_into(stream, block, self.swap)
+        else:
+            for index, line in enumerate(range(*lines)):
+                position = line * line_size + rows[0] * line_columns
+                stream.seek(base + position * itemsize)
+                _read_into(stream, block[index], self.swap)
+
+        window = self._view(block[:, :, columns[0]:columns[1]])
+        if out is None:
+            return window
+        out[...] = window
+        return out
+
+    def memmap(self, fp, offset):
+        """Memory map the pixels of ``fp`` starting at byte ``offset``.
+
+        Returns a transposed view of the mapped pixels.
+        """
+        data = numpy.memmap(
+            fp, self.file_dtype, 'r', offset, self.stored_shape
+        )
+        return self._view(data)
+
+    def _view(self, stored):
+        return stored.transpose(self.AXES[self.interleave])
+
+
+class TileDecoder(Decoder):
+    def __init__(self, dtype, shape, tile_shape, cache=None, cache_key=None,
+                 compression=None, byteorder='file'):
+        super(TileDecoder, self).__init__(dtype, shape, compression, byteorder)
         self.tile_shape = tile_shape
 
-    def decode(self, stream):
+        #: An optional :class:`~planetaryimage.cache.TileCache` used by
+        #: windowed reads, tiles are stored under ``(cache_key, band, row,
+        #: column)``.
+        self.cache = cache
+        self.cache_key = cache_key
+
+    @property
+    def tile_counts(self):
+        """Number of tile rows and columns."""
+        _, lines, samples = self.shape
+        tile_lines, tile_samples = self.tile_shape
+        return (-(-lines // tile_lines), -(-samples // tile_samples))
+
+    def decode(self, stream, workers=None):
+        """Decode the image reading a whole row of tiles at a time.
+
+        With ``workers`` the rows of tiles are decoded by a pool of threads.
+        Decoding the whole image bypasses the tile cache.
+        """
+        if self.cache is not None:
+            decoder = TileDecoder(
+                self.file_dtype, self.shape, self.tile_shape,
+                compression=self.compression, byteorder=self.byteorder
+            )
+            return decoder.decode(stream, workers)
+
+        if self._can_decode_parallel(stream, workers):
+            return self.decode_parallel(stream, workers)
+
         bands, lines, samples = self.shape
+        return self.read_window(stream, (0, bands), (0, lines), (0, samples))
+
+    def read_window(self, stream, bands, lines, samples, out=None,
+                    offset=None):
+        """Read a window of pixels, only reading the tiles it intersects.
+
+        ``bands``, ``lines`` and ``samples`` are ``(start, stop)`` ranges
+        and ``offset`` is the position of the pixel data in ``stream``,
+        defaulting to the current position.  Each row of intersecting tiles
+        is read with a single read, or when using a cache each run of
+        uncached tiles.
+        """
+        base = stream.tell() if offset is None else offset
+
+        if out is None:
+            out = numpy.empty(_window_shape(bands, lines, samples), self.dtype)
+
+        for index, band in enumerate(range(*bands)):
+            spans = _tile_spans(self.tile_shape, lines, samples)
+            for row, top, bottom, columns, line, sample in spans:
+                if self.cache is None:
+                    tiles = self._read_strip(stream, base, band, row, columns)
+                else:
+                    tiles = self._cached_strip(stream, base, band, row, columns)
+                dest = out[index, top - lines[0]:bottom - lines[0]]
+                _copy_tiles(dest, tiles, line, sample)
+
+        return out
+
+    def _read_strip(self, stream, base, band, row, columns):
+        rows, cols = self.tile_counts
         tile_lines, tile_samples = self.tile_shape
-        tile_size = tile_lines * tile_samples
-        data = numpy.empty(self.shape, dtype=self.dtype)
+        tile_bytes = tile_lines * tile_samples * self.dtype.itemsize
 
-        for band in data:
-            for line in range(0, lines, tile_lines):
-                for sample in range(0, samples, tile_samples):
-                    sample_end = sample + tile_samples
-                    line_end = line + tile_lines
-                    chunk = band[line:line_end, sample:sample_end]
+        offset = (band * rows + row) * cols + columns.start
+        stream.seek(base + offset * tile_bytes)
+        return self._read_tiles(stream, columns.stop - columns.start)
 
-                    tile = numpy.fromfile(stream, self.dtype, tile_size)
-                    tile = tile.reshape((tile_lines, tile_samples))
+    def _cached_strip(self, stream, base, band, row, columns):
+        shape = (columns.stop - columns.start,) + tuple(self.tile_shape)
+        tiles = numpy.empty(shape, self.dtype)
+        missing = []
 
-                    chunk_lines, chunk_samples = chunk.shape
-                    chunk[:] = tile[:chunk_lines, :chunk_samples]
+        for index, column in enumerate(range(columns.start, columns.stop)):
+            tile = self.cache.get((self.cache_key, band, row, column))
+            if tile is None:
+                missing.append(index)
+            else:
+                tiles[index] = tile
 
-        return data
+        # Read each run of consecutive missing tiles with a single read
+        runs = []
+        for index in missing:
+            if runs and runs[-1][1] == index:
+                runs[-1][1] = index + 1
+            else:
+                runs.append([index, index + 1])
+
+        for start, stop in runs:
+            run = slice(columns.start + start, columns.start + stop)
+            tiles[start:stop] = self._read_strip(stream, base, band, row, run)
+            for index in range(start, stop):
+                column = columns.start + index
+                self.cache.put((self.cache_key, band, row, column), tiles[index])
+
+        return tiles
+
+    def chunk_lines(self, chunk_lines=None):
+        """Number of lines to read per chunk rounded up to whole tile rows."""
+        tile_lines = self.tile_shape[0]
+        if chunk_lines is None:
+            chunk_lines = tile_lines
+        chunk_lines = -(-chunk_lines // tile_lines) * tile_lines
+        return min(chunk_lines, self.shape[1])
+
+    def _read_tiles(self, stream, count):
+        tile_lines, tile_samples = self.tile_shape
+        tiles = _read_array(
+            stream, self.dtype, count * tile_lines * tile_samples, self.swap
+        )
+        return tiles.reshape((count, tile_lines, tile_samples))
+
+    def memmap(self, fp, offset):
+        """Lazily map the tiles of ``fp`` starting at byte ``offset``.
+
+        Returns a :class:`TiledArray` over a :class:`numpy.memmap` of the
+        tiles.
+        """
+        shape = (self.shape[0],) + self.tile_counts + tuple(self.tile_shape)
+        tiles = numpy.memmap(fp, self.file_dtype, 'r', offset, shape)
+        return TiledArray(tiles, self.shape)
@@ -1,17 +1,97 @@
 # -*- coding: utf-8 -*-
+import io
 import os
-import gzip
-import bz2
+import contextlib
+import functools
+import threading
+import weakref
 import six
-import pvl
+from six.moves import range
 import numpy
 
+from .decoders import Decoder, PositionalReader, _index_range
+
+
+class _NoPhase(object):
+    """The phase context of images opened without statistics."""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_no_phase = _NoPhase()
+
+
+def _phase(stats, name):
+    """Record the phase ``name`` in ``stats`` if given."""
+    if stats is None:
+        return _no_phase
+    return stats.phase(name)
+
+
+def _open_file(filename, gzip_index=False, workers=None):
+    """Open ``filename`` for reading, decompressing ``.gz`` and ``.bz2``.
+
+    Gzip files are opened for random access when ``gzip_index`` is set and
+    bzip2 files are decompressed by ``workers`` threads.  Returns the
+    opened file and its compression type.  The compression modules are
+    only imported when a compressed file is opened.
+    """
+    if filename.endswith('.gz'):
+        if gzip_index:
+            from .compression import open_indexed_gzip
+            return open_indexed_gzip(filename), 'gz'
+        import gzip
+        return gzip.open(filename, 'rb'), 'gz'
+    if filename.endswith('.bz2'):
+        from .compression import open_bz2
+        return open_bz2(filename, workers), 'bz2'
+    return open(filename, 'rb'), None
+
+
+#: Number of threads of the default executor of the asynchronous methods.
+ASYNC_WORKERS = 8
+
+_async_executor = None
+_async_executor_lock = threading.Lock()
+
+
+def _default_executor():
+    """The executor shared by asynchronous calls given no executor."""
+    global _async_executor
+    with _async_executor_lock:
+        if _async_executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _async_executor = ThreadPoolExecutor(ASYNC_WORKERS)
+        return _async_executor
+
+
+def _run_async(executor, func, *args, **kwargs):
+    """Run ``func`` in ``executor`` returning an asyncio future."""
+    import asyncio
+    get_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+    return get_loop().run_in_executor(
+        executor or _default_executor(),
+        functools.partial(func, *args, **kwargs)
+    )
+
 
 class PlanetaryImage(object):
     """A generic image reader. """
 
+    #: Maximum number of bytes read at a time while looking for the label end.
+    LABEL_LINE_LIMIT = 64 * 1024
+
+    #: Approximate number of bytes per chunk of :meth:`to_dask` arrays.
+    DASK_CHUNK_BYTES = 32 * 1024 * 1024
+
     @classmethod
-    def open(cls, filename):
+    def open(cls, filename, mmap=False, load_data=True, workers=None,
+             tile_cache=None, gzip_index=False, label_cache=None, stats=None,
+             contiguous=False, byteorder='file'):
         """ Read an image file from disk
 
         Parameters
@@ -19,24 +99,121 @@ class PlanetaryImage(object):
         filename : string
             Name of file to read as an image file.  This file may be gzip
             (``.gz``) or bzip2 (``.bz2``) compressed.
+
+        mmap : bool
+            Memory map the pixel data instead of reading it into memory.
+            Pages are only read from disk when pixels are accessed.  Not
+            supported for compressed images.
+
+        load_data : bool
+            Read the pixel data while opening the image.  If ``False`` only
+            the label is read and the pixel data is loaded on first access
+            of ``data``.
+
+        workers : int
+            Number of threads used to decode uncompressed pixel data or to
+            decompress the blocks of bzip2 compressed images.
+
+        tile_cache : TileCache
+            A cache of tiles used by windowed reads of tiled images.  The
+            same cache may be shared between images.
+
+        gzip_index : bool
+            Keep an index of seek points into gzip compressed images so
+            windowed reads only decompress from the nearest seek point.  The
+            index is saved to a ``.gzidx`` sidecar file when the optional
+            ``indexed_gzip`` package is installed.
+
+        label_cache : LabelCache
+            A persistent cache of parsed labels.  The label is taken from
+            the cache if the file is unchanged since it was cached, and is
+            added to the cache otherwise.
+
+        stats : IOStats
+            Statistics to record the time and reads of each phase of
+            opening the image, and of later reads of its pixels, in.
+
+        contiguous : bool
+            Pixels stored interleaved by line or sample, or in records with
+            line prefix or suffix bytes, are read in one read and ``data``
+            is a strided view of them.  If set they are instead copied a
+            chunk of lines at a time into a C contiguous ``data`` array.
+
+        byteorder : string
+            ``'file'`` to keep the pixels in the byte order they are stored
+            in, or ``'native'`` to swap them in place as they are read so
+            ``data`` and windows are native arrays.  Memory mapped pixels
+            keep the byte order of the file.
         """
-        if filename.endswith('.gz'):
-            fp = gzip.open(filename, 'rb')
-            try:
-                return cls(fp, filename, compression='gz')
-            finally:
-                fp.close()
-        elif filename.endswith('.bz2'):
-            fp = bz2.BZ2File(filename, 'rb')
+        with _phase(stats, 'open'):
+            label = None
+            if label_cache is not None:
+                label = label_cache.get(filename)
+
+            fp, compression = _open_file(filename, gzip_index, workers)
             try:
-                return cls(fp, filename, compression='bz2')
+                image = cls(
+                    fp, filename, compression=compression, mmap=mmap,
+                    load_data=load_data, workers=workers,
+                    tile_cache=tile_cache, gzip_index=gzip_index, label=label,
+                    stats=stats, contiguous=contiguous, byteorder=byteorder
+                )
             finally:
                 fp.close()
-        else:
-            with open(filename, 'rb') as fp:
-                return cls(fp, filename)
 
-    def __init__(self, stream, filename=None, compression=None):
+            if label_cache is not None and label is None:
+                label_cache.put(filename, image)
+        return image
+
+    @classmethod
+    def aopen(cls, filename, executor=None, **kwargs):
+        """Open an image file without blocking the event loop.
+
+        The file is opened by :meth:`open` in an executor, so the label is
+        parsed, and the data read if ``load_data`` is set, off the event
+        loop.  Awaiting the result gives the image::
+
+            image = await CubeFile.aopen(filename, load_data=False)
+            window = await image.aread_window(lines=slice(0, 256))
+
+        The asynchronous reads share a file handle which stays open until
+        the image is closed, with :meth:`close` or by using the image as a
+        context manager, or is garbage collected::
+
+            with await CubeFile.aopen(filename, load_data=False) as image:
+                window = await image.aread_window(lines=slice(0, 256))
+
+        Parameters
+        ----------
+        filename : string
+            Name of file to read as an image file.
+
+        executor : concurrent.futures.Executor
+            The executor to open the file in, which is also used by the
+            image's asynchronous methods.  A shared pool of
+            ``ASYNC_WORKERS`` threads by default, bounding the number of
+            concurrent reads.
+
+        **kwargs
+            Keyword arguments of :meth:`open`.
+
+        Returns
+        -------
+        asyncio.Future
+            The future image.  Cancelling it before the file is opened
+            prevents it from being opened.
+        """
+        def open_image():
+            image = cls.open(filename, **kwargs)
+            image.executor = executor
+            return image
+
+        return _run_async(executor, open_image)
+
+    def __init__(self, stream, filename=None, compression=None, mmap=False,
+                 load_data=True, workers=None, tile_cache=None,
+                 gzip_index=False, label=None, stats=None, contiguous=False,
+                 byteorder='file'):
         """Create an Image object.
 
         Parameters
@@ -50,6 +227,37 @@ class PlanetaryImage(object):
 
         compression : string
             an optional string that indicate the compression type 'bz2' or 'gz'
+
+        mmap : bool
+            memory map the pixel data rather than reading it into memory
+
+        load_data : bool
+            read the pixel data now rather than on first access of ``data``,
+            which requires ``filename``
+
+        workers : int
+            number of threads used to decode uncompressed pixel data or to
+            decompress bzip2 compressed images
+
+        tile_cache : TileCache
+            a cache of tiles used by windowed reads of tiled images
+
+        gzip_index : bool
+            index seek points of gzip compressed images for windowed reads
+
+        label : dict
+            an already parsed label, in which case the label is not read
+            from ``stream``
+
+        stats : IOStats
+            statistics to record the phases of reading the image in
+
+        contiguous : bool
+            decode interleaved pixels into a C contiguous array rather than
+            returning a strided view of the pixels read
+
+        byteorder : string
+            ``'file'`` or ``'native'``, the byte order to decode pixels in
         """
         if isinstance(stream, six.string_types):
             error_msg = (
@@ -63,17 +271,68 @@ class PlanetaryImage(object):
 
         self.compression = compression
 
+        #: Whether the pixel data is memory mapped.
+        self.mmap = mmap
+
+        #: Number of threads used to decode the pixel data.
+        self.workers = workers
+
+        #: Cache of tiles shared by windowed reads, if any.
+        self.tile_cache = tile_cache
+
+        #: Whether gzip compressed pixel data is read with a seek index.
+        self.gzip_index = gzip_index
+
+        #: Whether interleaved pixel data is decoded into a contiguous array.
+        self.contiguous = contiguous
+
+        if byteorder not in Decoder.BYTE_ORDERS:
+            raise ValueError('Unsupported byte order (%s)' % byteorder)
+
+        #: Byte order pixels are decoded in, ``'file'`` or ``'native'``.
+        self.byteorder = byteorder
+
+        #: Executor of the asynchronous methods, the shared pool if None.
+        self.executor = None
+
+        #: The :class:`~planetaryimage.stats.IOStats` recording reads, if any.
+        self.stats = stats
+        stream = self._wrap(stream)
+
+        self._handle = None
+        self._handle_lock = threading.Lock()
+        self._handle_finalizer = None
+
         # TODO: rename to header and add footer?
         #: The parsed label header in dictionary form.
-        self.label = self._load_label(stream)
+        self.label = self._load_label(stream) if label is None else label
 
-        #: A numpy array representing the image
-        self.data = self._load_data(stream)
+        self._overviews = None
+
+        self._data = None
+        if load_data:
+            self._data = self._load_data(stream)
 
     def __repr__(self):
         # TODO: pick a better repr
         return self.filename
 
+    @property
+    def data(self):
+        """A numpy array representing the image.
+
+        Loaded from disk on first access if the image was opened with
+        ``load_data=False``.
+        """
+        if self._data is None:
+            with contextlib.closing(self._open()) as stream:
+                self._data = self._load_data(stream)
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = data
+
     @property
     def image(self):
         """An Image like array of ``self.data`` convenient for image processing tasks
@@ -90,9 +349,9 @@ class PlanetaryImage(object):
          >>> _ = plt.imshow(image.image, cmap='gray')
         """
         if self.bands == 1:
-            return self.data.squeeze()
+            return numpy.asarray(self.data).squeeze()
         elif self.bands == 3:
-            return numpy.dstack(self.data)
+            return numpy.dstack(numpy.asarray(self.data))
         # TODO: what about multiband images with 2, and 4+ bands?
 
     @property
@@ -124,7 +383,18 @@ class PlanetaryImage(object):
 
     @property
     def dtype(self):
-        """Pixel data type."""
+        """Pixel data type of ``data``.
+
+        The native byte order version of :attr:`file_dtype` if the image
+        was opened with ``byteorder='native'`` and is not memory mapped.
+        """
+        if self.byteorder == 'native' and not self.mmap:
+            return self.file_dtype.newbyteorder('=')
+        return self.file_dtype
+
+    @property
+    def file_dtype(self):
+        """Pixel data type as stored in the file."""
         return self._dtype
 
     @property
@@ -142,22 +412,451 @@ class PlanetaryImage(object):
         """Total number of pixels."""
         return self.bands * self.lines * self.samples
 
+    def read_window(self, bands=None, lines=None, samples=None):
+        """Read a window of the image from disk.
+
+        Only the pixels intersecting the window are read: for tiled images
+        only the intersecting tiles and for band sequential images only the
+        requested part of each line.  Indices follow numpy indexing rules,
+        so integers drop the corresponding axis.
+
+        Parameters
+        ----------
+        bands : slice or int
+            Bands to read, all bands by default.
+
+        lines : slice or int
+            Lines to read, all lines by default.
+
+        samples : slice or int
+            Samples to read, all samples by default.
+
+        Returns
+        -------
+        numpy.ndarray
+            The pixels in the window.
+        """
+        return self._read_window(bands, lines, samples)
+
+    def aread_window(self, bands=None, lines=None, samples=None):
+        """Read a window of the image without blocking the event loop.
+
+        Like :meth:`read_window` but the read runs in the image's executor.
+        Concurrent reads of an uncompressed image share one open file
+        handle using positional reads, rather than each opening the file.
+
+        Returns
+        -------
+        asyncio.Future
+            The future pixels of the window.  Cancelling it before the read
+            starts prevents it from being read.
+        """
+        return _run_async(
+            self.executor, self._read_window, bands, lines, samples,
+            shared=True
+        )
+
+    def close(self):
+        """Close the file handle shared by :meth:`aread_window`, if open."""
+        with self._handle_lock:
+            if self._handle_finalizer is not None:
+                self._handle_finalizer()
+                self._handle_finalizer = None
+                self._handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def _read_window(self, bands, lines, samples, shared=False):
+        index = tuple(
+            slice(None) if i is None else i for i in (bands, lines, samples)
+        )
+        if self.mmap:
+            return self.data[index]
+
+        if self._data is not None:
+            return self._data[index]
+
+        ranges = [_index_range(i, n) for i, n in zip(index, self.shape)]
+        with _phase(self.stats, 'read_window'):
+            with self._open_data(shared) as stream:
+                data = self._decoder.read_window(
+                    stream, *[r[:2] for r in ranges]
+                )
+            self._allocated(data.nbytes)
+        return data[tuple(r[2] for r in ranges)]
+
+    def iter_lines(self, chunk_lines=None):
+        """Iterate over the image in chunks of lines.
+
+        Unless the data is already loaded, the chunks are read from disk
+        into a single reused buffer so memory use is bounded by one chunk
+        regardless of the size of the image.  For tiled images chunks are
+        aligned to rows of tiles.
+
+        Chunks are yielded band by band, except for line and sample
+        interleaved images read from disk.  Their chunks of lines are read
+        once for all bands and yielded in line order, with the chunks of
+        each band in turn.  The lines of each band are always yielded in
+        order.
+
+        Parameters
+        ----------
+        chunk_lines : int
+            Number of lines per chunk, by default a few megabytes worth of
+            lines or one row of tiles.
+
+        Yields
+        ------
+        tuple
+            ``(band, line, chunk)`` where ``chunk`` is an array of up to
+            ``chunk_lines`` lines of ``band`` starting at ``line``.  The
+            array is overwritten by the next chunk of lines, copy it to
+            keep it.
+        """
+        decoder = self._decoder
+        chunk_lines = decoder.chunk_lines(chunk_lines)
+
+        if self.mmap or self._data is not None:
+            for band in range(self.bands):
+                for line in range(0, self.lines, chunk_lines):
+                    yield band, line, self.data[band, line:line + chunk_lines]
+            return
+
+        with self._open_data() as stream:
+            chunks = decoder.iter_lines(stream, chunk_lines)
+            while True:
+                # Only the reads count, not the caller's work between chunks
+                with _phase(self.stats, 'iter_lines'):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+
+    def to_dask(self, chunks=None):
+        """A lazy dask array of the image.
+
+        Each chunk is read with :meth:`read_window` when it is computed, so
+        only the bytes of that chunk are read from the attached or detached
+        data file and chunks can be read in parallel.
+
+        Parameters
+        ----------
+        chunks : tuple
+            The ``(bands, lines, samples)`` shape of chunks.  By default
+            chunks are single bands of whole tiles for tiled images, or of
+            whole lines otherwise, of about ``DASK_CHUNK_BYTES`` bytes.
+
+        Returns
+        -------
+        dask.array.Array
+            An array of shape ``self.shape`` and type ``self.dtype``.
+        """
+        import dask.array
+
+        if chunks is None:
+            chunks = self._dask_chunks()
+        return dask.array.from_array(
+            _WindowReader(self), chunks=chunks, asarray=False, lock=False
+        )
+
+    def _dask_chunks(self):
+        line_bytes = self.samples * self.dtype.itemsize
+        lines = max(1, self.DASK_CHUNK_BYTES // line_bytes)
+        return (1, min(lines, self.lines), self.samples)
+
+    def iter_bands(self):
+        """Iterate over the bands of the image.
+
+        Like :meth:`iter_lines` only one band is held in memory at a time
+        and the yielded array is reused for each band, except for line and
+        sample interleaved images whose bands are all read at once.
+        """
+        for _, _, band in self.iter_lines(chunk_lines=self.lines):
+            yield band
+
+    def build_overviews(self, min_size=256, chunk_lines=None):
+        """Build the overview pyramid of the image in one streaming pass.
+
+        Overviews downsampled by factors of 2, 4, 8 and so on are saved to
+        a sidecar file, the image's filename with ``.ovr`` appended, and
+        used by :meth:`read_overview`.  Each overview pixel is the mean of
+        the valid pixels it covers, or NaN if none are.
+
+        Parameters
+        ----------
+        min_size : int
+            Levels are added until the coarsest level is at most
+            ``min_size`` pixels along each axis.
+
+        chunk_lines : int
+            Number of lines read at a time, see :meth:`iter_lines`.
+
+        Returns
+        -------
+        Overviews
+            The overviews written.
+        """
+        from .overviews import build_overviews
+
+        self._overviews = build_overviews(
+            self, min_size=min_size, chunk_lines=chunk_lines
+        )
+        return self._overviews
+
+    @property
+    def overviews(self):
+        """The overviews of the image or ``None`` if they have not been built.
+
+        Overviews are loaded from the sidecar file unless the image has
+        changed since they were built.
+        """
+        from .overviews import SIDECAR_EXTENSION, Overviews
+
+        if self._overviews is None and self.filename is not None:
+            path = self.filename + SIDECAR_EXTENSION
+            if os.path.exists(path):
+                overviews = Overviews.open(path)
+                if overviews.is_current(self.filename):
+                    self._overviews = overviews
+        return self._overviews
+
+    def read_overview(self, factor, bands=None, lines=None, samples=None):
+        """Read a window of the image at reduced resolution.
+
+        The window is read from the coarsest overview downsampled by at most
+        ``factor``, so the cost depends on the size of the output rather
+        than the size of the image.
+
+        Parameters
+        ----------
+        factor : int
+            The largest acceptable downsampling factor.  The full resolution
+            image is read if it is less than the factor of every overview.
+
+        bands : slice or int
+            Bands to read, all bands by default.
+
+        lines : slice
+            Lines to read in full resolution coordinates, all lines by
+            default.
+
+        samples : slice
+            Samples to read in full resolution coordinates, all samples by
+            default.
+
+        Returns
+        -------
+        numpy.ndarray
+            The pixels of the window at the resolution of the chosen level.
+        """
+        overviews = self.overviews
+        if overviews is None:
+            raise ValueError(
+                'No overviews, build them with build_overviews() first'
+            )
+
+        level = overviews.level(factor)
+        if level is None:
+            return self.read_window(bands, lines, samples)
+
+        level_factor = overviews.levels[level][0]
+        ranges = []
+        for index, length in ((lines, self.lines), (samples, self.samples)):
+            index = slice(None) if index is None else index
+            start, stop, step = index.indices(length)
+            if step != 1:
+                raise ValueError('Overview windows must have a step of 1')
+            ranges.append((
+                start // level_factor, -(-stop // level_factor)
+            ))
+        return overviews.read(level, bands, *ranges)
+
+    def _valid(self, chunk):
+        if chunk.dtype.kind == 'f':
+            return numpy.isfinite(chunk)
+        return numpy.ones(chunk.shape, dtype=bool)
+
     def _load_label(self, stream):
-        return pvl.load(stream)
+        with _phase(self.stats, 'label'):
+            with _phase(self.stats, 'label.read'):
+                label = self._read_label(stream)
+                self._allocated(len(label))
+            with _phase(self.stats, 'label.parse'):
+                import pvl
+                return pvl.load(io.BytesIO(label))
+
+    def _read_label(self, stream):
+        """Read the label from ``stream`` stopping at its ``END`` statement.
+
+        Only the label is read rather than the whole file so that opening
+        an image without its data costs time proportional to the label.
+        """
+        label = []
+        quoted = False
+        while True:
+            line = stream.readline(self.LABEL_LINE_LIMIT)
+            if not line:
+                break
+
+            tokens = line.split(None, 1)
+            if not quoted and tokens and tokens[0].upper() == b'END':
+                label.append(tokens[0])
+                break
+
+            quoted ^= line.count(b'"') % 2 == 1
+            label.append(line)
+
+        return b''.join(label)
+
+    def _open(self):
+        if self.filename is None:
+            raise ValueError(
+                'Pixel data can only be read from disk for images opened '
+                'with %s.open(filename)' % type(self).__name__
+            )
+        stream = _open_file(self.filename, self.gzip_index, self.workers)[0]
+        return self._wrap(stream)
 
-    def _load_data(self, stream):
-        if self.data_filename is not None:
-            return self._load_detached_data()
+    def _wrap(self, stream):
+        if self.stats is None:
+            return stream
+        return self.stats.wrap(stream)
 
-        stream.seek(self.start_byte)
-        return self._decode(stream)
+    def _allocated(self, nbytes):
+        if self.stats is not None:
+            self.stats.allocate(nbytes)
+
+    def _load_data(self, stream):
+        with _phase(self.stats, 'data'):
+            if self.data_filename is not None:
+                return self._load_detached_data()
+
+            if self.mmap:
+                if self.compression:
+                    raise ValueError(
+                        'Compressed images can not be memory mapped'
+                    )
+                return self._decoder.memmap(stream, self.start_byte)
+
+            with _phase(self.stats, 'data.seek'):
+                stream.seek(self.start_byte)
+            return self._decode(stream)
 
     def _decode(self, stream):
-        return self._decoder.decode(stream)
+        workers = None if self.compression else self.workers
+        with _phase(self.stats, 'data.decode'):
+            data = self._decoder.decode(stream, workers=workers)
+            self._allocated(data.nbytes)
+        return data
 
-    def _load_detached_data(self):
+    @property
+    def _data_path(self):
         dirpath = os.path.dirname(self.filename)
-        filename = os.path.abspath(os.path.join(dirpath, self.data_filename))
+        return os.path.abspath(os.path.join(dirpath, self.data_filename))
 
-        with open(filename, 'rb') as stream:
+    def _load_detached_data(self):
+        if self.mmap:
+            return self._decoder.memmap(self._data_path, self.start_byte)
+
+        with self._open_data() as stream:
             return self._decode(stream)
+
+    @contextlib.contextmanager
+    def _open_data(self, shared=False):
+        """Open the file holding the pixel data positioned at the start byte.
+
+        If ``shared`` is set a positional reader over a file handle shared
+        with other readers is used when possible.
+        """
+        if shared and self._can_share_handle:
+            yield self._wrap(
+                PositionalReader(self._shared_handle(), self.start_byte)
+            )
+            return
+
+        if self.data_filename is not None:
+            stream = self._wrap(open(self._data_path, 'rb'))
+        else:
+            stream = self._open()
+
+        try:
+            with _phase(self.stats, 'data.seek'):
+                stream.seek(self.start_byte)
+            yield stream
+        finally:
+            stream.close()
+
+    @property
+    def _can_share_handle(self):
+        if self.filename is None or not PositionalReader.supported():
+            return False
+        return self.data_filename is not None or not self.compression
+
+    def _shared_handle(self):
+        with self._handle_lock:
+            if self._handle is None:
+                path = self.filename
+                if self.data_filename is not None:
+                    path = self._data_path
+                flags = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+                self._handle = os.open(path, flags)
+                # Close the handle if the image is collected without close()
+                self._handle_finalizer = weakref.finalize(
+                    self, os.close, self._handle
+                )
+            return self._handle
+
+
+class _WindowReader(object):
+    """An array like view of an image reading each index with read_window.
+
+    Pickling reopens the image from its filename without loading its data,
+    with the same ``mmap``, ``workers``, ``gzip_index``, ``contiguous`` and
+    ``byteorder`` options, so a reader can be sent to other processes.
+    Caches and statistics stay with the process that opened the image.
+    """
+
+    def __init__(self, image):
+        self.image = image
+        self.shape = image.shape
+        self.dtype = image.dtype
+        self.ndim = 3
+
+    def __getitem__(self, index):
+        return self.image.read_window(*index)
+
+    def __reduce__(self):
+        if self.image.filename is None:
+            raise TypeError('Only images opened from a file can be pickled')
+        return _reopen_reader, (
+            type(self.image), self.image.filename, self._open_options()
+        )
+
+    def __dask_tokenize__(self):
+        if self.image.filename is None:
+            return id(self)
+        stat = os.stat(self.image.filename)
+        return (
+            type(self.image).__name__, os.path.abspath(self.image.filename),
+            stat.st_size, stat.st_mtime, sorted(self._open_options().items())
+        )
+
+    def _open_options(self):
+        """The options of :meth:`PlanetaryImage.open` to reopen the image."""
+        image = self.image
+        return {
+            'mmap': image.mmap,
+            'workers': image.workers,
+            'gzip_index': image.gzip_index,
+            'contiguous': image.contiguous,
+            'byteorder': image.byteorder,
+        }
+
+
+def _reopen_reader(cls, filename, options):
+    return _WindowReader(cls.open(filename, load_data=False, **options))
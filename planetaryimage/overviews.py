@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""Reduced resolution overviews of images.
+
+An overview pyramid holds copies of an image downsampled by factors of 2, 4,
+8 and so on, so that zoomed out views only read as many pixels as they
+display.  Each overview pixel is the mean of the valid pixels it covers, so
+special pixels and NaNs are left out, and is NaN if none are valid.
+
+The pyramid is built in one streaming pass over the image and saved to a
+sidecar file next to it, by default the image's filename with ``.ovr``
+appended.  The sidecar holds a PVL label describing the levels followed by
+the band sequential, little endian ``float32`` pixels of each level.
+"""
+import os
+
+import numpy
+import pvl
+
+__all__ = ['Overviews', 'build_overviews']
+
+#: Extension of overview sidecar files.
+SIDECAR_EXTENSION = '.ovr'
+
+#: Pixel type of the overviews.
+DTYPE = numpy.dtype('<f4')
+
+#: The label is padded to a multiple of this many bytes.
+LABEL_BYTES = 4096
+
+#: Levels are added until the largest dimension is at most this size.
+MIN_SIZE = 256
+
+
+class Overviews(object):
+    """The overview pyramid of an image.
+
+    :param filename: the sidecar file holding the overviews
+    :param label: the parsed label of the sidecar file
+    """
+
+    def __init__(self, filename, label):
+        self.filename = filename
+        self.label = label
+
+        #: ``(factor, shape, start_byte)`` of each level, finest first.
+        self.levels = [
+            (
+                level['Factor'],
+                (level['Bands'], level['Lines'], level['Samples']),
+                level['StartByte'],
+            )
+            for key, level in label['Overviews'].items() if key == 'Level'
+        ]
+
+    @classmethod
+    def open(cls, filename):
+        """Read the overviews label from a sidecar file."""
+        with open(filename, 'rb') as fp:
+            label = []
+            for line in fp:
+                tokens = line.split(None, 1)
+                if tokens and tokens[0].upper() == b'END':
+                    break
+                label.append(line)
+        return cls(filename, pvl.loads(b''.join(label).decode('utf-8')))
+
+    @property
+    def factors(self):
+        """The downsampling factor of each level."""
+        return [factor for factor, _, _ in self.levels]
+
+    def is_current(self, source):
+        """Whether the overviews were built from the current ``source``."""
+        stat = os.stat(source)
+        overviews = self.label['Overviews']
+        return (
+            overviews['SourceBytes'] == stat.st_size and
+            overviews['SourceModified'] == stat.st_mtime
+        )
+
+    def level(self, factor):
+        """Index of the coarsest level downsampled by at most ``factor``.
+
+        Returns ``None`` if every level is coarser than ``factor``.
+        """
+        index = None
+        for i, level_factor in enumerate(self.factors):
+            if level_factor <= factor:
+                index = i
+        return index
+
+    def read(self, level, bands=None, lines=None, samples=None):
+        """Read a window of an overview level.
+
+        :param level: index of the level to read
+        :param bands: bands to read as a slice or int
+        :param lines: ``(start, stop)`` of the lines of the level to read
+        :param samples: ``(start, stop)`` of the samples of the level to read
+        """
+        factor, shape, start_byte = self.levels[level]
+        data = numpy.memmap(
+            self.filename, DTYPE, 'r', offset=start_byte, shape=shape
+        )
+        index = (
+            slice(None) if bands is None else bands,
+            slice(None) if lines is None else slice(*lines),
+            slice(None) if samples is None else slice(*samples),
+        )
+        return numpy.array(data[index])
+
+
+class _Reducer(object):
+    """Halve the resolution of one level of a band.
+
+    Rows of pixel sums and valid pixel counts are pushed in and the sums
+    and counts of each 2×2 block are returned, so that the next level can
+    be reduced from them exactly.  The means are written to ``out``.
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self.row = 0
+        self._pending = None
+
+    def push(self, sums, counts):
+        if self._pending is not None:
+            sums = numpy.concatenate((self._pending[0], sums))
+            counts = numpy.concatenate((self._pending[1], counts))
+            self._pending = None
+
+        even = len(sums) // 2 * 2
+        if even < len(sums):
+            self._pending = (sums[even:], counts[even:])
+        return self._reduce(sums[:even], counts[:even])
+
+    def flush(self):
+        """Reduce the last odd row of a band, if any."""
+        if self._pending is None:
+            empty = numpy.zeros((0, self.out.shape[1]))
+            return empty, empty
+
+        sums, counts = self._pending
+        self._pending = None
+        return self._reduce(
+            numpy.concatenate((sums, numpy.zeros_like(sums))),
+            numpy.concatenate((counts, numpy.zeros_like(counts))),
+        )
+
+    def _reduce(self, sums, counts):
+        sums, counts = self._sum_blocks(sums), self._sum_blocks(counts)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            self.out[self.row:self.row + len(sums)] = sums / counts
+        self.row += len(sums)
+        return sums, counts
+
+    def _sum_blocks(self, rows):
+        rows = rows.reshape((-1, 2, rows.shape[1])).sum(axis=1)
+        samples = self.out.shape[1]
+        if rows.shape[1] < samples * 2:
+            padded = numpy.zeros((len(rows), samples * 2))
+            padded[:, :rows.shape[1]] = rows
+            rows = padded
+        return rows.reshape((len(rows), samples, 2)).sum(axis=2)
+
+
+def _level_shapes(shape, min_size):
+    """``(factor, shape)`` of each level of an image of ``shape``."""
+    bands, lines, samples = shape
+    levels = []
+    factor = 2
+    while True:
+        level_shape = (bands, -(-lines // factor), -(-samples // factor))
+        levels.append((factor, level_shape))
+        if max(level_shape[1:]) <= min_size:
+            return levels
+        factor *= 2
+
+
+def _encode_label(source, levels, label_bytes):
+    label = pvl.PVLModule()
+    overviews = pvl.PVLObject()
+    stat = os.stat(source)
+    overviews.append('SourceBytes', stat.st_size)
+    overviews.append('SourceModified', stat.st_mtime)
+
+    start_byte = label_bytes
+    for factor, shape in levels:
+        overviews.append('Level', pvl.PVLGroup([
+            ('Factor', factor),
+            ('Bands', shape[0]),
+            ('Lines', shape[1]),
+            ('Samples', shape[2]),
+            ('StartByte', start_byte),
+        ]))
+        start_byte += int(numpy.prod(shape)) * DTYPE.itemsize
+    label.append('Overviews', overviews)
+    encoded = pvl.dumps(label, encoder=pvl.encoder.ISISEncoder())
+    return encoded.encode('utf-8'), start_byte
+
+
+def build_overviews(image, filename=None, min_size=MIN_SIZE,
+                    chunk_lines=None):
+    """Build the overview pyramid of ``image`` in one pass.
+
+    :param image: the :class:`PlanetaryImage` to build overviews of
+    :param filename: the sidecar file to write, by default the image's
+        filename with ``.ovr`` appended
+    :param min_size: levels are added until the largest dimension of the
+        coarsest level is at most ``min_size`` pixels
+    :param chunk_lines: number of lines of the image read at a time
+
+    :returns: the :class:`Overviews` written
+    """
+    if image.filename is None:
+        raise ValueError('Overviews can only be built for images on disk')
+    if filename is None:
+        filename = image.filename + SIDECAR_EXTENSION
+
+    levels = _level_shapes(image.shape, min_size)
+    label_bytes = LABEL_BYTES
+    while True:
+        label, size = _encode_label(image.filename, levels, label_bytes)
+        if len(label) <= label_bytes:
+            break
+        label_bytes = -(-len(label) // LABEL_BYTES) * LABEL_BYTES
+
+    with open(filename, 'wb') as fp:
+        fp.write(label.ljust(label_bytes, b' '))
+        fp.truncate(size)
+
+    overviews = Overviews.open(filename)
+    outputs = [
+        numpy.memmap(filename, DTYPE, 'r+', offset=start, shape=shape)
+        for _, shape, start in overviews.levels
+    ]
+
+    # Interleaved images yield the chunks of all bands line by line
+    reducers = {}
+    for band, _, chunk in image.iter_lines(chunk_lines):
+        if band not in reducers:
+            reducers[band] = [_Reducer(out[band]) for out in outputs]
+
+        valid = image._valid(chunk)
+        sums = numpy.where(valid, chunk, 0).astype(numpy.float64)
+        _push(reducers[band], sums, valid.astype(numpy.float64))
+    for band in sorted(reducers):
+        _flush(reducers[band])
+
+    for out in outputs:
+        out.flush()
+    return overviews
+
+
+def _push(reducers, sums, counts):
+    for reducer in reducers:
+        if not len(sums):
+            break
+        sums, counts = reducer.push(sums, counts)
+
+
+def _flush(reducers):
+    for i, reducer in enumerate(reducers):
+        sums, counts = reducer.flush()
+        _push(reducers[i + 1:], sums, counts)
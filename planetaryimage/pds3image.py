@@ -1,16 +1,19 @@
 # -*- coding: utf-8 -*-
 import numpy
 import six
-import pvl
 import collections
 
 from .image import PlanetaryImage
-from .decoders import BandSequentialDecoder
+from .decoders import (
+    BandSequentialDecoder, InterleavedDecoder, LineRecordDecoder
+)
 
 
 class Pointer(collections.namedtuple('Pointer', ['filename', 'bytes'])):
     @staticmethod
     def _parse_bytes(value, record_bytes):
+        import pvl
+
         if isinstance(value, six.integer_types):
             return (value - 1) * record_bytes
 
@@ -108,6 +111,13 @@ class PDS3Image(PlanetaryImage):
         'VAX_BIT_STRING': '<S',
     }
 
+    #: Interleave of the pixels of each ``BAND_STORAGE_TYPE`` other than
+    #: ``BAND_SEQUENTIAL``.
+    INTERLEAVES = {
+        'LINE_INTERLEAVED': 'line',
+        'SAMPLE_INTERLEAVED': 'sample',
+    }
+
     @property
     def _bands(self):
         return self.label['IMAGE'].get('BANDS', 1)
@@ -122,7 +132,7 @@ class PDS3Image(PlanetaryImage):
 
     @property
     def _format(self):
-        return self.label['IMAGE'].get('format', 'BAND_SEQUENTIAL')
+        return self.label['IMAGE'].get('BAND_STORAGE_TYPE', 'BAND_SEQUENTIAL')
 
     @property
     def _start_byte(self):
@@ -134,13 +144,54 @@ class PDS3Image(PlanetaryImage):
 
     @property
     def _dtype(self):
-        return self._pixel_type.newbyteorder(self._byte_order)
+        return numpy.dtype('%s%d' % (self._sample_type, self._sample_bytes))
 
     @property
     def record_bytes(self):
         """Number of bytes for fixed length records."""
         return self.label.get('RECORD_BYTES', 0)
 
+    @property
+    def line_prefix_bytes(self):
+        """Number of bytes before the pixels of each line."""
+        return self.label['IMAGE'].get('LINE_PREFIX_BYTES', 0)
+
+    @property
+    def line_suffix_bytes(self):
+        """Number of bytes after the pixels of each line."""
+        return self.label['IMAGE'].get('LINE_SUFFIX_BYTES', 0)
+
+    @property
+    def line_prefixes(self):
+        """The prefix bytes of each line or ``None`` if lines have none.
+
+        An array of ``uint8`` of shape ``(bands, lines, line_prefix_bytes)``
+        viewing the same records as ``data``.
+        """
+        if not self.line_prefix_bytes:
+            return None
+        return self._line_records()['prefix']
+
+    @property
+    def line_suffixes(self):
+        """The suffix bytes of each line or ``None`` if lines have none.
+
+        An array of ``uint8`` of shape ``(bands, lines, line_suffix_bytes)``
+        viewing the same records as ``data``.
+        """
+        if not self.line_suffix_bytes:
+            return None
+        return self._line_records()['suffix']
+
+    def _line_records(self):
+        decoder = self._decoder
+        records = decoder.records(self.data)
+        if records is None:
+            # The data was replaced, read the records again
+            with self._open_data() as stream:
+                records = decoder.decode_records(stream)
+        return records
+
     @property
     def _image_pointer(self):
         return Pointer.parse(self.label['^IMAGE'], self.record_bytes)
@@ -158,18 +209,63 @@ class PDS3Image(PlanetaryImage):
         # get bytes to match NumPy dtype expressions
         return int(self.label['IMAGE']['SAMPLE_BITS'] / 8)
 
-    # FIXME:  This dtype overrides the Image.dtype right?  Then whats the point
-    # of _dtype above here ^^, should we just rename this one _dtype and remove
-    # the other one?
-    @property
-    def dtype(self):
-        """Pixel data type."""
-        return numpy.dtype('%s%d' % (self._sample_type, self._sample_bytes))
+    def save(self, filename, data_filename=None, dtype=None):
+        """Write the image to ``filename``.
+
+        The pixels are streamed a chunk of lines at a time with
+        :meth:`iter_lines`.  Label keywords other than pointers are kept.
+
+        Parameters
+        ----------
+        filename : string
+            The image, or detached label, to write.
+
+        data_filename : string
+            Write a detached label to ``filename`` and the pixels to
+            ``data_filename``.
+
+        dtype : numpy.dtype
+            The pixel type and byte order to write, by default those of this
+            image.
+        """
+        from .writers import PDS3Writer
+
+        writer = PDS3Writer(
+            filename, self.shape,
+            dtype=self.dtype if dtype is None else dtype,
+            data_filename=data_filename,
+            label=self.label,
+        )
+        with writer:
+            writer.write_chunks(self.iter_lines())
 
     @property
     def _decoder(self):
-        if self.format == 'BAND_SEQUENTIAL':
-            return BandSequentialDecoder(
-                self.dtype, self.shape, self.compression
+        line_records = self.line_prefix_bytes or self.line_suffix_bytes
+        if self.format in self.INTERLEAVES:
+            if line_records:
+                raise ValueError(
+                    'Line prefix and suffix bytes are only supported for '
+                    'BAND_SEQUENTIAL images'
+                )
+            return InterleavedDecoder(
+                self.file_dtype, self.shape, self.INTERLEAVES[self.format],
+                compression=self.compression, contiguous=self.contiguous,
+                byteorder=self.byteorder,
+            )
+
+        if self.format != 'BAND_SEQUENTIAL':
+            raise ValueError('Unkown format (%s)' % self.format)
+
+        if line_records:
+            return LineRecordDecoder(
+                self.file_dtype, self.shape,
+                prefix_bytes=self.line_prefix_bytes,
+                suffix_bytes=self.line_suffix_bytes,
+                compression=self.compression, contiguous=self.contiguous,
+                byteorder=self.byteorder,
             )
-        raise ValueError('Unkown format (%s)' % self.format)
+        return BandSequentialDecoder(
+            self.file_dtype, self.shape, self.compression,
+            byteorder=self.byteorder
+        )
@@ -11,15 +11,10 @@
     Max:  The maximum valid value for a pixel.
 """
 
-import numpy
-
 __all__ = ['SPECIAL_PIXELS']
 
-
-def _make_num(num, dtype):
-    return numpy.fromstring(num, dtype=dtype)[0]
-
-
+# The floating point special pixels are the values with the bit patterns in
+# the comments, written out so that importing this module does not need numpy.
 SPECIAL_PIXELS = {
 
     'UnsignedByte': {
@@ -63,22 +58,22 @@ SPECIAL_PIXELS = {
     },
 
     'Real': {
-        'Min': _make_num(b'\xFF\x7F\xFF\xFA', '>f4'),
-        'Null': _make_num(b'\xFF\x7F\xFF\xFB', '>f4'),
-        'Lrs': _make_num(b'\xFF\x7F\xFF\xFC', '>f4'),
-        'Lis': _make_num(b'\xFF\x7F\xFF\xFD', '>f4'),
-        'His': _make_num(b'\xFF\x7F\xFF\xFE', '>f4'),
-        'Hrs': _make_num(b'\xFF\x7F\xFF\xFF', '>f4'),
-        'Max': numpy.finfo('f4').max
+        'Min': -3.4028224522648084e+38,   # 0xFF7FFFFA
+        'Null': -3.4028226550889045e+38,  # 0xFF7FFFFB
+        'Lrs': -3.4028228579130005e+38,   # 0xFF7FFFFC
+        'Lis': -3.4028230607370965e+38,   # 0xFF7FFFFD
+        'His': -3.4028232635611926e+38,   # 0xFF7FFFFE
+        'Hrs': -3.4028234663852886e+38,   # 0xFF7FFFFF
+        'Max': 3.4028234663852886e+38,    # float32 max
     },
 
     'Double': {
-        'Min': _make_num(b'\xFF\xEF\xFF\xFF\xFF\xFF\xFF\xFA', '>f8'),
-        'Null': _make_num(b'\xFF\xEF\xFF\xFF\xFF\xFF\xFF\xFB', '>f8'),
-        'Lrs': _make_num(b'\xFF\xEF\xFF\xFF\xFF\xFF\xFF\xFC', '>f8'),
-        'Lis': _make_num(b'\xFF\xEF\xFF\xFF\xFF\xFF\xFF\xFD', '>f8'),
-        'His': _make_num(b'\xFF\xEF\xFF\xFF\xFF\xFF\xFF\xFE', '>f8'),
-        'Hrs': _make_num(b'\xFF\xEF\xFF\xFF\xFF\xFF\xFF\xFF', '>f8'),
-        'Max': numpy.finfo('f8').max
+        'Min': -1.7976931348623147e+308,  # 0xFFEFFFFFFFFFFFFA
+        'Null': -1.797693134862315e+308,  # 0xFFEFFFFFFFFFFFFB
+        'Lrs': -1.7976931348623151e+308,  # 0xFFEFFFFFFFFFFFFC
+        'Lis': -1.7976931348623153e+308,  # 0xFFEFFFFFFFFFFFFD
+        'His': -1.7976931348623155e+308,  # 0xFFEFFFFFFFFFFFFE
+        'Hrs': -1.7976931348623157e+308,  # 0xFFEFFFFFFFFFFFFF
+        'Max': 1.7976931348623157e+308,   # float64 max
     }
 }
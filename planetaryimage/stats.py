@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""Timing and I/O statistics of reading images.
+
+An :class:`IOStats` passed to ``open`` records, for each phase of reading
+an image, how long it took, how many bytes were read with how many read
+calls, how long was spent inside those reads and how many bytes of label
+and pixel buffers were allocated.  The phases of opening an image are::
+
+    open
+        label
+            label.read      reading the label, decompressing if compressed
+            label.parse     parsing the label with pvl
+        data
+            data.seek       seeking to the pixel data
+            data.decode     reading and decoding the pixel data
+
+followed by ``data``, ``read_window`` and ``iter_lines`` phases for later
+reads, where ``iter_lines`` runs once per chunk read.  The time of a phase
+not spent in reads, ``seconds - read_seconds``, is the time of the decoding
+loop itself.
+
+Phases nest, so bytes read in ``data.decode`` also count towards ``data``
+and ``open``.  Recording costs a clock read per phase and a few counter
+updates per read call, so it can be left enabled.  To export the counts
+pass a ``callback`` which is called with the name and :class:`PhaseStats`
+of each phase as it ends::
+
+    def export(name, phase):
+        metrics.timing('planetaryimage.' + name, phase.seconds)
+
+    image = CubeFile.open(filename, stats=IOStats(callback=export))
+"""
+import collections
+import contextlib
+import threading
+import time
+
+__all__ = ['IOStats', 'PhaseStats']
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+class PhaseStats(object):
+    """The totals of all runs of one phase."""
+
+    __slots__ = (
+        'calls', 'seconds', 'bytes_read', 'reads', 'read_seconds', 'allocated'
+    )
+
+    def __init__(self):
+        #: Number of times the phase ran.
+        self.calls = 0
+
+        #: Wall time spent in the phase.
+        self.seconds = 0.0
+
+        #: Number of bytes read, after decompression.
+        self.bytes_read = 0
+
+        #: Number of read calls made on the file.
+        self.reads = 0
+
+        #: Wall time spent in read calls, including decompression.
+        self.read_seconds = 0.0
+
+        #: Number of bytes of label and pixel buffers allocated.
+        self.allocated = 0
+
+    def as_dict(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __repr__(self):
+        return 'PhaseStats(%s)' % ', '.join(
+            '%s=%r' % item for item in sorted(self.as_dict().items())
+        )
+
+
+class IOStats(object):
+    """Statistics of the phases of reading one or more images.
+
+    A single instance may be shared by many images and threads.
+
+    :param callback: called with the name and :class:`PhaseStats` of a
+        phase each time it ends
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+
+        #: :class:`PhaseStats` by phase name, in the order first run.
+        self.phases = collections.OrderedDict()
+
+        self._active = threading.local()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        return self.phases[name]
+
+    def __contains__(self, name):
+        return name in self.phases
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Record the statistics of the code run in the ``with`` block."""
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats()
+
+        active = self._active_phases()
+        active.append(stats)
+        start = _clock()
+        try:
+            yield stats
+        finally:
+            seconds = _clock() - start
+            active.pop()
+            with self._lock:
+                stats.calls += 1
+                stats.seconds += seconds
+            if self.callback is not None:
+                self.callback(name, stats)
+
+    def wrap(self, stream):
+        """Count the reads of ``stream`` towards the active phases."""
+        return CountingReader(stream, self)
+
+    def allocate(self, nbytes):
+        """Count ``nbytes`` allocated towards the active phases."""
+        self._count(self._active_phases(), 'allocated', nbytes)
+
+    def as_dict(self):
+        """The statistics as a dictionary of dictionaries by phase."""
+        with self._lock:
+            return collections.OrderedDict(
+                (name, stats.as_dict()) for name, stats in self.phases.items()
+            )
+
+    def reset(self):
+        """Forget all recorded statistics."""
+        with self._lock:
+            self.phases.clear()
+
+    def _active_phases(self):
+        try:
+            return self._active.phases
+        except AttributeError:
+            self._active.phases = []
+            return self._active.phases
+
+    def _count_read(self, phases, nbytes, seconds):
+        with self._lock:
+            for stats in phases:
+                stats.reads += 1
+                stats.bytes_read += nbytes
+                stats.read_seconds += seconds
+
+    def _count(self, phases, name, value):
+        with self._lock:
+            for stats in phases:
+                setattr(stats, name, getattr(stats, name) + value)
+
+
+class CountingReader(object):
+    """A file like object counting the reads of ``stream`` in ``stats``.
+
+    Reads count towards the phases active in the reading thread, or when
+    ``phases`` is given towards those phases, so that readers handed to
+    worker threads count towards the phases of the thread that made them.
+    Other attributes are those of ``stream``.
+    """
+
+    def __init__(self, stream, stats, phases=None):
+        self.stream = stream
+        self.stats = stats
+        self.phases = phases
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    def __iter__(self):
+        return iter(self.stream)
+
+    def wrap(self, stream):
+        """Count the reads of ``stream`` towards the currently active phases."""
+        phases = list(self.stats._active_phases())
+        return CountingReader(stream, self.stats, phases)
+
+    def read(self, *args):
+        start = _clock()
+        data = self.stream.read(*args)
+        self._counted(len(data), start)
+        return data
+
+    def readinto(self, buffer):
+        start = _clock()
+        read = self.stream.readinto(buffer)
+        self._counted(read or 0, start)
+        return read
+
+    def readline(self, *args):
+        start = _clock()
+        line = self.stream.readline(*args)
+        self._counted(len(line), start)
+        return line
+
+    def _counted(self, nbytes, start):
+        phases = self.phases
+        if phases is None:
+            phases = self.stats._active_phases()
+        self.stats._count_read(phases, nbytes, _clock() - start)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Convert Isis cubes between the ``BandSequential`` and ``Tile`` layouts.
+
+Band sequential cubes are fast to scan a band at a time while tiled cubes
+are fast to read small windows from.  :func:`transcode` rewrites a cube in
+the layout best suited to how it is accessed, streaming through the cube
+so that only a row of source tiles and a row of destination tiles are held
+in memory.  The label is kept and the tables, history and original label
+stored after the pixels are copied after the new pixels::
+
+    $ planetaryimage-transcode input.cub output.cub --tile-shape 256 256
+"""
+import argparse
+
+from .cubefile import CubeFile
+from .writers import CubeWriter
+
+__all__ = ['transcode']
+
+
+def transcode(source, destination, format='Tile', tile_shape=None,
+              chunk_lines=None):
+    """Write the cube ``source`` to ``destination`` in another layout.
+
+    :param source: the cube to read
+    :param destination: the cube to write
+    :param format: ``'Tile'`` or ``'BandSequential'``
+    :param tile_shape: the ``(lines, samples)`` shape of destination tiles,
+        by default the shape of the source tiles or ``(128, 128)``
+    :param chunk_lines: number of lines read at a time, by default a few
+        megabytes worth of lines or one row of source tiles
+
+    :returns: the destination cube opened without loading its pixels
+    """
+    cube = CubeFile.open(source, load_data=False)
+    cube.save(
+        destination, format=format, tile_shape=tile_shape,
+        chunk_lines=chunk_lines
+    )
+    return CubeFile.open(destination, load_data=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Convert an Isis cube between the BandSequential and '
+                    'Tile layouts.'
+    )
+    parser.add_argument('source', help='cube to read')
+    parser.add_argument('destination', help='cube to write')
+    parser.add_argument(
+        '--format', choices=CubeWriter.FORMATS, default='Tile',
+        help='layout of the destination cube (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--tile-shape', type=int, nargs=2, metavar=('LINES', 'SAMPLES'),
+        help='shape of the destination tiles (default: the source tile '
+             'shape or 128 128)'
+    )
+    parser.add_argument(
+        '--chunk-lines', type=int,
+        help='number of lines read at a time'
+    )
+    args = parser.parse_args(argv)
+
+    transcode(
+        args.source, args.destination,
+        format=args.format,
+        tile_shape=args.tile_shape,
+        chunk_lines=args.chunk_lines,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,504 @@
+# -*- coding: utf-8 -*-
+"""Streaming writers for Isis cubes and PDS3 images.
+
+Pixels are written from chunks of lines, so an image can be written without
+ever holding all of its pixels in memory::
+
+    with CubeWriter('out.cub', image.shape, image.dtype) as writer:
+        writer.write_chunks(image.iter_lines())
+
+Bands may be written in any order, as interleaved images yield them, as long
+as the lines of each band are written in order.
+"""
+import copy
+import os
+import sys
+
+import numpy
+import pvl
+
+from .cubefile import CubeFile
+from .specialpixels import SPECIAL_PIXELS
+
+__all__ = ['ImageWriter', 'CubeWriter', 'PDS3Writer']
+
+
+def _byte_order(dtype):
+    """The explicit byte order, ``'<'`` or ``'>'``, of ``dtype``."""
+    if dtype.byteorder == '=':
+        return '<' if sys.byteorder == 'little' else '>'
+    if dtype.byteorder == '|':
+        return '<'
+    return dtype.byteorder
+
+
+class ImageWriter(object):
+    """Base class of the streaming image writers.
+
+    :param filename: the file to write
+    :param shape: the ``(bands, lines, samples)`` shape of the image
+    :param dtype: the pixel type of the file, including its byte order
+    """
+
+    def __init__(self, filename, shape, dtype):
+        self.filename = filename
+        self.shape = tuple(int(n) for n in shape)
+        self.dtype = numpy.dtype(dtype).newbyteorder(
+            _byte_order(numpy.dtype(dtype))
+        )
+        # Number of lines written of each band
+        self._lines = [0] * self.shape[0]
+        self._fp = self._open()
+        self._start = self._fp.tell()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._fp.close()
+
+    @property
+    def complete(self):
+        """Whether every line of the image has been written."""
+        return all(written == self.shape[1] for written in self._lines)
+
+    def write(self, data):
+        """Write the next lines of the image.
+
+        Lines continue the first band not yet completely written.
+
+        :param data: an array of one or more lines, which may span bands,
+            such as a chunk of lines or the whole image
+        """
+        rows = self._rows(data)
+        lines = self.shape[1]
+        while len(rows):
+            band = self._next_band()
+            if band is None:
+                raise ValueError('More lines written than the image holds')
+
+            count = min(len(rows), lines - self._lines[band])
+            self._write_band(band, rows[:count])
+            rows = rows[count:]
+
+    def write_lines(self, band, line, data):
+        """Write lines of one band.
+
+        :param band: the band of the lines
+        :param line: the first line, the next line of ``band`` to write
+        :param data: an array of one or more lines of ``band``
+        """
+        rows = self._rows(data)
+        if line != self._lines[band]:
+            raise ValueError(
+                'Expected line %d of band %d, got line %d' %
+                (self._lines[band], band, line)
+            )
+        if line + len(rows) > self.shape[1]:
+            raise ValueError('More lines written than the image holds')
+        if len(rows):
+            self._write_band(band, rows)
+
+    def write_chunks(self, chunks):
+        """Write every chunk of an iterable.
+
+        :param chunks: arrays of lines or the ``(band, line, chunk)`` tuples
+            yielded by :meth:`PlanetaryImage.iter_lines`
+        """
+        for chunk in chunks:
+            if isinstance(chunk, tuple):
+                self.write_lines(*chunk)
+            else:
+                self.write(chunk)
+
+    def close(self):
+        """Finish writing the file.
+
+        :raises ValueError: if not every line of the image has been written
+        """
+        if self._fp.closed:
+            return
+        try:
+            if not self.complete:
+                raise ValueError(
+                    'Only %d of %d lines written' % (
+                        sum(self._lines), self.shape[0] * self.shape[1]
+                    )
+                )
+            self._finish()
+        finally:
+            self._fp.close()
+
+    def _rows(self, data):
+        """``data`` as an array of lines, checking their length."""
+        samples = self.shape[2]
+        data = numpy.asarray(data)
+        if data.ndim == 0 or data.shape[-1] != samples:
+            raise ValueError(
+                'Expected lines of %d samples, got shape %s' %
+                (samples, data.shape)
+            )
+        return data.reshape((-1, samples))
+
+    def _next_band(self):
+        """The first band not completely written, ``None`` if complete."""
+        for band, written in enumerate(self._lines):
+            if written < self.shape[1]:
+                return band
+        return None
+
+    def _write_band(self, band, rows):
+        line = self._lines[band]
+        self._write_lines(band, line, rows)
+        self._lines[band] += len(rows)
+        if self._lines[band] == self.shape[1]:
+            self._end_band(band)
+
+    def _open(self):
+        raise NotImplementedError()
+
+    def _write_lines(self, band, line, rows):
+        """Write band sequential lines of ``band`` starting at ``line``."""
+        _, lines, samples = self.shape
+        first = band * lines + line
+        self._seek(self._start + first * samples * self.dtype.itemsize)
+        self._write(rows)
+
+    def _seek(self, position):
+        if self._fp.tell() != position:
+            self._fp.seek(position)
+
+    def _write(self, data):
+        self._fp.write(numpy.ascontiguousarray(data, dtype=self.dtype))
+
+    def _end_band(self, band):
+        pass
+
+    def _finish(self):
+        pass
+
+
+class CubeWriter(ImageWriter):
+    """A streaming Isis cube writer.
+
+    :param filename: the cube to write
+    :param shape: the ``(bands, lines, samples)`` shape of the cube
+    :param dtype: the pixel type of the cube, including its byte order
+    :param format: ``'Tile'`` or ``'BandSequential'``
+    :param tile_shape: the ``(lines, samples)`` shape of tiles
+    :param base: additive factor of the pixel DN
+    :param multiplier: multiplicative factor of the pixel DN
+    :param label: an optional label whose ``IsisCube`` groups and other
+        top level keywords are copied to the cube's label
+    :param blobs: optional ``(key, object, data)`` tuples of the tables,
+        history and other objects whose ``data`` bytes are written after
+        the pixels, with the ``StartByte`` of the ``object`` label updated
+    """
+
+    #: Minimum number of bytes reserved for the label.
+    LABEL_BYTES = 65536
+
+    #: Default shape of tiles, as used by Isis.
+    TILE_SHAPE = (128, 128)
+
+    PIXEL_TYPES = dict((v, k) for k, v in CubeFile.PIXEL_TYPES.items())
+
+    BYTE_ORDERS = {'<': 'Lsb', '>': 'Msb'}
+
+    FORMATS = ('Tile', 'BandSequential')
+
+    def __init__(self, filename, shape, dtype, format='Tile',
+                 tile_shape=None, base=0.0, multiplier=1.0, label=None,
+                 blobs=None):
+        if format not in self.FORMATS:
+            raise ValueError('Unsupported format (%s)' % format)
+
+        pixel_type = numpy.dtype(dtype).newbyteorder('=')
+        if pixel_type not in self.PIXEL_TYPES:
+            raise ValueError('Unsupported pixel type (%s)' % pixel_type)
+
+        self.format = format
+        self.tile_shape = None
+        if format == 'Tile':
+            self.tile_shape = tuple(tile_shape or self.TILE_SHAPE)
+        self.base = base
+        self.multiplier = multiplier
+        self._label = label
+        self._blobs = list(blobs or [])
+        super(CubeWriter, self).__init__(filename, shape, dtype)
+
+    @property
+    def pixel_type(self):
+        """The Isis name of the pixel type."""
+        return self.PIXEL_TYPES[self.dtype.newbyteorder('=')]
+
+    @property
+    def image_bytes(self):
+        """Number of bytes of pixel data, including the padding of tiles."""
+        bands, lines, samples = self.shape
+        if self.format == 'Tile':
+            tile_lines, tile_samples = self.tile_shape
+            lines = -(-lines // tile_lines) * tile_lines
+            samples = -(-samples // tile_samples) * tile_samples
+        return bands * lines * samples * self.dtype.itemsize
+
+    @property
+    def _pad_value(self):
+        """The Null pixel padding partial tiles, 0 if the type has none."""
+        return SPECIAL_PIXELS.get(self.pixel_type, {}).get('Null', 0)
+
+    def _open(self):
+        label = self._encode_label()
+        fp = open(self.filename, 'wb')
+        fp.write(label)
+
+        if self.format == 'Tile':
+            bands, lines, samples = self.shape
+            tile_lines, tile_samples = self.tile_shape
+            columns = -(-samples // tile_samples)
+            # A row of tiles being filled for each band being written
+            self._tile_rows = {}
+            self._tile_row_shape = (tile_lines, columns * tile_samples)
+
+        return fp
+
+    def _encode_label(self):
+        """The encoded label padded to the start of the pixel data."""
+        label_bytes = self.LABEL_BYTES
+        while True:
+            label = pvl.dumps(
+                self._build_label(label_bytes),
+                encoder=pvl.encoder.ISISEncoder()
+            ).encode('utf-8')
+            if len(label) <= label_bytes:
+                return label.ljust(label_bytes, b'\0')
+            label_bytes = -(-len(label) // self.LABEL_BYTES) * self.LABEL_BYTES
+
+    def _build_label(self, label_bytes):
+        bands, lines, samples = self.shape
+
+        core = pvl.PVLObject([
+            ('StartByte', label_bytes + 1),
+            ('Format', self.format),
+        ])
+        if self.format == 'Tile':
+            core.append('TileSamples', self.tile_shape[1])
+            core.append('TileLines', self.tile_shape[0])
+        core.append('Dimensions', pvl.PVLGroup([
+            ('Samples', samples),
+            ('Lines', lines),
+            ('Bands', bands),
+        ]))
+        core.append('Pixels', pvl.PVLGroup([
+            ('Type', self.pixel_type),
+            ('ByteOrder', self.BYTE_ORDERS[_byte_order(self.dtype)]),
+            ('Base', float(self.base)),
+            ('Multiplier', float(self.multiplier)),
+        ]))
+
+        source = pvl.PVLModule() if self._label is None else self._label
+        cube = pvl.PVLObject([('Core', core)])
+        for key, value in source.get('IsisCube', {}).items():
+            if key != 'Core':
+                cube.append(key, copy.deepcopy(value))
+
+        label = pvl.PVLModule([('IsisCube', cube)])
+        for key, value in source.items():
+            if key not in ('IsisCube', 'Label'):
+                label.append(key, copy.deepcopy(value))
+
+        start_byte = label_bytes + self.image_bytes + 1
+        for key, value, data in self._blobs:
+            value = copy.deepcopy(value)
+            value['StartByte'] = start_byte
+            value['Bytes'] = len(data)
+            label.append(key, value)
+            start_byte += len(data)
+
+        label.append('Label', pvl.PVLObject([('Bytes', label_bytes)]))
+        return label
+
+    def _write_lines(self, band, line, rows):
+        if self.format != 'Tile':
+            return super(CubeWriter, self)._write_lines(band, line, rows)
+
+        tile_lines = self.tile_shape[0]
+        samples = self.shape[2]
+        tiles = self._tile_rows.get(band)
+        if tiles is None:
+            tiles = numpy.empty(self._tile_row_shape, self.dtype)
+            tiles.fill(self._pad_value)
+            self._tile_rows[band] = tiles
+
+        while len(rows):
+            filled = line % tile_lines
+            count = min(len(rows), tile_lines - filled)
+            tiles[filled:filled + count, :samples] = rows[:count]
+            rows = rows[count:]
+            line += count
+            if line % tile_lines == 0:
+                self._write_tiles(band, line // tile_lines - 1)
+
+    def _end_band(self, band):
+        if self.format != 'Tile':
+            return
+
+        tile_lines = self.tile_shape[0]
+        lines = self.shape[1]
+        if lines % tile_lines:
+            self._tile_rows[band][lines % tile_lines:] = self._pad_value
+            self._write_tiles(band, lines // tile_lines)
+        del self._tile_rows[band]
+
+    def _write_tiles(self, band, row):
+        """Write the buffered ``row`` of tiles of ``band``."""
+        tile_lines, tile_samples = self.tile_shape
+        tiles = self._tile_rows[band]
+        rows = -(-self.shape[1] // tile_lines)
+        self._seek(self._start + (band * rows + row) * tiles.nbytes)
+        tiles = tiles.reshape((tile_lines, -1, tile_samples))
+        self._write(tiles.transpose((1, 0, 2)))
+
+    def _finish(self):
+        self._seek(self._start + self.image_bytes)
+        for _, _, data in self._blobs:
+            self._fp.write(data)
+
+
+class PDS3Writer(ImageWriter):
+    """A streaming PDS3 image writer.
+
+    The label is attached unless ``data_filename`` is given, in which case
+    the label is written to ``filename`` and the pixels to
+    ``data_filename``.
+
+    :param filename: the image, or detached label, to write
+    :param shape: the ``(bands, lines, samples)`` shape of the image
+    :param dtype: the pixel type of the image, including its byte order
+    :param data_filename: the file to write the pixels to for a detached
+        label
+    :param record_bytes: number of bytes per record, one line by default
+    :param label: an optional label whose keywords, other than pointers, are
+        copied to the image's label
+    """
+
+    SAMPLE_TYPES = {
+        '>i': 'MSB_INTEGER',
+        '<i': 'LSB_INTEGER',
+        '>u': 'MSB_UNSIGNED_INTEGER',
+        '<u': 'LSB_UNSIGNED_INTEGER',
+        '>f': 'IEEE_REAL',
+        '<f': 'PC_REAL',
+    }
+
+    #: Keywords describing the layout of the source file, which are not
+    #: copied from the ``label``.
+    LAYOUT_KEYWORDS = frozenset([
+        'LABEL_RECORDS',
+        'LINE_PREFIX_BYTES',
+        'LINE_SUFFIX_BYTES',
+        'BAND_PREFIX_BYTES',
+        'BAND_SUFFIX_BYTES',
+    ])
+
+    def __init__(self, filename, shape, dtype, data_filename=None,
+                 record_bytes=None, label=None):
+        dtype = numpy.dtype(dtype)
+        sample_type = '%s%s' % (_byte_order(dtype), dtype.kind)
+        if sample_type not in self.SAMPLE_TYPES:
+            raise ValueError('Unsupported pixel type (%s)' % dtype)
+
+        if record_bytes is None:
+            record_bytes = shape[2] * dtype.itemsize
+
+        self.data_filename = data_filename
+        self.record_bytes = record_bytes
+        self.sample_type = self.SAMPLE_TYPES[sample_type]
+        self._label = label
+        super(PDS3Writer, self).__init__(filename, shape, dtype)
+
+    @property
+    def image_bytes(self):
+        """Number of bytes of pixel data."""
+        bands, lines, samples = self.shape
+        return bands * lines * samples * self.dtype.itemsize
+
+    def _open(self):
+        if self.data_filename is not None:
+            with open(self.filename, 'wb') as fp:
+                fp.write(self._encode_label(0)[0])
+            self._label_records = 0
+            return open(self.data_filename, 'wb')
+
+        label_records = 1
+        while True:
+            label, needed = self._encode_label(label_records)
+            if needed <= label_records:
+                break
+            label_records = needed
+
+        self._label_records = label_records
+        fp = open(self.filename, 'wb')
+        fp.write(label.ljust(label_records * self.record_bytes, b' '))
+        return fp
+
+    def _encode_label(self, label_records):
+        """Encode the label for ``label_records`` records of label.
+
+        Returns the encoded label and the number of records it needs.
+        """
+        label = pvl.dumps(
+            self._build_label(label_records),
+            encoder=pvl.encoder.PDSLabelEncoder()
+        ).encode('utf-8')
+        return label, -(-len(label) // self.record_bytes)
+
+    def _build_label(self, label_records):
+        bands, lines, samples = self.shape
+        image_records = -(-self.image_bytes // self.record_bytes)
+
+        label = pvl.PVLModule([
+            ('PDS_VERSION_ID', 'PDS3'),
+            ('RECORD_TYPE', 'FIXED_LENGTH'),
+            ('RECORD_BYTES', self.record_bytes),
+            ('FILE_RECORDS', label_records + image_records),
+        ])
+        if self.data_filename is None:
+            label.append('LABEL_RECORDS', label_records)
+            label.append('^IMAGE', label_records + 1)
+        else:
+            label.append('^IMAGE', os.path.relpath(
+                self.data_filename, os.path.dirname(self.filename) or '.'
+            ))
+
+        image = pvl.PVLObject([
+            ('LINES', lines),
+            ('LINE_SAMPLES', samples),
+            ('BANDS', bands),
+            ('BAND_STORAGE_TYPE', 'BAND_SEQUENTIAL'),
+            ('SAMPLE_TYPE', self.sample_type),
+            ('SAMPLE_BITS', self.dtype.itemsize * 8),
+        ])
+
+        source = pvl.PVLModule() if self._label is None else self._label
+        for key, value in source.get('IMAGE', {}).items():
+            if key not in image and key not in self.LAYOUT_KEYWORDS:
+                image.append(key, copy.deepcopy(value))
+
+        for key, value in source.items():
+            if key in label or key in self.LAYOUT_KEYWORDS:
+                continue
+            if key != 'IMAGE' and not key.startswith('^'):
+                label.append(key, copy.deepcopy(value))
+        label.append('IMAGE', image)
+        return label
+
+    def _finish(self):
+        # Pad the last record
+        padding = -self.image_bytes % self.record_bytes
+        if padding and self.data_filename is None:
+            self._seek(self._start + self.image_bytes)
+            self._fp.write(b'\0' * padding)
@@ -34,6 +34,15 @@ setup(
         'pvl',
         'six'
     ],
+    extras_require={
+        'dask': ['dask[array]'],
+        'gzip_index': ['indexed_gzip'],
+    },
+    entry_points={
+        'console_scripts': [
+            'planetaryimage-transcode = planetaryimage.transcode:main',
+        ],
+    },
     license="BSD",
     zip_safe=False,
     keywords='planetaryimage',
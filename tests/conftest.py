@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import bz2
+import gzip
+import numpy
+import pytest
+
+CUBE_LABEL = """Object = IsisCube
+  Object = Core
+    StartByte   = {start_byte}
+    Format      = {format}
+{tile_keywords}
+    Group = Dimensions
+      Samples = {samples}
+      Lines   = {lines}
+      Bands   = {bands}
+    End_Group
+
+    Group = Pixels
+      Type       = {pixel_type}
+      ByteOrder  = {byte_order}
+      Base       = {base}
+      Multiplier = {multiplier}
+    End_Group
+  End_Object
+End_Object
+
+Object = Label
+  Bytes = {label_bytes}
+End_Object
+End
+"""
+
+PDS3_LABEL = """PDS_VERSION_ID = PDS3
+RECORD_TYPE   = FIXED_LENGTH
+RECORD_BYTES  = {record_bytes}
+LABEL_RECORDS = 1
+^IMAGE        = 2
+OBJECT = IMAGE
+  LINES        = {lines}
+  LINE_SAMPLES = {samples}
+  BANDS        = {bands}
+  SAMPLE_TYPE  = {sample_type}
+  SAMPLE_BITS  = {sample_bits}
+{keywords}END_OBJECT = IMAGE
+END
+"""
+
+SAMPLE_TYPES = {
+    '>i': 'MSB_INTEGER',
+    '<i': 'LSB_INTEGER',
+    '>u': 'MSB_UNSIGNED_INTEGER',
+    '<u': 'LSB_UNSIGNED_INTEGER',
+    '>f': 'IEEE_REAL',
+    '<f': 'PC_REAL',
+}
+
+PIXEL_TYPES = {
+    'u1': 'UnsignedByte',
+    'i1': 'SignedByte',
+    'u2': 'UnsignedWord',
+    'i2': 'SignedWord',
+    'u4': 'UnsignedInteger',
+    'i4': 'SignedInteger',
+    'f4': 'Real',
+    'f8': 'Double',
+}
+
+LABEL_BYTES = 1024
+
+
+def write_cube(filename, data, tile_shape=None, byte_order='<', base=0.0,
+               multiplier=1.0):
+    """Write ``data`` as a minimal Isis cube for tests."""
+    bands, lines, samples = data.shape
+    dtype = data.dtype.newbyteorder(byte_order)
+
+    if tile_shape is None:
+        tile_keywords = ''
+        raw = data.astype(dtype).tobytes()
+    else:
+        tile_lines, tile_samples = tile_shape
+        tile_keywords = (
+            '    TileSamples = %d\n    TileLines   = %d\n' %
+            (tile_samples, tile_lines)
+        )
+        rows = -(-lines // tile_lines)
+        cols = -(-samples // tile_samples)
+        padded = numpy.zeros(
+            (bands, rows * tile_lines, cols * tile_samples), dtype
+        )
+        padded[:, :lines, :samples] = data
+        tiles = padded.reshape((bands, rows, tile_lines, cols, tile_samples))
+        raw = tiles.transpose((0, 1, 3, 2, 4)).tobytes()
+
+    label = CUBE_LABEL.format(
+        start_byte=LABEL_BYTES + 1,
+        format='BandSequential' if tile_shape is None else 'Tile',
+        tile_keywords=tile_keywords,
+        samples=samples,
+        lines=lines,
+        bands=bands,
+        pixel_type=PIXEL_TYPES[data.dtype.str[1:]],
+        byte_order={'<': 'Lsb', '>': 'Msb'}[byte_order],
+        base=base,
+        multiplier=multiplier,
+        label_bytes=LABEL_BYTES,
+    ).encode('ascii')
+
+    with open(filename, 'wb') as fp:
+        fp.write(label.ljust(LABEL_BYTES, b' '))
+        fp.write(raw)
+
+    return filename
+
+
+def write_pds3(filename, data, raw=None, **keywords):
+    """Write ``data`` as a minimal attached label PDS3 image for tests.
+
+    The pixel data is written as ``data`` unless the ``raw`` bytes are given
+    and extra ``IMAGE`` keywords may be passed as keyword arguments.
+    ``.gz`` and ``.bz2`` filenames are compressed.
+    """
+    dtype = data.dtype
+    if dtype.byteorder in '=|':
+        dtype = dtype.newbyteorder('<')
+
+    bands, lines, samples = data.shape
+    label = PDS3_LABEL.format(
+        record_bytes=LABEL_BYTES,
+        lines=lines,
+        samples=samples,
+        bands=bands,
+        sample_type=SAMPLE_TYPES[dtype.str[:2]],
+        sample_bits=dtype.itemsize * 8,
+        keywords=''.join(
+            '  %s = %s\n' % (key.upper(), value)
+            for key, value in keywords.items()
+        ),
+    ).encode('ascii')
+
+    if raw is None:
+        raw = data.astype(dtype).tobytes()
+
+    if filename.endswith('.gz'):
+        fp = gzip.open(filename, 'wb')
+    elif filename.endswith('.bz2'):
+        fp = bz2.BZ2File(filename, 'wb')
+    else:
+        fp = open(filename, 'wb')
+
+    with fp:
+        fp.write(label.ljust(LABEL_BYTES, b' '))
+        fp.write(raw)
+
+    return filename
+
+
+@pytest.fixture(name='write_pds3')
+def write_pds3_fixture():
+    return write_pds3
+
+
+@pytest.fixture(name='write_cube')
+def write_cube_fixture():
+    return write_cube
+
+
+@pytest.fixture
+def cube_data():
+    return numpy.arange(3 * 70 * 90, dtype='f4').reshape((3, 70, 90))
+
+
+@pytest.fixture(params=[None, (32, 16)], ids=['BandSequential', 'Tile'])
+def cube_filename(request, tmpdir, cube_data):
+    """An Isis cube of ``cube_data`` with ragged edge tiles when tiled."""
+    filename = str(tmpdir.join('test.cub'))
+    return write_cube(filename, cube_data, tile_shape=request.param)
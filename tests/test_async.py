@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import gc
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+import pytest
+
+from planetaryimage import CubeFile, PDS3Image
+
+
+def test_aopen_aread_window(cube_filename, cube_data):
+    async def read():
+        image = await CubeFile.aopen(cube_filename, load_data=False)
+        windows = await asyncio.gather(*[
+            image.aread_window(band, slice(line, line + 20), slice(5, 60))
+            for band in range(3) for line in range(0, 70, 10)
+        ])
+        return image, windows
+
+    image, windows = asyncio.run(read())
+    assert image._data is None
+    assert image._handle is not None
+    expected = [
+        cube_data[band, line:line + 20, 5:60]
+        for band in range(3) for line in range(0, 70, 10)
+    ]
+    for window, pixels in zip(windows, expected):
+        numpy.testing.assert_array_equal(window, pixels)
+
+    image.close()
+    assert image._handle is None
+
+
+def test_handle_closed_on_exit_and_collect(cube_filename, cube_data):
+    async def read():
+        with await CubeFile.aopen(cube_filename, load_data=False) as image:
+            window = await image.aread_window(1, slice(3, 9))
+            handle = image._handle
+            os.fstat(handle)
+        return image, window, handle
+
+    image, window, handle = asyncio.run(read())
+    numpy.testing.assert_array_equal(window, cube_data[1, 3:9])
+    assert image._handle is None
+    with pytest.raises(OSError):
+        os.fstat(handle)
+
+    async def read_collected():
+        image = await CubeFile.aopen(cube_filename, load_data=False)
+        await image.aread_window(0, slice(0, 2))
+        return image
+
+    image = asyncio.run(read_collected())
+    handle = image._handle
+    os.fstat(handle)
+    del image
+    gc.collect()
+    with pytest.raises(OSError):
+        os.fstat(handle)
+
+
+def test_aread_window_compressed(tmpdir, write_pds3):
+    data = numpy.arange(2 * 30 * 20, dtype='>i2').reshape((2, 30, 20))
+    filename = write_pds3(str(tmpdir.join('test.img.gz')), data)
+
+    async def read():
+        image = await PDS3Image.aopen(filename, load_data=False)
+        return image, await image.aread_window(1, slice(3, 9))
+
+    image, window = asyncio.run(read())
+    assert image._handle is None
+    numpy.testing.assert_array_equal(window, data[1, 3:9])
+
+
+def test_aopen_executor_and_cancel(cube_filename):
+    executor = ThreadPoolExecutor(1)
+    blocked = threading.Event()
+    executor.submit(blocked.wait)
+
+    async def cancel():
+        future = CubeFile.aopen(cube_filename, executor=executor)
+        future.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await future
+
+        blocked.set()
+        image = await CubeFile.aopen(
+            cube_filename, executor=executor, load_data=False
+        )
+        assert image.executor is executor
+        return await image.aread_window(0, 0, slice(0, 3))
+
+    try:
+        assert asyncio.run(cancel()).shape == (3,)
+    finally:
+        executor.shutdown()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import os
+
+import numpy
+from numpy.testing import assert_almost_equal
+from planetaryimage import CubeFile, LabelCache, PDS3Image, TileCache
+
+
+def test_tile_cache_lru():
+    cache = TileCache(max_bytes=24)
+    tile = numpy.zeros(1, 'f8')
+
+    cache.put('a', tile)
+    cache.put('b', tile + 1)
+    cache.put('c', tile + 2)
+    assert cache.nbytes == 24
+
+    assert cache.get('a')[0] == 0
+    cache.put('d', tile + 3)
+    assert 'b' not in cache
+    assert 'a' in cache
+    assert len(cache) == 3
+    assert cache.nbytes == 24
+
+    assert cache.get('b') is None
+    assert cache.stats['hits'] == 1
+    assert cache.stats['misses'] == 1
+
+    assert not cache.get('c').flags.writeable
+
+    cache.put('big', numpy.zeros(4, 'f8'))
+    assert 'big' not in cache
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+    assert cache.hits == 0
+
+
+def test_cached_read_window(tmpdir, cube_data, write_cube):
+    filename = write_cube(str(tmpdir.join('tiled.cub')), cube_data, (32, 16))
+    cache = TileCache()
+    image = CubeFile.open(filename, load_data=False, tile_cache=cache)
+
+    window = image.read_window(lines=slice(10, 40), samples=slice(20, 50))
+    assert_almost_equal(window, cube_data[:, 10:40, 20:50])
+    assert cache.misses == 3 * 2 * 3
+    assert cache.hits == 0
+
+    window = image.read_window(lines=slice(0, 64), samples=slice(5, 60))
+    assert_almost_equal(window, cube_data[:, 0:64, 5:60])
+    assert cache.hits == 3 * 2 * 3
+    assert cache.misses == 3 * 2 * 3 + 3 * 2 * 1
+
+    other = CubeFile.open(filename, load_data=False, tile_cache=cache)
+    hits = cache.hits
+    other.read_window(bands=0, lines=slice(0, 10), samples=slice(0, 10))
+    assert cache.hits == hits + 1
+
+
+def test_label_cache(tmpdir, cube_data, write_cube):
+    filename = write_cube(str(tmpdir.join('test.cub')), cube_data, (32, 16))
+    cache = LabelCache(str(tmpdir.join('labels.sqlite')))
+
+    image = CubeFile.open(filename, label_cache=cache)
+    assert cache.stats['misses'] == 1
+    assert filename in cache
+    assert cache.geometry(filename) == {
+        'shape': [3, 70, 90],
+        'dtype': '<f4',
+        'start_byte': 1024,
+        'format': 'Tile',
+        'tile_shape': [32, 16],
+        'data_filename': None,
+    }
+
+    # A new cache on the same database, as in another process
+    cache = LabelCache(str(tmpdir.join('labels.sqlite')))
+    cached = CubeFile.open(filename, label_cache=cache, load_data=False)
+    assert cache.hits == 1
+    assert cached.label == image.label
+    assert cached.tile_shape == (32, 16)
+    numpy.testing.assert_array_equal(cached.data, cube_data)
+
+
+def test_label_cache_invalidated(tmpdir, write_pds3):
+    data = numpy.arange(2 * 30 * 20, dtype='>i2').reshape((2, 30, 20))
+    filename = write_pds3(str(tmpdir.join('test.img')), data)
+    cache = LabelCache(str(tmpdir.join('labels.sqlite')))
+    PDS3Image.open(filename, label_cache=cache)
+
+    write_pds3(filename, data[:1])
+    os.utime(filename, (0, 0))
+    assert cache.get(filename) is None
+
+    image = PDS3Image.open(filename, label_cache=cache)
+    assert image.shape == (1, 30, 20)
+    assert len(cache) == 1
+    assert cache.stats['misses'] == 3
+
+
+def test_label_cache_eviction(tmpdir, write_pds3):
+    data = numpy.zeros((1, 4, 4), dtype='>i2')
+    filenames = [
+        write_pds3(str(tmpdir.join('%d.img' % i)), data) for i in range(3)
+    ]
+    cache = LabelCache(str(tmpdir.join('labels.sqlite')))
+    PDS3Image.open(filenames[0], label_cache=cache)
+    cache.max_bytes = cache.nbytes * 2
+
+    PDS3Image.open(filenames[1], label_cache=cache)
+    PDS3Image.open(filenames[0], label_cache=cache)
+    PDS3Image.open(filenames[2], label_cache=cache)
+
+    assert len(cache) == 2
+    assert cache.evictions == 1
+    assert filenames[1] not in cache
+    assert filenames[0] in cache
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats['bytes'] == 0
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+import bz2
+import gzip
+import io
+import os
+import sys
+
+import numpy
+import pytest
+
+from planetaryimage import PDS3Image, compression
+from planetaryimage.compression import (
+    GZIP_INDEXES,
+    GzipIndex,
+    GzipIndexCache,
+    IndexedGzipFile,
+    ParallelBZ2File,
+    iter_bz2_blocks,
+    open_bz2,
+    open_indexed_gzip,
+)
+
+
+@pytest.fixture
+def payload():
+    return numpy.random.RandomState(0).bytes(300 * 1024)
+
+
+@pytest.fixture
+def gz_filename(tmpdir, payload):
+    filename = str(tmpdir.join('data.gz'))
+    with gzip.open(filename, 'wb') as fp:
+        fp.write(payload)
+    return filename
+
+
+@pytest.fixture
+def no_indexed_gzip(monkeypatch):
+    """Force the pure Python reader even if indexed_gzip is installed."""
+    monkeypatch.setitem(sys.modules, 'indexed_gzip', None)
+
+
+def test_indexed_gzip_file_seek(gz_filename, payload):
+    index = GzipIndex(spacing=32 * 1024)
+    with io.BufferedReader(IndexedGzipFile(gz_filename, index)) as fp:
+        assert fp.read() == payload
+        assert len(index) > 1
+
+        for offset in [250000, 1000, 123456, 0, len(payload) - 10]:
+            fp.seek(offset)
+            assert fp.read(5000) == payload[offset:offset + 5000]
+
+        assert fp.seek(0, io.SEEK_END) == len(payload)
+        assert fp.read() == b''
+
+
+def test_indexed_gzip_file_restarts_from_seek_point(gz_filename, payload):
+    index = GzipIndex(spacing=32 * 1024)
+    with io.BufferedReader(IndexedGzipFile(gz_filename, index)) as fp:
+        fp.read()
+
+    raw = IndexedGzipFile(gz_filename, index)
+    with raw:
+        raw.seek(200000)
+        assert raw._start >= 200000 - index.spacing - raw.BLOCK_SIZE
+        data = bytearray(1000)
+        raw.readinto(data)
+        assert bytes(data) == payload[200000:201000]
+
+
+def test_indexed_gzip_file_multiple_members(tmpdir, payload):
+    filename = str(tmpdir.join('members.gz'))
+    with open(filename, 'wb') as fp:
+        fp.write(gzip.compress(payload[:100000]))
+        fp.write(gzip.compress(payload[100000:]))
+
+    with io.BufferedReader(IndexedGzipFile(filename)) as fp:
+        assert fp.read() == payload
+        fp.seek(99990)
+        assert fp.read(20) == payload[99990:100010]
+
+
+def test_gzip_index_shared(gz_filename, no_indexed_gzip):
+    GZIP_INDEXES.clear()
+    with open_indexed_gzip(gz_filename, spacing=32 * 1024) as fp:
+        fp.read()
+        index = fp.raw.index
+
+    assert GzipIndex.for_file(gz_filename) is index
+    with open_indexed_gzip(gz_filename) as fp:
+        assert fp.raw.index is index
+
+
+def test_gzip_index_cache_evicts(tmpdir, gz_filename):
+    cache = GzipIndexCache()
+    first = cache.get(gz_filename, spacing=32 * 1024)
+    other = str(tmpdir.join('other.gz'))
+    with open(gz_filename, 'rb') as src, open(other, 'wb') as dst:
+        dst.write(src.read())
+    second = cache.get(other, spacing=32 * 1024)
+
+    with io.BufferedReader(IndexedGzipFile(gz_filename, first)) as fp:
+        fp.read()
+    assert cache.nbytes == first.nbytes > 0
+    assert cache.get(gz_filename) is first
+
+    # Room for one index, the least recently used one is evicted
+    cache.max_bytes = first.nbytes
+
+    with io.BufferedReader(IndexedGzipFile(other, second)) as fp:
+        fp.read()
+    assert gz_filename not in cache
+    assert other in cache
+    assert cache.nbytes == second.nbytes <= cache.max_bytes
+    assert cache.stats['misses'] == 2 and cache.stats['hits'] == 1
+
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+
+
+def test_gzip_index_cache_drops_changed_file(gz_filename, payload):
+    cache = GzipIndexCache()
+    index = cache.get(gz_filename, spacing=32 * 1024)
+    with io.BufferedReader(IndexedGzipFile(gz_filename, index)) as fp:
+        fp.read()
+    assert cache.nbytes == index.nbytes > 0
+
+    with gzip.open(gz_filename, 'wb') as fp:
+        fp.write(payload[:1000])
+    stat = os.stat(gz_filename)
+    os.utime(gz_filename, (stat.st_atime, stat.st_mtime + 10))
+
+    assert cache.get(gz_filename) is not index
+    assert len(cache) == 1
+    assert cache.nbytes == 0
+
+
+def test_indexed_gzip_sidecar(gz_filename, payload):
+    pytest.importorskip('indexed_gzip')
+    with open_indexed_gzip(gz_filename, spacing=64 * 1024) as fp:
+        fp.seek(123456)
+        assert fp.read(100) == payload[123456:123556]
+
+    assert os.path.exists(gz_filename + '.gzidx')
+    with open_indexed_gzip(gz_filename, spacing=64 * 1024) as fp:
+        fp.seek(234567)
+        assert fp.read(100) == payload[234567:234667]
+
+
+@pytest.mark.parametrize('size_changed', [False, True])
+def test_indexed_gzip_sidecar_stale(gz_filename, payload, size_changed):
+    pytest.importorskip('indexed_gzip')
+    with open_indexed_gzip(gz_filename, spacing=64 * 1024) as fp:
+        fp.read()
+    sidecar = gz_filename + '.gzidx'
+    indexed = os.stat(sidecar).st_mtime
+    size = os.path.getsize(gz_filename)
+
+    payload = payload[::-1]
+    if size_changed:
+        payload = payload[:200 * 1024]
+    with gzip.open(gz_filename, 'wb') as fp:
+        fp.write(payload)
+    if size_changed:
+        # The sidecar looks newer, only its recorded size tells it is stale
+        os.utime(gz_filename, (indexed - 10, indexed - 10))
+    else:
+        assert os.path.getsize(gz_filename) == size
+        os.utime(sidecar, (indexed - 10, indexed - 10))
+        os.utime(gz_filename, (indexed, indexed))
+
+    with open_indexed_gzip(gz_filename, spacing=64 * 1024) as fp:
+        fp.seek(123456)
+        assert fp.read(100) == payload[123456:123556]
+    assert compression._sidecar_is_current(gz_filename, sidecar)
+
+
+def test_sidecar_is_current(gz_filename):
+    sidecar = gz_filename + '.gzidx'
+    assert not compression._sidecar_is_current(gz_filename, sidecar)
+
+    size = os.path.getsize(gz_filename)
+    for header, current in [
+        (compression.SIDECAR_HEADER.pack(b'GZIDX', 1, 0, size), True),
+        (compression.SIDECAR_HEADER.pack(b'GZIDX', 1, 0, size + 1), False),
+        (compression.SIDECAR_HEADER.pack(b'OTHER', 1, 0, size), False),
+        (b'GZIDX', False),
+    ]:
+        with open(sidecar, 'wb') as fp:
+            fp.write(header)
+        assert compression._sidecar_is_current(gz_filename, sidecar) == current
+
+    stat = os.stat(sidecar)
+    os.utime(gz_filename, (stat.st_atime, stat.st_mtime + 10))
+    assert not compression._sidecar_is_current(gz_filename, sidecar)
+
+
+def test_pds3_gzip_index_read_window(tmpdir, write_pds3, no_indexed_gzip):
+    data = numpy.arange(2 * 120 * 100, dtype='<i2').reshape((2, 120, 100))
+    filename = write_pds3(str(tmpdir.join('test.img.gz')), data)
+
+    image = PDS3Image.open(filename, load_data=False, gzip_index=True)
+    assert image.gzip_index
+    numpy.testing.assert_array_equal(
+        image.read_window(1, slice(50, 70), slice(10, 20)),
+        data[1, 50:70, 10:20]
+    )
+    numpy.testing.assert_array_equal(
+        image.read_window(0, slice(5, 10)), data[0, 5:10]
+    )
+    numpy.testing.assert_array_equal(image.data, data)
+
+
+@pytest.fixture
+def bz2_payload(payload):
+    # Compressible and random runs to get blocks of different sizes
+    return payload + bytes(200 * 1024) + payload[:50000]
+
+
+@pytest.fixture
+def bz2_filename(tmpdir, bz2_payload):
+    filename = str(tmpdir.join('data.bz2'))
+    with open(filename, 'wb') as fp:
+        # Two streams, the first with several 100k blocks
+        fp.write(bz2.compress(bz2_payload, 1))
+        fp.write(bz2.compress(bz2_payload[:1000]))
+    return filename
+
+
+def test_iter_bz2_blocks(bz2_filename, bz2_payload):
+    with open(bz2_filename, 'rb') as fp:
+        blocks = list(iter_bz2_blocks(fp, read_size=4096))
+
+    assert len(blocks) > 3
+    data = b''.join(bz2.decompress(block) for block in blocks)
+    assert data == bz2_payload + bz2_payload[:1000]
+
+
+def test_parallel_bz2_file(bz2_filename, bz2_payload):
+    expected = bz2_payload + bz2_payload[:1000]
+    with open_bz2(bz2_filename, workers=3) as fp:
+        assert isinstance(fp.raw, ParallelBZ2File)
+        assert fp.read() == expected
+
+        for offset in [400000, 10, 250000]:
+            fp.seek(offset)
+            assert fp.read(1000) == expected[offset:offset + 1000]
+
+        assert fp.seek(0, io.SEEK_END) == len(expected)
+
+
+def test_parallel_bz2_file_falls_back(bz2_filename, bz2_payload,
+                                     monkeypatch):
+    # Blocks split at a block magic appearing by chance in the compressed
+    # data can not be decompressed
+    def split_blocks(fp):
+        for block in iter_bz2_blocks(fp):
+            yield block[:len(block) // 2]
+
+    monkeypatch.setattr(compression, 'iter_bz2_blocks', split_blocks)
+    with open_bz2(bz2_filename, workers=2) as fp:
+        assert fp.read() == bz2_payload + bz2_payload[:1000]
+
+
+def test_open_bz2_serial(bz2_filename):
+    with open_bz2(bz2_filename) as fp:
+        assert isinstance(fp, bz2.BZ2File)
+
+
+def test_pds3_bz2_workers(tmpdir, write_pds3):
+    data = numpy.arange(2 * 120 * 100, dtype='<i2').reshape((2, 120, 100))
+    filename = write_pds3(str(tmpdir.join('test.img.bz2')), data)
+
+    image = PDS3Image.open(filename, workers=2)
+    numpy.testing.assert_array_equal(image.data, data)
+    numpy.testing.assert_array_equal(
+        image.read_window(1, slice(50, 70)), data[1, 50:70]
+    )
@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
+import bz2
+import gzip
+import io
 import pytest
 import os
+import warnings
 import numpy
 from numpy.testing import assert_almost_equal
 from planetaryimage import CubeFile
@@ -42,3 +46,413 @@ def test_cubefile_labels():
 def test_stream_error():
     with pytest.raises(TypeError):
         CubeFile('filename.cub')
+
+
+def test_open_cubefile(cube_filename, cube_data):
+    image = CubeFile.open(cube_filename)
+    assert image.data.shape == (3, 70, 90)
+    assert_almost_equal(image.data, cube_data)
+
+
+def test_mmap(cube_filename, cube_data):
+    image = CubeFile.open(cube_filename, mmap=True)
+    assert image.mmap
+    assert image.data.shape == (3, 70, 90)
+    assert image.data.dtype == numpy.dtype('<f4')
+    assert_almost_equal(numpy.asarray(image.data), cube_data)
+    assert_almost_equal(image.data[1], cube_data[1])
+    assert_almost_equal(image.data[2, 31:65, 5:83], cube_data[2, 31:65, 5:83])
+    assert_almost_equal(image.data[:, ::-7, 3], cube_data[:, ::-7, 3])
+    assert image.data[0, -1, -1] == cube_data[0, -1, -1]
+
+
+def test_in_memory_stream_workers(cube_filename, cube_data):
+    with open(cube_filename, 'rb') as fp:
+        raw = fp.read()
+
+    image = CubeFile(io.BytesIO(raw), workers=4)
+    assert_almost_equal(image.data, cube_data)
+
+
+def test_mmap_pattern():
+    filename = os.path.join(DATA_DIR, 'pattern.cub')
+    image = CubeFile.open(filename, mmap=True)
+
+    expected_filename = os.path.join(DATA_DIR, 'pattern.txt')
+    expected = numpy.loadtxt(expected_filename, skiprows=2).reshape((1, 90, 90))
+    assert_almost_equal(numpy.asarray(image.data), expected)
+
+
+def test_mmap_specials_mask():
+    filename = os.path.join(DATA_DIR, 'pattern.cub')
+    image = CubeFile.open(filename, mmap=True)
+    assert image.format == 'Tile'
+    image.CHUNK_BYTES = 30 * 90 * 4
+
+    expected = CubeFile.open(filename).specials_mask()
+    mask = image.specials_mask()
+    assert mask.dtype == bool
+    numpy.testing.assert_array_equal(mask, expected)
+
+
+def test_mmap_specials_mask_tiled(tmpdir, write_cube, cube_data):
+    filename = str(tmpdir.join('tiled.cub'))
+    data = cube_data.copy()
+    data[1, 40:45, 3:70] = CubeFile.SPECIAL_PIXELS['Real']['Null']
+    data[2, 69, 89] = CubeFile.SPECIAL_PIXELS['Real']['Hrs']
+    write_cube(filename, data, tile_shape=(32, 16))
+
+    mask = CubeFile.open(filename, mmap=True).specials_mask()
+    expected = numpy.ones(data.shape, dtype=bool)
+    expected[1, 40:45, 3:70] = False
+    expected[2, 69, 89] = False
+    numpy.testing.assert_array_equal(mask, expected)
+
+
+@pytest.mark.parametrize('mmap', [False, True])
+def test_read_window(cube_filename, cube_data, mmap):
+    image = CubeFile.open(cube_filename, mmap=mmap)
+
+    window = image.read_window(lines=slice(20, 52), samples=slice(10, 43))
+    assert_almost_equal(window, cube_data[:, 20:52, 10:43])
+
+    window = image.read_window(bands=1, lines=slice(33, 34))
+    assert_almost_equal(window, cube_data[1, 33:34])
+
+    window = image.read_window(bands=slice(2, 0, -1), samples=slice(None, None, 4))
+    assert_almost_equal(window, cube_data[2:0:-1, :, ::4])
+
+    window = image.read_window(lines=slice(5, 5))
+    assert window.shape == (3, 0, 90)
+
+    assert_almost_equal(image.read_window(), cube_data)
+
+
+def test_load_data_false(cube_filename, cube_data):
+    image = CubeFile.open(cube_filename, load_data=False)
+    assert image.shape == (3, 70, 90)
+    assert image._data is None
+
+    assert_almost_equal(image.read_window(lines=slice(0, 3)), cube_data[:, :3])
+    assert image._data is None
+
+    assert_almost_equal(image.data, cube_data)
+
+
+def test_label_only_read(tmpdir):
+    filename = os.path.join(DATA_DIR, 'pattern.cub')
+    with open(filename, 'rb') as fp:
+        label = fp.read(1024)
+
+    truncated = str(tmpdir.join('truncated.cub'))
+    with open(truncated, 'wb') as fp:
+        fp.write(label)
+
+    image = CubeFile.open(truncated, load_data=False)
+    assert image.shape == (1, 90, 90)
+    assert image.tile_shape == (128, 128)
+
+    with pytest.raises(ValueError):
+        image.data
+
+
+@pytest.mark.parametrize('load_data', [False, True])
+def test_iter_lines(cube_filename, cube_data, load_data):
+    image = CubeFile.open(cube_filename, load_data=load_data)
+
+    chunks = [
+        (band, line, chunk.copy())
+        for band, line, chunk in image.iter_lines(chunk_lines=20)
+    ]
+    for band, line, chunk in chunks:
+        assert_almost_equal(chunk, cube_data[band, line:line + len(chunk)])
+
+    lines = [len(chunk) for band, line, chunk in chunks if band == 0]
+    assert sum(lines) == 70
+    if image.format == 'Tile':
+        assert lines == [32, 32, 6]
+    else:
+        assert lines == [20, 20, 20, 10]
+
+    bands = [band.copy() for band in image.iter_bands()]
+    assert_almost_equal(numpy.array(bands), cube_data)
+
+
+def test_workers(cube_filename, cube_data):
+    image = CubeFile.open(cube_filename, workers=4)
+    assert image.workers == 4
+    assert_almost_equal(image.data, cube_data)
+
+
+def reference_specials(data, specials):
+    data = data.astype(numpy.float64)
+    data[data == specials['Null']] = numpy.nan
+    data[data < specials['Min']] = -numpy.inf
+    data[data > specials['Max']] = numpy.inf
+    return data
+
+
+@pytest.mark.parametrize('dtype, byte_order', [
+    ('u1', '<'), ('u2', '>'), ('i2', '<'), ('i2', '>'), ('i4', '>'),
+    ('f4', '<'), ('f8', '>'),
+])
+def test_apply_numpy_specials(tmpdir, write_cube, dtype, byte_order):
+    filename = str(tmpdir.join('specials.cub'))
+    pixel_type = CubeFile.PIXEL_TYPES
+    name = [k for k, v in pixel_type.items() if v == numpy.dtype(dtype)][0]
+    specials = CubeFile.SPECIAL_PIXELS[name]
+
+    values = [specials[k] for k in ('Null', 'Lrs', 'Lis', 'His', 'Hrs')]
+    values += [specials['Min'], specials['Max'], 100]
+    data = numpy.resize(numpy.array(values, dtype), (2, 5, 7))
+    write_cube(filename, data, byte_order=byte_order)
+
+    image = CubeFile.open(filename)
+    image.CHUNK_BYTES = 7 * 8 * 2
+    expected = reference_specials(image.data, specials)
+
+    assert_almost_equal(image.apply_numpy_specials(), expected)
+    assert image.data.dtype.kind == numpy.dtype(dtype).kind
+
+    with numpy.errstate(over='ignore'):
+        expected32 = expected.astype(numpy.float32)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        result = image.apply_numpy_specials(dtype=numpy.float32)
+    assert result.dtype == numpy.float32
+    assert_almost_equal(result, expected32)
+
+    out = numpy.zeros((2, 5, 7), numpy.float32)
+    assert image.apply_numpy_specials(out=out) is out
+    assert_almost_equal(out, expected32)
+
+    result = image.apply_numpy_specials(copy=False)
+    assert image.data is result
+    assert_almost_equal(result, expected)
+
+
+@pytest.mark.parametrize('tile_shape', [None, (32, 16)])
+def test_specials_lazy_data(tmpdir, write_cube, cube_data, tile_shape):
+    filename = str(tmpdir.join('lazy.cub'))
+    data = cube_data.copy()
+    data[1, 40:45, 3:70] = CubeFile.SPECIAL_PIXELS['Real']['Null']
+    data[2, 69, 89] = CubeFile.SPECIAL_PIXELS['Real']['Hrs']
+    write_cube(filename, data, tile_shape=tile_shape)
+
+    loaded = CubeFile.open(filename)
+    image = CubeFile.open(filename, load_data=False)
+    image.CHUNK_BYTES = 20 * 90 * 4
+
+    numpy.testing.assert_array_equal(
+        image.specials_mask(), loaded.specials_mask()
+    )
+    assert_almost_equal(
+        image.apply_numpy_specials(dtype=numpy.float32),
+        loaded.apply_numpy_specials(dtype=numpy.float32)
+    )
+    assert image._data is None
+
+    result = image.apply_numpy_specials(copy=False)
+    assert image.data is result
+    assert_almost_equal(result, loaded.apply_numpy_specials())
+
+
+@pytest.mark.parametrize('copy', [True, False])
+def test_apply_scaling_lazy_data(tmpdir, write_cube, copy):
+    filename = str(tmpdir.join('scaled.cub'))
+    data = numpy.arange(2 * 6 * 9, dtype='u2').reshape((2, 6, 9))
+    data[0, 0, :2] = [0, 65535]
+    write_cube(filename, data, tile_shape=(4, 4), base=10.0, multiplier=0.5)
+
+    image = CubeFile.open(filename, load_data=False)
+    image.CHUNK_BYTES = 9 * 8
+    expected = CubeFile.open(filename).apply_scaling(numpy_specials=True)
+
+    result = image.apply_scaling(copy=copy, numpy_specials=True)
+    assert result.dtype == numpy.float64
+    assert_almost_equal(result, expected)
+    if copy:
+        assert image._data is None
+    else:
+        assert image.data is result
+
+
+@pytest.mark.parametrize('mmap', [False, True])
+def test_apply_scaling(tmpdir, write_cube, mmap):
+    filename = str(tmpdir.join('scaled.cub'))
+    data = numpy.arange(2 * 6 * 9, dtype='u2').reshape((2, 6, 9))
+    data[0, 0, :5] = [0, 1, 2, 65534, 65535]
+    write_cube(filename, data, byte_order='>', base=10.0, multiplier=0.5)
+
+    image = CubeFile.open(filename, mmap=mmap)
+    image.CHUNK_BYTES = 9 * 8
+    special = (data < 3) | (data > 65522)
+
+    expected = data * 0.5 + 10.0
+    expected[special] = data[special]
+    assert_almost_equal(image.apply_scaling(), expected)
+
+    result = image.apply_scaling(dtype=numpy.float32)
+    assert result.dtype == numpy.float32
+    assert_almost_equal(result, expected)
+
+    expected[0, 0, :5] = [numpy.nan, -numpy.inf, -numpy.inf, numpy.inf, numpy.inf]
+    out = numpy.empty((2, 6, 9))
+    result = image.apply_scaling(out=out, numpy_specials=True)
+    assert result is out
+    assert_almost_equal(out, expected)
+
+    result = image.apply_scaling(copy=False, numpy_specials=True)
+    assert image.data is result
+    assert result.dtype == numpy.float64
+    assert_almost_equal(result, expected)
+
+
+@pytest.mark.parametrize('byte_order', ['<', '>'])
+def test_apply_scaling_float(tmpdir, write_cube, byte_order):
+    filename = str(tmpdir.join('scaled.cub'))
+    data = numpy.arange(2 * 6 * 9, dtype='f4').reshape((2, 6, 9))
+    write_cube(filename, data, byte_order=byte_order, base=10.0, multiplier=0.5)
+
+    image = CubeFile.open(filename)
+    expected = data * 0.5 + 10.0
+    result = image.apply_scaling()
+    assert result.dtype == numpy.float32
+    assert result.dtype.isnative
+    assert_almost_equal(result, expected)
+
+    view = image.data[0]
+    result = image.apply_scaling(copy=False)
+    assert image.data is result
+    assert result.dtype == numpy.dtype(byte_order + 'f4')
+    assert_almost_equal(view, expected[0])
+
+
+def test_get_image_array_pattern():
+    image = CubeFile.open(os.path.join(DATA_DIR, 'pattern.cub'))
+    data = image.data.copy()
+    data -= data.min()
+    data *= 255 / data.max()
+
+    result = image.get_image_array()
+    assert result.dtype == numpy.uint8
+    numpy.testing.assert_array_equal(result, data.astype(numpy.uint8))
+
+
+@pytest.mark.parametrize('load_data', [False, True])
+def test_get_image_array_wide_range(tmpdir, write_cube, load_data):
+    filename = str(tmpdir.join('wide.cub'))
+    data = numpy.linspace(-30000, 30000, 2 * 10 * 10).astype('i2')
+    write_cube(filename, data.reshape((2, 10, 10)), byte_order='>')
+
+    image = CubeFile.open(filename, load_data=load_data)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        result = image.get_image_array()
+    assert result[0, 0, 0] == 0
+    assert result[1, 9, 9] == 255
+    assert 126 <= result[1, 0, 0] <= 128
+
+
+@pytest.mark.parametrize('dtype', ['u2', 'i2', 'f4'])
+@pytest.mark.parametrize('load_data', [False, True])
+def test_get_image_array(tmpdir, write_cube, dtype, load_data):
+    filename = str(tmpdir.join('stretch.cub'))
+    data = numpy.arange(2 * 10 * 10).reshape((2, 10, 10)).astype(dtype)
+    data[1] += 1000
+    name = {'u2': 'UnsignedWord', 'i2': 'SignedWord', 'f4': 'Real'}[dtype]
+    specials = CubeFile.SPECIAL_PIXELS[name]
+    data[0, 0, :3] = [specials['Null'], specials['Lis'], specials['His']]
+    write_cube(filename, data, byte_order='>')
+
+    image = CubeFile.open(filename, load_data=load_data)
+    image.CHUNK_BYTES = 10 * 4 * 3
+
+    result = image.get_image_array()
+    assert list(result[0, 0, :4]) == [0, 0, 255, 0]
+    assert result[1, 9, 9] == 255
+    assert result[1, 0, 0] == int((1100 - 3) * 255.0 / (1199 - 3))
+
+    result = image.get_image_array(per_band=True)
+    assert list(result[0, 0, :4]) == [0, 0, 255, 0]
+    assert result[0, 9, 9] == 255
+    assert result[1, 0, 0] == 0
+    assert result[1, 9, 9] == 255
+
+    result = image.get_image_array(clip=(10, 90), per_band=True)
+    assert result[1, 0, 0] == 0
+    assert result[1, 0, 9] == 0
+    assert result[1, 9, 9] == 255
+    assert 0 < result[1, 5, 0] < 255
+
+
+@pytest.mark.parametrize('compression, compress', [
+    ('gz', gzip.open), ('bz2', bz2.BZ2File)
+])
+def test_compressed_cube(tmpdir, cube_filename, cube_data, compression,
+                         compress):
+    compressed = str(tmpdir.join('compressed.cub.' + compression))
+    with open(cube_filename, 'rb') as src, compress(compressed, 'wb') as dest:
+        dest.write(src.read())
+
+    image = CubeFile.open(compressed, workers=2)
+    assert image.compression == compression
+    assert_almost_equal(image.data, cube_data)
+    assert_almost_equal(
+        image.read_window(lines=slice(40, 60)), cube_data[:, 40:60]
+    )
+
+
+@pytest.mark.parametrize('tile_shape', [None, (32, 16)])
+@pytest.mark.parametrize('compress, workers', [
+    (None, None), (None, 4), (gzip.open, None),
+])
+def test_byteorder_native(tmpdir, write_cube, cube_data, tile_shape,
+                          compress, workers):
+    filename = str(tmpdir.join('msb.cub'))
+    write_cube(filename, cube_data, tile_shape=tile_shape, byte_order='>')
+    if compress is not None:
+        with open(filename, 'rb') as src:
+            raw = src.read()
+        filename += '.gz'
+        with compress(filename, 'wb') as dest:
+            dest.write(raw)
+
+    image = CubeFile.open(filename, workers=workers)
+    assert image.dtype == numpy.dtype('>f4')
+    assert image.data.dtype == numpy.dtype('>f4')
+
+    image = CubeFile.open(filename, workers=workers, byteorder='native')
+    assert image.file_dtype == numpy.dtype('>f4')
+    assert image.dtype == numpy.dtype('=f4')
+    assert image.data.dtype.isnative
+    numpy.testing.assert_array_equal(image.data, cube_data)
+
+    image = CubeFile.open(filename, load_data=False, byteorder='native')
+    window = image.read_window(slice(1, 3), slice(5, 50), slice(3, 80))
+    assert window.dtype.isnative
+    numpy.testing.assert_array_equal(window, cube_data[1:3, 5:50, 3:80])
+    for band, line, chunk in image.iter_lines():
+        assert chunk.dtype.isnative
+        numpy.testing.assert_array_equal(
+            chunk, cube_data[band, line:line + len(chunk)]
+        )
+
+
+def test_byteorder_native_mmap(tmpdir, write_cube):
+    filename = str(tmpdir.join('msb.cub'))
+    data = numpy.arange(2 * 6 * 9, dtype='u2').reshape((2, 6, 9))
+    data[0, 0, :5] = [0, 1, 2, 65534, 65535]
+    write_cube(filename, data, byte_order='>', base=10.0, multiplier=0.5)
+
+    image = CubeFile.open(filename, mmap=True, byteorder='native')
+    assert image.dtype == numpy.dtype('>u2')
+    assert image.data.dtype == numpy.dtype('>u2')
+
+    image = CubeFile.open(filename, byteorder='native')
+    expected = numpy.where((data < 3) | (data > 65522), data, data * 0.5 + 10)
+    assert_almost_equal(image.apply_scaling(), expected)
+
+    with pytest.raises(ValueError):
+        CubeFile.open(filename, byteorder='big')
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import numpy
+import pytest
+
+from planetaryimage import CubeFile, PDS3Image
+from planetaryimage.image import _WindowReader
+
+dask = pytest.importorskip('dask')
+
+
+def test_cube_to_dask(cube_filename, cube_data):
+    image = CubeFile.open(cube_filename, load_data=False)
+    array = image.to_dask()
+    assert array.shape == cube_data.shape
+    assert array.dtype == cube_data.dtype
+    assert image._data is None
+
+    numpy.testing.assert_array_equal(array.compute(), cube_data)
+    numpy.testing.assert_array_equal(
+        array[1, 10:50, 33:77].compute(), cube_data[1, 10:50, 33:77]
+    )
+    assert array.sum(dtype='f8').compute() == cube_data.sum(dtype='f8')
+    assert image._data is None
+
+
+def test_tile_chunks(tmpdir, write_cube, cube_data):
+    filename = write_cube(str(tmpdir.join('test.cub')), cube_data, (32, 16))
+    image = CubeFile.open(filename, load_data=False)
+    image.DASK_CHUNK_BYTES = 32 * 16 * 4 * 3
+    array = image.to_dask()
+    assert array.chunksize == (1, 32, 48)
+
+    image.DASK_CHUNK_BYTES = 32 * 16 * 4 * 12
+    assert image.to_dask().chunksize == (1, 64, 90)
+
+    array = image.to_dask(chunks=(3, 10, 10))
+    numpy.testing.assert_array_equal(array.compute(), cube_data)
+
+
+def test_pds3_to_dask(tmpdir, write_pds3):
+    data = numpy.arange(2 * 30 * 20, dtype='>i2').reshape((2, 30, 20))
+    filename = write_pds3(str(tmpdir.join('test.img')), data)
+
+    image = PDS3Image.open(filename, load_data=False)
+    image.DASK_CHUNK_BYTES = 20 * 2 * 7
+    array = image.to_dask()
+    assert array.chunksize == (1, 7, 20)
+
+    mapped = array.map_blocks(lambda block: block * 2, dtype='i4')
+    numpy.testing.assert_array_equal(
+        mapped.compute(scheduler='threads'), data * 2
+    )
+
+
+@pytest.mark.parametrize('byteorder', ['file', 'native'])
+def test_to_dask_pickle(cube_filename, cube_data, byteorder):
+    image = CubeFile.open(
+        cube_filename, load_data=False, byteorder=byteorder, workers=2
+    )
+    array = pickle.loads(pickle.dumps(image.to_dask()))
+    assert array.dtype == image.dtype
+    numpy.testing.assert_array_equal(array.compute(), cube_data)
+
+    reopened = pickle.loads(pickle.dumps(_WindowReader(image))).image
+    assert reopened.byteorder == byteorder
+    assert reopened.workers == 2
+    assert reopened.dtype == image.dtype
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import numpy
+import pytest
+from numpy.testing import assert_array_equal
+from planetaryimage import IOStats
+from planetaryimage.decoders import (
+    BandSequentialDecoder, InterleavedDecoder, PositionalReader, TileDecoder
+)
+
+
+def tile_stream(data, tile_shape):
+    bands, lines, samples = data.shape
+    tile_lines, tile_samples = tile_shape
+    rows = -(-lines // tile_lines)
+    cols = -(-samples // tile_samples)
+    padded = numpy.zeros(
+        (bands, rows * tile_lines, cols * tile_samples), data.dtype
+    )
+    padded[:, :lines, :samples] = data
+    tiles = padded.reshape((bands, rows, tile_lines, cols, tile_samples))
+    return io.BytesIO(tiles.transpose((0, 1, 3, 2, 4)).tobytes())
+
+
+@pytest.mark.parametrize('tile_shape', [(4, 4), (5, 7), (16, 3), (64, 64)])
+def test_tile_decoder(tile_shape):
+    data = numpy.arange(2 * 17 * 23, dtype='>i2').reshape((2, 17, 23))
+    decoder = TileDecoder(data.dtype, data.shape, tile_shape)
+    assert_array_equal(decoder.decode(tile_stream(data, tile_shape)), data)
+
+
+def test_tile_decoder_truncated():
+    data = numpy.zeros((1, 8, 8), 'u1')
+    stream = io.BytesIO(tile_stream(data, (4, 4)).read()[:-1])
+    with pytest.raises(ValueError):
+        TileDecoder(data.dtype, data.shape, (4, 4)).decode(stream)
+
+
+@pytest.mark.parametrize('tile_shape', [(4, 4), (5, 7)])
+def test_tile_decoder_parallel(tmpdir, tile_shape):
+    data = numpy.arange(3 * 17 * 23, dtype='<f8').reshape((3, 17, 23))
+    path = tmpdir.join('tiles')
+    path.write_binary(b'xx' + tile_stream(data, tile_shape).read())
+
+    decoder = TileDecoder(data.dtype, data.shape, tile_shape)
+    with open(str(path), 'rb') as stream:
+        stream.seek(2)
+        assert_array_equal(decoder.decode(stream, workers=4), data)
+
+
+def test_band_sequential_decoder_parallel(tmpdir):
+    data = numpy.arange(3 * 17 * 23, dtype='>u2').reshape((3, 17, 23))
+    path = tmpdir.join('bsq')
+    path.write_binary(data.tobytes())
+
+    decoder = BandSequentialDecoder(data.dtype, data.shape)
+    decoder.CHUNK_BYTES = 100
+    with open(str(path), 'rb') as stream:
+        assert_array_equal(decoder.decode(stream, workers=3), data)
+
+
+@pytest.mark.parametrize('tile_shape', [None, (5, 7)])
+def test_decoder_parallel_in_memory(tile_shape):
+    data = numpy.arange(3 * 17 * 23, dtype='<i4').reshape((3, 17, 23))
+    if tile_shape is None:
+        decoder = BandSequentialDecoder(data.dtype, data.shape)
+        stream = io.BytesIO(data.tobytes())
+    else:
+        decoder = TileDecoder(data.dtype, data.shape, tile_shape)
+        stream = tile_stream(data, tile_shape)
+
+    # In memory streams have no file descriptor, decode them serially
+    assert_array_equal(decoder.decode(stream, workers=4), data)
+
+
+@pytest.mark.parametrize('interleave, axes', [
+    ('line', (1, 0, 2)), ('sample', (1, 2, 0)),
+])
+def test_interleaved_decoder_iter_lines(interleave, axes):
+    data = numpy.arange(5 * 17 * 23, dtype='>i2').reshape((5, 17, 23))
+    decoder = InterleavedDecoder(data.dtype, data.shape, interleave)
+    stats = IOStats()
+    stream = stats.wrap(io.BytesIO(data.transpose(axes).tobytes()))
+
+    # Each chunk of lines is read once for all bands
+    with stats.phase('iter_lines'):
+        chunks = [
+            (band, line, chunk.copy())
+            for band, line, chunk in decoder.iter_lines(stream, 4)
+        ]
+    assert stats['iter_lines'].bytes_read == data.nbytes
+    assert [(band, line) for band, line, _ in chunks[:6]] == [
+        (0, 0), (1, 0), (2, 0), (3, 0), (4, 0), (0, 4)
+    ]
+    for band, line, chunk in chunks:
+        assert_array_equal(chunk, data[band, line:line + 4])
+
+
+def test_positional_reader(tmpdir):
+    path = tmpdir.join('data')
+    path.write_binary(b'0123456789')
+
+    with open(str(path), 'rb') as stream:
+        reader = PositionalReader(stream.fileno())
+        reader.seek(4)
+        assert reader.read(3) == b'456'
+        assert reader.tell() == 7
+
+        buffer = bytearray(5)
+        assert reader.readinto(buffer) == 3
+        assert buffer[:3] == b'789'
+        assert reader.seek(-2, os.SEEK_END) == 8
+        assert stream.tell() == 0
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import struct
+import subprocess
+import sys
+
+import pytest
+
+import planetaryimage
+from planetaryimage.specialpixels import SPECIAL_PIXELS
+
+
+def _imported(code):
+    """The heavy modules imported by running ``code`` in a new interpreter."""
+    script = code + (
+        '\nimport sys\n'
+        'print(" ".join(sorted(name for name in ("numpy", "pvl", "gzip", '
+        '"bz2", "sqlite3") if name in sys.modules)))'
+    )
+    output = subprocess.check_output([sys.executable, '-c', script])
+    return output.decode('ascii').split()
+
+
+def test_import_is_lazy():
+    assert _imported('import planetaryimage') == []
+    assert _imported('from planetaryimage import IOStats') == []
+    assert _imported('from planetaryimage import CubeFile') == ['numpy']
+
+
+def test_lazy_attributes():
+    for name in planetaryimage.__all__:
+        assert getattr(planetaryimage, name).__name__ == name
+    assert set(planetaryimage.__all__) <= set(dir(planetaryimage))
+
+    with pytest.raises(AttributeError):
+        planetaryimage.NotAClass
+
+
+@pytest.mark.parametrize('pixel_type, fmt, pattern', [
+    ('Real', '>f', 0xFF7FFFFA),
+    ('Double', '>d', 0xFFEFFFFFFFFFFFFA),
+])
+def test_float_special_pixels(pixel_type, fmt, pattern):
+    size = struct.calcsize(fmt)
+    for offset, key in enumerate(['Min', 'Null', 'Lrs', 'Lis', 'His', 'Hrs']):
+        raw = (pattern + offset).to_bytes(size, 'big')
+        assert SPECIAL_PIXELS[pixel_type][key] == struct.unpack(fmt, raw)[0]
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import os
+
+import numpy
+import pytest
+
+from planetaryimage import CubeFile, PDS3Image
+
+
+def block_means(data, factor):
+    """Reference NaN aware block means of ``data``."""
+    bands, lines, samples = data.shape
+    padded = numpy.full(
+        (bands, -(-lines // factor) * factor, -(-samples // factor) * factor),
+        numpy.nan
+    )
+    padded[:, :lines, :samples] = data
+    blocks = padded.reshape((
+        bands, padded.shape[1] // factor, factor,
+        padded.shape[2] // factor, factor
+    ))
+    with numpy.errstate(invalid='ignore'):
+        sums = numpy.nansum(blocks, axis=(2, 4))
+        counts = (~numpy.isnan(blocks)).sum(axis=(2, 4))
+        return sums / counts
+
+
+def test_build_overviews(cube_filename, cube_data):
+    image = CubeFile.open(cube_filename, load_data=False)
+    assert image.overviews is None
+
+    overviews = image.build_overviews(min_size=12, chunk_lines=7)
+    assert os.path.exists(cube_filename + '.ovr')
+    assert overviews.factors == [2, 4, 8]
+    assert [shape for _, shape, _ in overviews.levels] == [
+        (3, 35, 45), (3, 18, 23), (3, 9, 12)
+    ]
+
+    for level, factor in enumerate(overviews.factors):
+        numpy.testing.assert_allclose(
+            overviews.read(level), block_means(cube_data, factor), rtol=1e-6
+        )
+
+    # Reopened images load the sidecar
+    image = CubeFile.open(cube_filename, load_data=False)
+    assert image.overviews.factors == [2, 4, 8]
+
+
+def test_overviews_skip_special_pixels(tmpdir, write_cube):
+    data = numpy.arange(3 * 9 * 9, dtype='i2').reshape((3, 9, 9))
+    data[0, :2, :2] = -32768  # Null
+    data[1, 2, 2] = -32766  # Lis
+    data[2, 8, :] = -32768
+    filename = write_cube(str(tmpdir.join('test.cub')), data)
+
+    image = CubeFile.open(filename)
+    image.build_overviews(min_size=1)
+
+    expected = data.astype(float)
+    expected[data < -32000] = numpy.nan
+    numpy.testing.assert_allclose(
+        image.overviews.read(0), block_means(expected, 2)
+    )
+    assert numpy.isnan(image.overviews.read(0)[0, 0, 0])
+    numpy.testing.assert_allclose(
+        image.overviews.read(3), block_means(expected, 16)
+    )
+
+
+def test_read_overview(cube_filename, cube_data):
+    image = CubeFile.open(cube_filename, load_data=False)
+    with pytest.raises(ValueError):
+        image.read_overview(4)
+
+    image.build_overviews(min_size=12)
+
+    window = image.read_overview(5, 1, slice(8, 40), slice(None, 30))
+    numpy.testing.assert_allclose(
+        window, block_means(cube_data, 4)[1, 2:10, :8], rtol=1e-6
+    )
+
+    numpy.testing.assert_array_equal(
+        image.read_overview(1, 0, slice(3, 5)), cube_data[0, 3:5]
+    )
+
+
+def test_build_overviews_interleaved(tmpdir, write_pds3):
+    data = numpy.arange(3 * 30 * 20, dtype='>i2').reshape((3, 30, 20))
+    filename = write_pds3(
+        str(tmpdir.join('test.img')), data,
+        raw=data.transpose((1, 0, 2)).tobytes(),
+        band_storage_type='LINE_INTERLEAVED'
+    )
+
+    image = PDS3Image.open(filename, load_data=False)
+    overviews = image.build_overviews(min_size=8, chunk_lines=7)
+    for level, factor in enumerate(overviews.factors):
+        numpy.testing.assert_allclose(
+            overviews.read(level), block_means(data, factor)
+        )
+
+
+def test_stale_overviews(tmpdir, write_pds3):
+    data = numpy.arange(2 * 30 * 20, dtype='>i2').reshape((2, 30, 20))
+    filename = write_pds3(str(tmpdir.join('test.img')), data)
+    PDS3Image.open(filename).build_overviews()
+    assert PDS3Image.open(filename).overviews is not None
+
+    write_pds3(filename, data + 1)
+    os.utime(filename, (0, 0))
+    assert PDS3Image.open(filename).overviews is None
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import io
+import tracemalloc
 import pytest
 import os
 import numpy
@@ -124,3 +126,224 @@ def test_parse_pointer():
 
     with pytest.raises(ValueError):
         Pointer.parse(['W1782844276_1.IMG', 5, 6], 64)
+
+
+def test_mmap(expected):
+    image = PDS3Image.open(filename, mmap=True)
+    assert isinstance(image.data, numpy.memmap)
+    assert image.data.dtype == numpy.dtype('>i2')
+    assert_almost_equal(image.data, expected)
+
+    with pytest.raises(ValueError):
+        PDS3Image.open(gzipped_filename, mmap=True)
+
+
+@pytest.mark.parametrize('path', [filename, gzipped_filename, bz2_filename])
+def test_read_window(expected, path):
+    image = PDS3Image.open(path)
+    window = image.read_window(lines=slice(2, 7), samples=slice(3, 9))
+    assert_almost_equal(window, expected[:, 2:7, 3:9])
+    assert_almost_equal(image.read_window(bands=0, lines=4), expected[0, 4])
+
+
+def test_read_label():
+    label = (
+        b'PDS_VERSION_ID = PDS3\r\n'
+        b'DESCRIPTION = "A description\r\n'
+        b'END of the description"\r\n'
+        b'END      \x00\x01\x02\r\nbinary'
+    )
+    image = PDS3Image.__new__(PDS3Image)
+    read = image._read_label(io.BytesIO(label))
+    assert read.endswith(b'description"\r\nEND')
+
+
+@pytest.mark.parametrize('path', [filename, gzipped_filename, bz2_filename])
+def test_load_data_false(expected, path):
+    image = PDS3Image.open(path, load_data=False)
+    assert image.label['IMAGE']['LINES'] == 10
+    assert_almost_equal(image.data, expected)
+
+
+@pytest.mark.parametrize('path', [filename, gzipped_filename, bz2_filename])
+def test_iter_lines(expected, path):
+    image = PDS3Image.open(path, load_data=False)
+    chunks = [chunk.copy() for _, _, chunk in image.iter_lines(chunk_lines=3)]
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert_almost_equal(numpy.concatenate(chunks)[None], expected)
+
+
+@pytest.mark.parametrize('extension', ['.IMG', '.IMG.gz', '.IMG.bz2'])
+@pytest.mark.parametrize('dtype', ['>i2', '<f8'])
+def test_compressed_decode(tmpdir, write_pds3, extension, dtype):
+    data = numpy.arange(2 * 30 * 40).reshape((2, 30, 40)).astype(dtype)
+    path = write_pds3(str(tmpdir.join('image' + extension)), data)
+
+    image = PDS3Image.open(path)
+    assert image.data.dtype == numpy.dtype(dtype)
+    assert_almost_equal(image.data, data)
+
+
+@pytest.mark.parametrize('extension', ['.IMG.gz', '.IMG.bz2'])
+def test_compressed_decode_peak_memory(tmpdir, write_pds3, extension):
+    data = numpy.zeros((1, 1024, 2048), '>i4')
+    path = write_pds3(str(tmpdir.join('image' + extension)), data)
+
+    image = PDS3Image.open(path, load_data=False)
+    tracemalloc.start()
+    try:
+        image.data
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert data.nbytes <= peak < data.nbytes + 2 * 1024 * 1024
+
+
+def _line_records(data, prefix_bytes, suffix_bytes):
+    """Raw line records of ``data`` with numbered prefix and suffix bytes."""
+    bands, lines, samples = data.shape
+    dtype = numpy.dtype([
+        ('prefix', 'u1', (prefix_bytes,)),
+        ('pixels', data.dtype, (samples,)),
+        ('suffix', 'u1', (suffix_bytes,)),
+    ])
+    records = numpy.zeros((bands, lines), dtype)
+    records['prefix'] = numpy.arange(bands * lines)[:, None].reshape(
+        (bands, lines, 1)
+    ) % 256
+    records['pixels'] = data
+    records['suffix'] = 255
+    return records
+
+
+@pytest.mark.parametrize('extension, mmap', [
+    ('.IMG', False), ('.IMG', True), ('.IMG.gz', False),
+])
+def test_line_prefix_suffix(tmpdir, write_pds3, extension, mmap):
+    data = numpy.arange(2 * 30 * 20, dtype='>i2').reshape((2, 30, 20))
+    records = _line_records(data, 12, 3)
+    path = write_pds3(
+        str(tmpdir.join('image' + extension)), data, raw=records.tobytes(),
+        line_prefix_bytes=12, line_suffix_bytes=3
+    )
+
+    image = PDS3Image.open(path, mmap=mmap)
+    numpy.testing.assert_array_equal(image.data, data)
+    numpy.testing.assert_array_equal(image.line_prefixes, records['prefix'])
+    numpy.testing.assert_array_equal(image.line_suffixes, records['suffix'])
+
+    # Pixels and prefixes are views of the same records
+    assert numpy.may_share_memory(image.data, image.line_prefixes)
+
+    image = PDS3Image.open(path, load_data=False)
+    numpy.testing.assert_array_equal(
+        image.read_window(1, slice(3, 9), slice(4, 17)), data[1, 3:9, 4:17]
+    )
+    chunks = [chunk.copy() for _, _, chunk in image.iter_lines(7)]
+    numpy.testing.assert_array_equal(
+        numpy.concatenate(chunks), data.reshape((-1, 20))
+    )
+    assert image._data is None
+
+
+def test_line_prefix_replaced_data(tmpdir, write_pds3):
+    data = numpy.arange(30 * 20, dtype='<f4').reshape((1, 30, 20))
+    records = _line_records(data, 0, 4)
+    path = write_pds3(
+        str(tmpdir.join('image.IMG')), data, raw=records.tobytes(),
+        line_suffix_bytes=4
+    )
+
+    image = PDS3Image.open(path)
+    assert image.line_prefixes is None
+    image.data = image.data * 2
+    numpy.testing.assert_array_equal(image.line_suffixes, records['suffix'])
+
+
+@pytest.mark.parametrize('storage, axes', [
+    ('LINE_INTERLEAVED', (1, 0, 2)),
+    ('SAMPLE_INTERLEAVED', (1, 2, 0)),
+])
+@pytest.mark.parametrize('extension, mmap', [
+    ('.IMG', False), ('.IMG', True), ('.IMG.bz2', False),
+])
+def test_interleaved(tmpdir, write_pds3, storage, axes, extension, mmap):
+    data = numpy.arange(3 * 30 * 20, dtype='<u2').reshape((3, 30, 20))
+    path = write_pds3(
+        str(tmpdir.join('image' + extension)), data,
+        raw=data.transpose(axes).tobytes(), band_storage_type=storage
+    )
+
+    image = PDS3Image.open(path, mmap=mmap)
+    assert image.format == storage
+    assert image.data.shape == data.shape
+    assert not image.data.flags.c_contiguous
+    numpy.testing.assert_array_equal(image.data, data)
+
+    image = PDS3Image.open(path, contiguous=True)
+    assert image.data.flags.c_contiguous
+    numpy.testing.assert_array_equal(image.data, data)
+
+    image = PDS3Image.open(path, load_data=False)
+    for window in [
+        (1, slice(3, 9), slice(4, 17)),
+        (slice(None), slice(28, 2, -3), 5),
+        (slice(1, 3), slice(None), slice(None)),
+    ]:
+        numpy.testing.assert_array_equal(
+            image.read_window(*window), data[window]
+        )
+    chunks = [
+        (band, line, chunk.copy())
+        for band, line, chunk in image.iter_lines(7)
+    ]
+    assert [(band, line) for band, line, _ in chunks[:4]] == [
+        (0, 0), (1, 0), (2, 0), (0, 7)
+    ]
+    for band, line, chunk in chunks:
+        numpy.testing.assert_array_equal(chunk, data[band, line:line + 7])
+
+
+def test_line_prefix_contiguous(tmpdir, write_pds3):
+    data = numpy.arange(2 * 30 * 20, dtype='>i2').reshape((2, 30, 20))
+    path = write_pds3(
+        str(tmpdir.join('image.IMG')), data,
+        raw=_line_records(data, 6, 0).tobytes(), line_prefix_bytes=6
+    )
+
+    image = PDS3Image.open(path, contiguous=True)
+    assert image.data.flags.c_contiguous
+    numpy.testing.assert_array_equal(image.data, data)
+    numpy.testing.assert_array_equal(
+        image.line_prefixes, _line_records(data, 6, 0)['prefix']
+    )
+
+
+@pytest.mark.parametrize('keywords, raw', [
+    ({}, lambda data: data.tobytes()),
+    ({'line_prefix_bytes': 6},
+     lambda data: _line_records(data, 6, 0).tobytes()),
+    ({'band_storage_type': 'SAMPLE_INTERLEAVED'},
+     lambda data: data.transpose((1, 2, 0)).tobytes()),
+])
+@pytest.mark.parametrize('contiguous', [False, True])
+def test_byteorder_native(tmpdir, write_pds3, keywords, raw, contiguous):
+    data = numpy.arange(-600, 600).reshape((2, 30, 20)).astype('>i4')
+    path = write_pds3(
+        str(tmpdir.join('image.IMG')), data, raw=raw(data), **keywords
+    )
+
+    image = PDS3Image.open(path, byteorder='native', contiguous=contiguous)
+    assert image.file_dtype == numpy.dtype('>i4')
+    assert image.data.dtype.isnative
+    numpy.testing.assert_array_equal(image.data, data)
+    if 'line_prefix_bytes' in keywords:
+        numpy.testing.assert_array_equal(
+            image.line_prefixes, _line_records(data, 6, 0)['prefix']
+        )
+
+    image = PDS3Image.open(path, byteorder='native', load_data=False)
+    window = image.read_window(1, slice(3, 9), slice(4, 17))
+    assert window.dtype.isnative
+    numpy.testing.assert_array_equal(window, data[1, 3:9, 4:17])
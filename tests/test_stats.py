@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import os
+
+import numpy
+import pytest
+
+from planetaryimage import CubeFile, IOStats, PDS3Image
+
+
+def test_open_phases(cube_filename, cube_data):
+    ended = []
+    stats = IOStats(callback=lambda name, phase: ended.append(name))
+    image = CubeFile.open(cube_filename, stats=stats)
+    numpy.testing.assert_array_equal(image.data, cube_data)
+
+    assert ended == [
+        'label.read', 'label.parse', 'label', 'data.seek', 'data.decode',
+        'data', 'open',
+    ]
+    assert all(stats[name].calls == 1 for name in ended)
+
+    # Tiled cubes also read the padding of partial tiles
+    data_bytes = os.path.getsize(cube_filename) - image.start_byte
+    assert stats['data'].bytes_read == data_bytes
+    assert stats['label'].bytes_read == stats['label.read'].bytes_read
+    assert stats['label.parse'].reads == 0
+    assert stats['open'].bytes_read == (
+        stats['label'].bytes_read + data_bytes
+    )
+    assert stats['data.decode'].allocated == cube_data.nbytes
+    assert stats['open'].seconds >= stats['data'].seconds
+    assert stats['open'].reads == (
+        stats['label.read'].reads + stats['data.decode'].reads
+    )
+
+
+@pytest.mark.parametrize('workers', [None, 4])
+def test_lazy_data_and_windows(cube_filename, cube_data, workers):
+    stats = IOStats()
+    image = CubeFile.open(
+        cube_filename, load_data=False, workers=workers, stats=stats
+    )
+    assert 'data' not in stats
+
+    window = image.read_window(1, slice(10, 20), slice(5, 15))
+    numpy.testing.assert_array_equal(window, cube_data[1, 10:20, 5:15])
+    assert stats['read_window'].calls == 1
+    assert 0 < stats['read_window'].bytes_read < cube_data.nbytes
+    assert stats['read_window'].allocated >= window.nbytes
+
+    image.data
+    data_bytes = os.path.getsize(cube_filename) - image.start_byte
+    assert stats['data'].bytes_read == data_bytes
+    assert stats['data.decode'].reads >= 1
+    assert list(stats.as_dict()['data']) == [
+        'calls', 'seconds', 'bytes_read', 'reads', 'read_seconds', 'allocated'
+    ]
+
+
+def test_iter_lines(cube_filename, cube_data):
+    stats = IOStats()
+    image = CubeFile.open(cube_filename, load_data=False, stats=stats)
+    chunks = [chunk.copy() for _, _, chunk in image.iter_lines(20)]
+    assert sum(len(chunk) for chunk in chunks) == 3 * 70
+
+    # Tiled cubes also read the padding of partial tiles
+    data_bytes = os.path.getsize(cube_filename) - image.start_byte
+    assert stats['iter_lines'].bytes_read == data_bytes
+    assert stats['iter_lines'].calls == len(chunks) + 1
+    assert 'data' not in stats
+
+
+def test_compressed_and_mmap(tmpdir, write_pds3):
+    data = numpy.arange(2 * 30 * 20, dtype='>i2').reshape((2, 30, 20))
+    filename = write_pds3(str(tmpdir.join('test.img.gz')), data)
+
+    stats = IOStats()
+    PDS3Image.open(filename, stats=stats)
+    assert stats['data.decode'].bytes_read == data.nbytes
+
+    filename = write_pds3(str(tmpdir.join('test.img')), data)
+    stats.reset()
+    image = PDS3Image.open(filename, mmap=True, stats=stats)
+    numpy.testing.assert_array_equal(image.data, data)
+    assert 'data.decode' not in stats
+    assert stats['data'].allocated == 0
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import numpy
+import pvl
+import pytest
+
+from planetaryimage import CubeFile, CubeWriter
+from planetaryimage.transcode import main, transcode
+
+
+def read_blob(filename, value):
+    with open(filename, 'rb') as fp:
+        fp.seek(value['StartByte'] - 1)
+        return fp.read(value['Bytes'])
+
+
+@pytest.mark.parametrize('format, tile_shape', [
+    ('BandSequential', None),
+    ('Tile', (64, 8)),
+    ('Tile', (7, 200)),
+])
+def test_transcode(tmpdir, cube_filename, cube_data, format, tile_shape):
+    destination = str(tmpdir.join('transcoded.cub'))
+    cube = transcode(
+        cube_filename, destination, format=format, tile_shape=tile_shape,
+        chunk_lines=10
+    )
+
+    assert cube.format == format
+    assert cube.tile_shape == tile_shape
+    numpy.testing.assert_array_equal(cube.data, cube_data)
+
+
+def test_transcode_keeps_source_tile_shape(tmpdir, write_cube, cube_data):
+    source = write_cube(
+        str(tmpdir.join('source.cub')), cube_data, tile_shape=(32, 16)
+    )
+    cube = transcode(source, str(tmpdir.join('transcoded.cub')))
+    assert cube.tile_shape == (32, 16)
+
+
+def test_transcode_main(tmpdir, cube_filename, cube_data):
+    destination = str(tmpdir.join('transcoded.cub'))
+    main([cube_filename, destination, '--tile-shape', '16', '32'])
+
+    cube = CubeFile.open(destination)
+    assert cube.format == 'Tile'
+    assert cube.tile_shape == (16, 32)
+    numpy.testing.assert_array_equal(cube.data, cube_data)
+
+
+@pytest.mark.parametrize('format', ['BandSequential', 'Tile'])
+def test_transcode_keeps_blobs(tmpdir, cube_data, format):
+    source = str(tmpdir.join('source.cub'))
+    blobs = [
+        ('Table', pvl.PVLObject([
+            ('Name', 'InstrumentPointing'), ('StartByte', 1), ('Bytes', 0),
+            ('Records', 2),
+        ]), b'pointing' * 40),
+        ('Table', pvl.PVLObject([
+            ('Name', 'InstrumentPosition'), ('StartByte', 1), ('Bytes', 0),
+        ]), b'position' * 3),
+        ('History', pvl.PVLObject([
+            ('Name', 'IsisCube'), ('StartByte', 1), ('Bytes', 0),
+        ]), b'Object = spiceinit\nEnd_Object\n'),
+    ]
+    label = pvl.PVLModule([
+        ('NaifKeywords', pvl.PVLObject([('BODY499_RADII', [3396, 3396])])),
+    ])
+    with CubeWriter(source, cube_data.shape, 'f4', tile_shape=(32, 16),
+                    label=label, blobs=blobs) as writer:
+        writer.write(cube_data)
+
+    cube = CubeFile.open(source)
+    tables = cube.label.getall('Table')
+    assert [table['Name'] for table in tables] == [
+        'InstrumentPointing', 'InstrumentPosition'
+    ]
+    assert read_blob(source, tables[1]) == b'position' * 3
+
+    destination = str(tmpdir.join('transcoded.cub'))
+    cube = transcode(source, destination, format=format, tile_shape=(7, 200))
+    numpy.testing.assert_array_equal(cube.data, cube_data)
+    assert cube.label['NaifKeywords']['BODY499_RADII'] == [3396, 3396]
+
+    copied = cube.label.getall('Table') + cube.label.getall('History')
+    assert [value['Name'] for value in copied] == [
+        'InstrumentPointing', 'InstrumentPosition', 'IsisCube'
+    ]
+    assert copied[0]['Records'] == 2
+    for value, (_, _, data) in zip(copied, blobs):
+        assert value['Bytes'] == len(data)
+        assert read_blob(destination, value) == data
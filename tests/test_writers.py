@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import numpy
+import pytest
+
+from planetaryimage import CubeFile, CubeWriter, PDS3Image, PDS3Writer
+
+
+@pytest.mark.parametrize('format, tile_shape', [
+    ('BandSequential', None),
+    ('Tile', (32, 16)),
+])
+@pytest.mark.parametrize('dtype', ['<f4', '>i2', 'u1', 'i1', '>u4'])
+def test_cube_writer(tmpdir, cube_data, format, tile_shape, dtype):
+    filename = str(tmpdir.join('out.cub'))
+    data = cube_data.astype(dtype)
+    with CubeWriter(filename, data.shape, dtype, format=format,
+                    tile_shape=tile_shape, base=1.5) as writer:
+        writer.write(data)
+
+    image = CubeFile.open(filename)
+    assert image.format == format
+    assert image.tile_shape == tile_shape
+    assert image.dtype == numpy.dtype(dtype)
+    assert image.base == 1.5
+    assert image.start_byte == CubeWriter.LABEL_BYTES
+    numpy.testing.assert_array_equal(image.data, data)
+
+
+def test_cube_writer_chunks(tmpdir, cube_data):
+    filename = str(tmpdir.join('out.cub'))
+    writer = CubeWriter(filename, cube_data.shape, 'f4', tile_shape=(32, 16))
+    with writer:
+        # Chunks neither aligned to tiles nor bands
+        rows = cube_data.reshape((-1, cube_data.shape[2]))
+        writer.write_chunks(rows[i:i + 25] for i in range(0, len(rows), 25))
+
+    numpy.testing.assert_array_equal(CubeFile.open(filename).data, cube_data)
+
+
+def test_cube_writer_incomplete(tmpdir, cube_data):
+    filename = str(tmpdir.join('out.cub'))
+    writer = CubeWriter(filename, cube_data.shape, 'f4')
+    writer.write(cube_data[0])
+    with pytest.raises(ValueError):
+        writer.close()
+
+    writer = CubeWriter(filename, cube_data.shape, 'f4')
+    with pytest.raises(ValueError):
+        writer.write(cube_data[:, :, :10])
+    writer.write(cube_data)
+    with pytest.raises(ValueError):
+        writer.write(cube_data[0])
+    writer.close()
+
+
+@pytest.mark.parametrize('format, tile_shape', [
+    ('BandSequential', None),
+    ('Tile', (16, 64)),
+])
+def test_cube_save(tmpdir, cube_filename, cube_data, format, tile_shape):
+    filename = str(tmpdir.join('saved.cub'))
+    image = CubeFile.open(cube_filename, load_data=False)
+    image.save(filename, format=format, tile_shape=tile_shape)
+
+    saved = CubeFile.open(filename)
+    assert saved.format == format
+    assert saved.tile_shape == tile_shape
+    numpy.testing.assert_array_equal(saved.data, cube_data)
+
+
+@pytest.mark.parametrize('dtype, byte_order', [('i1', '<'), ('u4', '>')])
+def test_cube_save_types_without_specials(tmpdir, write_cube, cube_data,
+                                          dtype, byte_order):
+    filename = str(tmpdir.join('in.cub'))
+    data = cube_data.astype(dtype)
+    write_cube(filename, data, byte_order=byte_order)
+
+    saved = str(tmpdir.join('saved.cub'))
+    CubeFile.open(filename, load_data=False).save(saved, tile_shape=(32, 16))
+    image = CubeFile.open(saved)
+    assert image.dtype.newbyteorder('=') == numpy.dtype(dtype)
+    numpy.testing.assert_array_equal(image.data, data)
+
+
+@pytest.mark.parametrize('dtype', ['>i2', '<u2', '<f4', 'u1'])
+def test_pds3_writer(tmpdir, cube_data, dtype):
+    filename = str(tmpdir.join('out.img'))
+    data = cube_data.astype(dtype)
+    with PDS3Writer(filename, data.shape, dtype) as writer:
+        for band in data:
+            writer.write(band)
+
+    image = PDS3Image.open(filename)
+    assert image.dtype == numpy.dtype(dtype)
+    assert image.start_byte % image.record_bytes == 0
+    assert image.label['FILE_RECORDS'] * image.record_bytes == \
+        tmpdir.join('out.img').size()
+    numpy.testing.assert_array_equal(image.data, data)
+
+
+@pytest.mark.parametrize('writer, options', [
+    (CubeWriter, {'format': 'BandSequential'}),
+    (CubeWriter, {'tile_shape': (32, 16)}),
+    (PDS3Writer, {}),
+])
+def test_writer_bands_in_any_order(tmpdir, cube_data, writer, options):
+    filename = str(tmpdir.join('out'))
+    with writer(filename, cube_data.shape, 'f4', **options) as out:
+        for line in range(0, 70, 9):
+            for band in range(2, -1, -1):
+                out.write_lines(band, line, cube_data[band, line:line + 9])
+        assert out.complete
+
+    image = (CubeFile if writer is CubeWriter else PDS3Image).open(filename)
+    numpy.testing.assert_array_equal(image.data, cube_data)
+
+    out = writer(str(tmpdir.join('other')), cube_data.shape, 'f4', **options)
+    with pytest.raises(ValueError):
+        out.write_lines(1, 9, cube_data[1, 9:18])
+    with pytest.raises(ValueError):
+        out.write_lines(1, 0, numpy.zeros((71, 90)))
+
+
+def test_pds3_save_interleaved(tmpdir, write_pds3):
+    data = numpy.arange(3 * 30 * 20, dtype='>i2').reshape((3, 30, 20))
+    source = write_pds3(
+        str(tmpdir.join('source.img')), data,
+        raw=data.transpose((1, 2, 0)).tobytes(),
+        band_storage_type='SAMPLE_INTERLEAVED'
+    )
+
+    filename = str(tmpdir.join('saved.img'))
+    PDS3Image.open(source, load_data=False).save(filename)
+    image = PDS3Image.open(filename)
+    assert image.format == 'BAND_SEQUENTIAL'
+    numpy.testing.assert_array_equal(image.data, data)
+
+
+def test_pds3_save_detached(tmpdir, write_pds3):
+    data = numpy.arange(2 * 30 * 20, dtype='>i2').reshape((2, 30, 20))
+    source = write_pds3(
+        str(tmpdir.join('source.img')), data, target_name='MARS'
+    )
+
+    label = str(tmpdir.join('saved.lbl'))
+    PDS3Image.open(source).save(
+        label, data_filename=str(tmpdir.join('saved.img'))
+    )
+
+    image = PDS3Image.open(label)
+    assert image.data_filename == 'saved.img'
+    assert image.label['IMAGE']['TARGET_NAME'] == 'MARS'
+    assert tmpdir.join('saved.img').size() == data.nbytes
+    numpy.testing.assert_array_equal(image.data, data)